@@ -8,6 +8,29 @@ from database import db, init_db
 from routes.auth_routes import auth_bp
 from routes.analysis_routes import analysis_bp
 from routes.portfolio_routes import portfolio_bp
+from routes.bulk_job_routes import bulk_jobs_bp
+from routes.profiling_routes import profiles_bp
+from services.climate_engine import ClimateEngine
+from services.bulk_analysis_service import BulkAnalysisService
+from services.rescoring_service import RescoringService
+from services.spatial_index import SpatialIndex
+from services.heatmap_tiles import HeatmapTiles
+from services.analysis_writer import AnalysisWriter
+from services.portfolio_analytics import PortfolioSnapshot
+from services.result_serializer import ResultSerializer
+from services.report_cache import ReportCache
+from services.batch_report_service import BatchReportService
+from services.loss_simulation import LossSimulator
+from services.scoring_profiles import ScoringProfiles
+from services.request_profiler import RequestProfiler
+from services.provider_cassettes import ProviderCassettes
+from services.warmup import Warmup
+from services.single_flight import SingleFlight
+from services.rate_limiter import ProviderRateLimiter
+from services.analysis_depth import AnalysisDepth
+from routes.provider_routes import providers_bp
+from routes.task_routes import tasks_bp
+from services.task_queue import TaskQueue
 
 def create_app():
     app = Flask(__name__)
@@ -21,11 +44,39 @@ def create_app():
 
     # Initialize Database
     init_db(app)
+    SpatialIndex.init_app(app)
+    HeatmapTiles.init_app(app)
+    AnalysisWriter.init_app(app)
+    PortfolioSnapshot.init_app(app)
+    ResultSerializer.init_app(app)
+    ReportCache.init_app(app)
+    BatchReportService.init_app(app)
+    LossSimulator.init_app(app)
+    ScoringProfiles.init_app(app)
+    RequestProfiler.init_app(app)
+    AnalysisDepth.init_app(app)
 
     # Register Blueprints
     app.register_blueprint(auth_bp, url_prefix='/api')
     app.register_blueprint(analysis_bp, url_prefix='/api')
     app.register_blueprint(portfolio_bp, url_prefix='/api')
+    app.register_blueprint(bulk_jobs_bp, url_prefix='/api')
+    app.register_blueprint(profiles_bp, url_prefix='/api')
+    app.register_blueprint(providers_bp, url_prefix='/api')
+    app.register_blueprint(tasks_bp, url_prefix='/api')
+
+    # Outbound provider limits and background jobs
+    ClimateEngine.configure_provider_limits(app.config.get('PROVIDER_CONCURRENCY'))
+    ClimateEngine.configure_provider_urls(app.config.get('PROVIDER_URLS'))
+    ProviderCassettes.init_app(app)
+    SingleFlight.init_app(app)
+    ProviderRateLimiter.init_app(app)
+    TaskQueue.init_app(app)
+    if app.config.get('BULK_JOBS_RESUME_ON_START'):
+        BulkAnalysisService.resume_interrupted(app)
+    if app.config.get('RESCORING_RESUME_ON_START'):
+        RescoringService.resume_interrupted(app)
+    Warmup.init_app(app)
 
     # Global Error Handling
     @app.errorhandler(404)
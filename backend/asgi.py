@@ -0,0 +1,10 @@
+"""
+ASGI entry point: the analysis endpoints run on an event loop with async provider calls,
+everything else is the regular Flask app (see services/async_analysis.py).
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001 --workers 2
+"""
+from app import create_app
+from services.async_analysis import AsyncAnalysisApp
+
+app = AsyncAnalysisApp(create_app())
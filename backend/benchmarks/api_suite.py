@@ -0,0 +1,340 @@
+"""
+Offline HTTP benchmark for the main API endpoints.
+
+Starts the provider stand-ins from benchmarks/stub_providers.py, launches the app on a fresh
+SQLite database with ClimateEngine pointed at them (no traffic leaves the machine, Gemini is
+disabled), seeds the portfolio, then drives each scenario with a fixed number of concurrent
+clients and records throughput and p50/p95/p99 latency. Results are written as JSON; pass an
+earlier result to --compare to print the change per scenario.
+
+    python benchmarks/api_suite.py
+    python benchmarks/api_suite.py --latency 50 --failure-rate 0.05 --scenarios analyze alerts
+    python benchmarks/api_suite.py --compare instance/benchmarks/api-20260101T120000.json
+
+--target benchmarks a server that is already running (e.g. gunicorn started with the *_URL
+variables printed by stub_providers.py) instead of launching one.
+
+Provider cassettes (services/provider_cassettes.py) make runs repeatable without the stubs:
+record once against the public providers, then replay anywhere, with or without the recorded
+provider latency:
+
+    python benchmarks/api_suite.py --live --cassettes /data/cassettes --cassette-mode record
+    python benchmarks/api_suite.py --cassettes /data/cassettes --replay-timing none
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.stub_providers import add_arguments as add_stub_arguments, from_arguments as stubs_from_arguments
+
+
+def _asset(rng, i):
+    return {
+        "property_name": f"BENCH-{i}",
+        "address": f"{i} Benchmark Road",
+        "latitude": round(rng.uniform(-40, 60), 5),
+        "longitude": round(rng.uniform(-120, 150), 5),
+        "asset_value": round(rng.lognormvariate(13.5, 0.8), 2),
+        "loan_term": rng.choice([5, 10, 15, 20, 25, 30]),
+        "climate_score": round(rng.uniform(20, 95), 1),
+    }
+
+
+class Scenario:
+    """One endpoint under load: request(i, session, ctx) returns a response."""
+
+    def __init__(self, name, request, requests=200, concurrency=8, expect=(200,)):
+        self.name = name
+        self.request = request
+        self.requests = requests
+        self.concurrency = concurrency
+        self.expect = expect
+
+
+def _scenarios():
+    return [
+        Scenario("assets", lambda i, s, ctx: s.get(ctx['url'] + "/api/assets"), requests=100, concurrency=4),
+        Scenario("alerts", lambda i, s, ctx: s.get(ctx['url'] + "/api/alerts"), requests=100, concurrency=4),
+        Scenario("report", lambda i, s, ctx: s.get(f"{ctx['url']}/api/report/{ctx['ids'][i % len(ctx['ids'])]}"),
+                 requests=100, concurrency=4),
+        Scenario("report_cached", lambda i, s, ctx: s.get(f"{ctx['url']}/api/report/{ctx['ids'][i % 10]}"),
+                 requests=200, concurrency=4),
+        Scenario("reports_batch", lambda i, s, ctx: s.post(ctx['url'] + "/api/reports/batch",
+                                                           json={"ids": ctx['ids'][(i * 20) % len(ctx['ids']):][:20]}),
+                 requests=10, concurrency=2),
+        Scenario("portfolio_report", lambda i, s, ctx: s.get(ctx['url'] + "/api/portfolio/report"),
+                 requests=10, concurrency=2),
+        Scenario("analyze", lambda i, s, ctx: s.post(ctx['url'] + "/api/analyze", json=_asset(random.Random(i), i)),
+                 requests=100, concurrency=8),
+        Scenario("analyze_address", lambda i, s, ctx: s.post(ctx['url'] + "/api/analyze",
+                                                             json={"address": f"{i} Benchmark Road, Stubville",
+                                                                   "asset_value": 500000, "loan_term": 20}),
+                 requests=50, concurrency=8),
+        Scenario("bulk_upload", lambda i, s, ctx: s.post(ctx['url'] + "/api/bulk-upload",
+                                                         json=[_asset(random.Random(i * 1000 + j), j) for j in range(50)]),
+                 requests=20, concurrency=2, expect=(201,)),
+    ]
+
+
+def _percentiles(latencies):
+    if not latencies:
+        return {}
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "mean_ms": round(float(ms.mean()), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def run_scenario(scenario, ctx, requests_override=None, concurrency_override=None):
+    total = requests_override or scenario.requests
+    concurrency = concurrency_override or scenario.concurrency
+    latencies, statuses, errors = [], Counter(), Counter()
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def client():
+        session = requests.Session()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                response = scenario.request(i, session, ctx)
+                _ = response.content
+                elapsed = time.perf_counter() - start
+                with lock:
+                    statuses[response.status_code] += 1
+                    if response.status_code in scenario.expect:
+                        latencies.append(elapsed)
+            except requests.RequestException as e:
+                with lock:
+                    errors[type(e).__name__] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "errors": dict(errors),
+        "seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        **_percentiles(latencies),
+    }
+
+
+def _serve(port):
+    """Entry point of the server subprocess."""
+    from werkzeug.serving import make_server
+    from app import create_app
+    make_server('127.0.0.1', port, create_app(), threaded=True).serve_forever()
+
+
+def _free_port():
+    import socket
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, provider_env, command=None, extra_env=None):
+    """
+    Launches the app against a fresh database in workdir; returns (process, base_url).
+    command(port) gives the server command line (default: the threaded werkzeug server).
+    """
+    port = _free_port()
+    env = dict(os.environ)
+    env.update(provider_env)
+    env.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'GEMINI_API_KEY': '',
+        'REPORT_CACHE_DIR': os.path.join(workdir, 'report_cache'),
+        # Host-shared limiter buckets and single-flight results stay with this run
+        'RATE_LIMIT_DIR': os.path.join(workdir, 'rate_limits'),
+        'SINGLE_FLIGHT_DIR': os.path.join(workdir, 'single_flight'),
+        # Measured under the deployment SQLite settings unless the caller picks a profile
+        'SQLITE_PROFILE': os.environ.get('SQLITE_PROFILE', 'production'),
+        'PYTHONPATH': BACKEND_DIR,
+    })
+    env.update(extra_env or {})
+    # The app reads and appends to ml-earth-engine/ under the working directory; run it in workdir
+    # so the training CSV is left alone, with the trained model linked in if there is one
+    model = os.path.join(BACKEND_DIR, 'ml-earth-engine', 'climate_model.pkl')
+    os.makedirs(os.path.join(workdir, 'ml-earth-engine'), exist_ok=True)
+    if os.path.exists(model):
+        os.symlink(model, os.path.join(workdir, 'ml-earth-engine', 'climate_model.pkl'))
+
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    argv = command(port) if command else [sys.executable, os.path.abspath(__file__), '--serve', str(port)]
+    process = subprocess.Popen(argv, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}; see {log.name}")
+        try:
+            requests.get(url + "/", timeout=1)
+            return process, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"server did not start within 60s; see {log.name}")
+
+
+def seed(url, count):
+    rng = random.Random(7)
+    for start in range(0, count, 250):
+        batch = [_asset(rng, i) for i in range(start, min(count, start + 250))]
+        requests.post(url + "/api/bulk-upload", json=batch, timeout=120).raise_for_status()
+    assets = requests.get(url + "/api/assets", timeout=120).json()
+    return sorted(a['id'] for a in assets)
+
+
+def compare(previous, current):
+    """Rows of (scenario, metric, before, after, change %) for metrics present in both runs."""
+    rows = []
+    for name, result in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            a, b = before.get(metric), result.get(metric)
+            if a and b is not None:
+                rows.append((name, metric, a, b, round((b - a) / a * 100, 1)))
+    return rows
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    scenarios = {s.name: s for s in _scenarios()}
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs='*', choices=list(scenarios), help="default: all")
+    parser.add_argument("--requests", type=int, help="requests per scenario (default: per-scenario)")
+    parser.add_argument("--concurrency", type=int, help="concurrent clients (default: per-scenario)")
+    parser.add_argument("--seed-assets", type=int, default=500, help="assets bulk-uploaded before the run")
+    parser.add_argument("--target", help="base URL of an already running server (skips launching one)")
+    parser.add_argument("--output", help="result JSON path (default: instance/benchmarks/api-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result JSON to compare against")
+    parser.add_argument("--live", action="store_true", help="call the public providers instead of the stubs")
+    parser.add_argument("--cassettes", help="provider cassette directory (replaces the stubs unless recording)")
+    parser.add_argument("--cassette-mode", choices=['record', 'replay', 'auto'], default='replay')
+    parser.add_argument("--replay-timing", default='original', help="original | none | a factor")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve)
+        return
+
+    stubs = stubs_from_arguments(args).start()
+    if args.live:
+        providers, provider_env = "live", {}
+    elif args.cassettes and args.cassette_mode == 'replay':
+        providers, provider_env = "cassettes", {}
+    else:
+        providers, provider_env = "stubs", stubs.env()
+    if args.cassettes:
+        provider_env.update({
+            'PROVIDER_CASSETTE_MODE': args.cassette_mode,
+            'PROVIDER_CASSETTE_DIR': os.path.abspath(args.cassettes),
+            'PROVIDER_REPLAY_TIMING': args.replay_timing,
+        })
+    if providers != "live":
+        # Stubs and replays have no rate limits; pacing them would measure the limiter, not the app
+        for provider in ('nominatim', 'open_meteo', 'overpass', 'nasa_power', 'elevation'):
+            provider_env[f"{provider.upper()}_RATE"] = '0'
+    workdir = tempfile.mkdtemp(prefix="api-bench-")
+    process = None
+    try:
+        if args.target:
+            url = args.target.rstrip('/')
+        else:
+            process, url = start_server(workdir, provider_env)
+        ctx = {'url': url, 'ids': seed(url, args.seed_assets)}
+        if not ctx['ids']:
+            sys.exit("no assets to benchmark against")
+
+        results = {}
+        for name in args.scenarios or list(scenarios):
+            results[name] = run_scenario(scenarios[name], ctx, args.requests, args.concurrency)
+            r = results[name]
+            print(f"{name:18} {r['ok']:>5}/{r['requests']:<5} {r['throughput_rps']:>8} req/s  "
+                  f"p50 {r.get('p50_ms', '-')} ms  p95 {r.get('p95_ms', '-')} ms  p99 {r.get('p99_ms', '-')} ms",
+                  flush=True)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        stubs.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "target": args.target or "launched",
+        "seed_assets": args.seed_assets,
+        "providers": providers,
+        "cassettes": {"directory": args.cassettes, "mode": args.cassette_mode,
+                      "replay_timing": args.replay_timing} if args.cassettes else None,
+        "stub_providers": stubs.config(),
+        "provider_calls": stubs.stats(),
+        "scenarios": results,
+    }
+    output = args.output or os.path.join(BACKEND_DIR, 'instance', 'benchmarks',
+                                         f"api-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\ncompared with {args.compare} ({previous.get('git_commit')}, {previous.get('created_at')})")
+        for name, metric, before, after, change in compare(previous, report):
+            print(f"{name:18} {metric:15} {before:>10} -> {after:<10} {change:+.1f}%")
+
+
+if __name__ == "__main__":
+    main()
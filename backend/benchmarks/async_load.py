@@ -0,0 +1,112 @@
+"""
+Load test of /api/analyze under the sync and async deployments.
+
+Starts the stub providers (benchmarks/stub_providers.py, default latencies are rough public
+medians, so an analysis waits about a second on I/O), then for each deployment launches it on
+a fresh database, drives POST /api/analyze from N concurrent clients and records throughput,
+p50/p95/p99 latency and failures:
+
+    sync   gunicorn app:create_app() with --sync-workers sync workers (one analysis per worker)
+    async  uvicorn asgi:app with --async-workers workers (services/async_analysis.py)
+
+    python benchmarks/async_load.py --clients 50 200 --requests 400
+    python benchmarks/async_load.py --latency 100 --sync-workers 8 --deployments async
+
+Provider concurrency limits (PROVIDER_CONCURRENCY in config.py) are per process, so one async
+worker would otherwise be capped by them; --provider-concurrency sets every limit for both
+deployments, and provider rate limits are switched off, so the test measures serving capacity
+rather than the outbound policy.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.api_suite import Scenario, run_scenario, start_server, _asset, _git_commit
+from benchmarks.stub_providers import add_arguments as add_stub_arguments, from_arguments as stubs_from_arguments
+
+
+def _deployments(args):
+    return {
+        "sync": lambda port: [sys.executable, '-m', 'gunicorn', '--workers', str(args.sync_workers),
+                              '--worker-class', 'sync', '--timeout', '120', '--bind', f'127.0.0.1:{port}',
+                              'app:create_app()'],
+        "async": lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+                               '--port', str(port), '--workers', str(args.async_workers),
+                               '--no-access-log', '--timeout-keep-alive', '30'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deployments", nargs='*', choices=['sync', 'async'], default=['sync', 'async'])
+    parser.add_argument("--clients", nargs='*', type=int, default=[50, 200], help="concurrency levels")
+    parser.add_argument("--requests", type=int, default=400, help="analyses per concurrency level")
+    parser.add_argument("--sync-workers", type=int, default=4)
+    parser.add_argument("--async-workers", type=int, default=1)
+    parser.add_argument("--provider-concurrency", type=int, default=256, help="per-process limit for every provider")
+    parser.add_argument("--output", help="result JSON path (default: instance/benchmarks/async-<timestamp>.json)")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    analyze = Scenario("analyze", lambda i, s, ctx: s.post(ctx['url'] + "/api/analyze",
+                                                           json=_asset(random.Random(i), i), timeout=300))
+    stubs = stubs_from_arguments(args).start()
+    commands = _deployments(args)
+    extra_env = {'SQLITE_PROFILE': 'production'}
+    for provider in ('nominatim', 'open_meteo', 'overpass', 'nasa_power', 'elevation'):
+        extra_env[f"{provider.upper()}_CONCURRENCY"] = str(args.provider_concurrency)
+        extra_env[f"{provider.upper()}_RATE"] = '0'
+    results = {}
+    try:
+        for name in args.deployments:
+            workdir = tempfile.mkdtemp(prefix=f"async-load-{name}-")
+            process = None
+            try:
+                # WAL profile, as in production
+                process, url = start_server(workdir, stubs.env(), command=commands[name],
+                                            extra_env=extra_env)
+                results[name] = {}
+                for clients in args.clients:
+                    r = run_scenario(analyze, {'url': url}, args.requests, clients)
+                    results[name][str(clients)] = r
+                    print(f"{name:6} clients {clients:>4}: {r['ok']:>5}/{r['requests']:<5} "
+                          f"{r['throughput_rps']:>8} req/s  p50 {r.get('p50_ms', '-')} ms  "
+                          f"p95 {r.get('p95_ms', '-')} ms  p99 {r.get('p99_ms', '-')} ms  "
+                          f"statuses {r['statuses']} errors {r['errors']}", flush=True)
+            finally:
+                if process is not None:
+                    process.terminate()
+                    process.wait(timeout=60)
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        stubs.stop()
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "git_commit": _git_commit(),
+        "cpu_count": os.cpu_count(),
+        "sync_workers": args.sync_workers,
+        "async_workers": args.async_workers,
+        "provider_concurrency": args.provider_concurrency,
+        "stub_providers": stubs.config(),
+        "provider_calls": stubs.stats(),
+        "results": results,
+    }
+    output = args.output or os.path.join(BACKEND_DIR, 'instance', 'benchmarks',
+                                         f"async-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
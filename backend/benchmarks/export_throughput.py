@@ -0,0 +1,140 @@
+"""
+Throughput and peak-memory benchmark for the streaming portfolio export.
+
+Seeds a scratch database with synthetic analyses, then runs each export format in a fresh
+process and reports rows/s, output size and peak RSS growth. The "json" case is the
+baseline: the whole table loaded and serialized at once, like paging /api/assets.
+
+    python benchmarks/export_throughput.py --rows 200000 --formats json,csv,parquet,arrow
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def _configure_env(db_path):
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    os.environ['GEMINI_API_KEY'] = ''
+
+
+def _seed(db_path, rows):
+    _configure_env(db_path)
+    from sqlalchemy import insert
+    from app import create_app
+    from database import db
+    from models.property import PropertyAnalysis
+
+    app = create_app()
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    with app.app_context():
+        batch = []
+        for i in range(rows):
+            score = round(rng.uniform(20, 95), 1)
+            batch.append({
+                "property_name": f"BENCH-{i}",
+                "address": "Benchmark Street",
+                "latitude": 12.8 + rng.random() * 0.4,
+                "longitude": 80.0 + rng.random() * 0.3,
+                "asset_value": rng.uniform(1e5, 5e8),
+                "loan_term": 30,
+                "climate_score": score,
+                "risk_level": "Low" if score >= 80 else "Medium" if score >= 50 else "High",
+                "heat_risk": rng.uniform(0, 100), "flood_risk": rng.uniform(0, 100),
+                "storm_risk": rng.uniform(0, 100), "fire_risk": rng.uniform(0, 100),
+                "overall_risk_score": score, "ml_risk_score": score,
+                "greenery_percent": 30.0, "water_percent": 10.0, "builtup_percent": 60.0,
+                "avg_temperature": 28.5, "precipitation": 120.0, "elevation": 45.0,
+                "risk_factors": {"flood": 40.0, "heat": 55.0, "storm": 30.0, "fire": 20.0, "sea_level": 25.0},
+                "projections": [{"year": y, "value": round(1 + (y - 2030) * 0.03, 2)} for y in range(2030, 2080, 10)],
+                "ai_insights": "Synthetic benchmark row. " * 8,
+                "loan_recommendation": {"recommended_interest_adjustment": 0.0, "risk_level": "Medium",
+                                        "recommendation_text": "Standard loan terms apply."},
+                "created_at": start + timedelta(seconds=i)
+            })
+            if len(batch) == 5000:
+                db.session.execute(insert(PropertyAnalysis), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(PropertyAnalysis), batch)
+        db.session.commit()
+
+
+def _run_case(db_path, fmt, out_path, chunk_rows, result_queue):
+    _configure_env(db_path)
+    from app import create_app
+    from database import db
+    from models.property import PropertyAnalysis
+    from services.export_service import ExportService
+
+    app = create_app()
+    with app.app_context():
+        db.session.execute(db.select(1))
+        baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        if fmt == 'json':
+            body = json.dumps([a.to_dict() for a in PropertyAnalysis.query.all()]).encode('utf-8')
+            with open(out_path, 'wb') as f:
+                f.write(body)
+            rows = PropertyAnalysis.query.count()
+        else:
+            ExportService.write_file(fmt, out_path, chunk_rows=chunk_rows)
+            rows = PropertyAnalysis.query.count()
+        elapsed = time.perf_counter() - start
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    result_queue.put({
+        "format": fmt,
+        "rows": rows,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed) if elapsed else None,
+        "output_mb": round(os.path.getsize(out_path) / 1e6, 2),
+        "peak_rss_growth_mb": round((peak_kb - baseline_kb) / 1024, 1)
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--formats", default="json,csv,parquet,arrow")
+    parser.add_argument("--chunk-rows", type=int, default=5000)
+    parser.add_argument("--dir", help="directory for the scratch database and outputs")
+    parser.add_argument("--output", help="also write the JSON report to this path")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="export-bench-", dir=args.dir)
+    db_path = os.path.join(tmp, "bench.db")
+    ctx = mp.get_context("spawn")
+
+    seed = ctx.Process(target=_seed, args=(db_path, args.rows))
+    seed.start()
+    seed.join()
+
+    report = []
+    for fmt in [f.strip() for f in args.formats.split(",")]:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_case,
+                           args=(db_path, fmt, os.path.join(tmp, f"export.{fmt}"), args.chunk_rows, queue))
+        proc.start()
+        report.append(queue.get())
+        proc.join()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
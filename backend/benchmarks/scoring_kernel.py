@@ -0,0 +1,160 @@
+"""
+Parity check and timing for services/scoring_kernel.py against the scalar scoring path.
+
+Draws random properties (plus values placed exactly on rounding ties and band edges), scores
+them one at a time through ClimateEngine / calculate_loan_pricing and all at once through the
+kernel and the standard profile's score_many / band_many, and fails on any difference in bit
+pattern or label. Then times re-pricing a loan book under that profile.
+
+    python benchmarks/scoring_kernel.py --parity 200000 --book 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('GEMINI_API_KEY', '')
+
+
+def _inputs(n, rng):
+    trend = rng.uniform(-1, 6, size=(n, 5)).round(rng.integers(0, 4))
+    built_up = rng.uniform(-5, 110, n).round(1)
+    greenery = rng.uniform(0, 100, n).round(1)
+    water = rng.uniform(0, 60, n).round(1)
+    precip = rng.uniform(0, 12, n)
+    elevation = rng.uniform(-20, 120, n)
+    # A slice of exact ties and band edges, where rounding and comparisons are most fragile
+    k = n // 10
+    built_up[:k] = rng.integers(0, 2000, k) * 0.05
+    elevation[:k] = rng.integers(0, 700, k) * 0.05
+    return trend, built_up, greenery, water, precip, elevation
+
+
+def _same(a, b):
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    return np.array_equal(a.view(np.int64), b.view(np.int64))
+
+
+def reprice(profile, scores):
+    """Loan recommendation and pricing arrays for a book of scores under the profile."""
+    band = profile.band_many(scores)
+    tables = {key: np.array([r[key] for r in profile.recommendations]) for key in profile.recommendations[0]}
+    tables.update({key: np.array([p[key] for p in profile.pricings]) for key in profile.pricings[0]})
+    return {key: table[band] for key, table in tables.items()}
+
+
+def parity(n, seed):
+    from services.climate_engine import ClimateEngine
+    from services.analysis_pipeline import calculate_loan_pricing
+    from services.scoring_profiles import ScoringProfiles
+    from services import scoring_kernel as kernel
+
+    profile = ScoringProfiles.get()
+
+    rng = np.random.default_rng(seed)
+    trend, built_up, greenery, water, precip, elevation = _inputs(n, rng)
+
+    start = time.perf_counter()
+    scalar = {"heat": [], "flood": [], "elevation": [], "environment": [], "score": [], "final": []}
+    for i in range(n):
+        env = {"built_up": float(built_up[i]), "greenery": float(greenery[i]), "water": float(water[i])}
+        r = ClimateEngine._calculate_risk_profile([float(v) for v in trend[i]], env, float(precip[i]), float(elevation[i]))
+        for key in ("heat", "flood", "elevation", "environment"):
+            scalar[key].append(float(r[key]))
+        scalar["score"].append(profile.score({"heat": r['heat'], "flood": r['flood'], "sea_level": r['elevation']},
+                                             env['built_up']))
+        scalar["final"].append(float(ClimateEngine._calculate_final_score(r)))
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    risks = kernel.risk_profile(trend, built_up, greenery, water, precip, elevation)
+    scores = profile.score_many({"heat": risks["heat"], "flood": risks["flood"], "sea_level": risks["elevation"],
+                                 "built_up": built_up})
+    finals = kernel.final_score(risks["heat"], risks["flood"], risks["elevation"], risks["environment"])
+    kernel_s = time.perf_counter() - start
+
+    mismatches = {key: int(n - sum(_same(scalar[key][i], risks[key][i]) for i in range(n)))
+                  for key in ("heat", "flood", "elevation", "environment")}
+    mismatches["score"] = 0 if _same(scalar["score"], scores) else int(np.count_nonzero(np.array(scalar["score"]) != scores))
+    mismatches["final"] = 0 if _same(scalar["final"], finals) else int(np.count_nonzero(np.array(scalar["final"]) != finals))
+
+    # Loan policies over every score on a 0.05 grid plus the random ones
+    test_scores = np.concatenate([np.arange(-200, 2201) * 0.05, scores, [np.nan]])
+    rec = price = reprice(profile, test_scores)
+    loan_mismatches = 0
+    for i, s in enumerate(test_scores):
+        expected_rec = ClimateEngine._calculate_loan_recommendation(float(s))
+        expected_price = calculate_loan_pricing(float(s))
+        if (not _same(expected_rec["recommended_interest_adjustment"], rec["recommended_interest_adjustment"][i])
+                or expected_rec["risk_level"] != rec["risk_level"][i]
+                or expected_rec["recommendation_text"] != rec["recommendation_text"][i]
+                or not _same(expected_price["interest_rate"], price["interest_rate"][i])
+                or expected_price["approval_status"] != price["approval_status"][i]
+                or expected_price["risk_category"] != price["risk_category"][i]):
+            loan_mismatches += 1
+    mismatches["loan"] = loan_mismatches
+
+    return {
+        "properties": n,
+        "mismatches": mismatches,
+        "scalar_ms_per_1000": round(scalar_s / n * 1000 * 1000, 3),
+        "kernel_ms_per_1000": round(kernel_s / n * 1000 * 1000, 4)
+    }
+
+
+def reprice_book(n, seed, repeats=5):
+    from services.analysis_pipeline import calculate_loan_pricing
+    from services.climate_engine import ClimateEngine
+    from services.scoring_profiles import ScoringProfiles
+
+    profile = ScoringProfiles.get()
+
+    scores = np.random.default_rng(seed).uniform(0, 100, n).round(1)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        reprice(profile, scores)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+
+    sample = scores[:min(n, 100000)]
+    start = time.perf_counter()
+    for s in sample:
+        ClimateEngine._calculate_loan_recommendation(s)
+        calculate_loan_pricing(s)
+    scalar = (time.perf_counter() - start) / len(sample) * n
+
+    return {
+        "loans": n,
+        "kernel_ms": round(best * 1000, 2),
+        "kernel_ms_per_1000": round(best / n * 1000 * 1000, 4),
+        "scalar_ms_estimated": round(scalar * 1000, 1),
+        "speedup": round(scalar / best, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parity", type=int, default=100000, help="properties for the bit-for-bit check")
+    parser.add_argument("--book", type=int, default=1000000, help="loans in the re-pricing timing")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="also write the JSON report to this path")
+    args = parser.parse_args()
+
+    report = {"parity": parity(args.parity, args.seed), "reprice": reprice_book(args.book, args.seed)}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    if any(report["parity"]["mismatches"].values()):
+        sys.exit("scoring kernel does not match the scalar path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Concurrent-write benchmark for the SQLite profiles in config.py.
+
+Spawns several worker processes (standing in for gunicorn workers), each with a few threads,
+that insert and commit PropertyAnalysis rows the same way /api/analyze does, interleaved with
+portfolio reads. Runs once per profile against a fresh database and prints throughput,
+commit latency percentiles and the number of "database is locked" failures.
+
+    python benchmarks/sqlite_concurrency.py --workers 4 --threads 4 --rows 200
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def _configure_env(db_path, profile):
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    os.environ['SQLITE_PROFILE'] = profile
+    os.environ['GEMINI_API_KEY'] = ''
+
+
+def _sample_row(i):
+    from models.property import PropertyAnalysis
+    return PropertyAnalysis(
+        property_name=f"BENCH-{os.getpid()}-{i}",
+        address="Benchmark Street",
+        latitude=13.0 + (i % 100) * 0.001,
+        longitude=80.2 + (i % 77) * 0.001,
+        asset_value=250000.0,
+        loan_term=20,
+        climate_score=55.0,
+        risk_level="Medium",
+        heat_risk=60.0, flood_risk=50.0, storm_risk=40.0, fire_risk=30.0,
+        overall_risk_score=55.0, ml_risk_score=55.0,
+        greenery_percent=25.0, water_percent=10.0, builtup_percent=65.0,
+        avg_temperature=28.5, precipitation=120.0, elevation=45.0,
+        risk_factors={"flood": 50.0, "heat": 60.0, "storm": 40.0, "fire": 30.0, "sea_level": 20.0},
+        projections=[{"year": 2030, "value": 1.1}],
+        ai_insights="benchmark",
+        loan_recommendation={"recommended_interest_adjustment": 0.0, "risk_level": "Medium"}
+    )
+
+
+def _worker(db_path, profile, threads, rows, ready, go, result_queue):
+    _configure_env(db_path, profile)
+    from app import create_app
+    from database import db
+    from models.property import PropertyAnalysis
+
+    app = create_app()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def run_thread(offset):
+        with app.app_context():
+            for i in range(rows):
+                start = time.perf_counter()
+                try:
+                    db.session.add(_sample_row(offset + i))
+                    db.session.commit()
+                    # A light read between writes, like the portfolio page polling
+                    if i % 10 == 0:
+                        PropertyAnalysis.query.order_by(PropertyAnalysis.id.desc()).limit(20).all()
+                    with lock:
+                        latencies.append(time.perf_counter() - start)
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(type(e).__name__ + ": " + str(e).splitlines()[0][:120])
+
+    pool = [threading.Thread(target=run_thread, args=(t * rows,)) for t in range(threads)]
+    # Imports and app setup are excluded from the timed section
+    ready.release()
+    go.wait()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    result_queue.put({"latencies": latencies, "errors": errors})
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+def run_profile(profile, workers, threads, rows, base_dir=None):
+    tmp = tempfile.mkdtemp(prefix=f"sqlite-bench-{profile}-", dir=base_dir)
+    db_path = os.path.join(tmp, "bench.db")
+
+    # Create the schema once so workers only race on data writes
+    ctx = mp.get_context("spawn")
+    init = ctx.Process(target=_init_schema, args=(db_path, profile))
+    init.start()
+    init.join()
+
+    queue = ctx.Queue()
+    ready = ctx.Semaphore(0)
+    go = ctx.Event()
+    procs = [ctx.Process(target=_worker, args=(db_path, profile, threads, rows, ready, go, queue))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        ready.acquire()
+
+    start = time.perf_counter()
+    go.set()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = [l for r in results for l in r["latencies"]]
+    errors = [e for r in results for e in r["errors"]]
+    return {
+        "profile": profile,
+        "workers": workers,
+        "threads_per_worker": threads,
+        "attempted_commits": workers * threads * rows,
+        "successful_commits": len(latencies),
+        "locked_errors": sum(1 for e in errors if "locked" in e),
+        "other_errors": sum(1 for e in errors if "locked" not in e),
+        "elapsed_s": round(elapsed, 3),
+        "commits_per_s": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "commit_latency_ms": {
+            "p50": round(_percentile(latencies, 50) * 1000, 2) if latencies else None,
+            "p95": round(_percentile(latencies, 95) * 1000, 2) if latencies else None,
+            "p99": round(_percentile(latencies, 99) * 1000, 2) if latencies else None
+        },
+        "sample_errors": errors[:3]
+    }
+
+
+def _init_schema(db_path, profile):
+    _configure_env(db_path, profile)
+    from app import create_app
+    create_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="processes, like gunicorn -w")
+    parser.add_argument("--threads", type=int, default=4, help="threads per process, like gunicorn --threads")
+    parser.add_argument("--rows", type=int, default=200, help="commits per thread")
+    parser.add_argument("--profiles", default="default,production")
+    parser.add_argument("--dir", help="directory for the scratch databases (avoid tmpfs to measure real fsync cost)")
+    parser.add_argument("--output", help="also write the JSON report to this path")
+    args = parser.parse_args()
+
+    report = [run_profile(p.strip(), args.workers, args.threads, args.rows, args.dir) for p in args.profiles.split(",")]
+    if len(report) == 2 and report[0]["commits_per_s"]:
+        report.append({"speedup": round(report[1]["commits_per_s"] / report[0]["commits_per_s"], 2)})
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Cold-start budget check: import time, create_app() and the first request, in fresh interpreters.
+
+Each run starts a new `python -X importtime` process against a scratch database, which imports
+app, calls create_app() and serves GET / through the test client, then reports the phase timings
+and which heavy optional modules were loaded. Those must stay lazy (imported on first use, or by
+WARMUP in config.py), so any of them showing up after startup fails the check.
+
+    python benchmarks/startup_time.py --runs 5 --budget-ms 1200
+    python benchmarks/startup_time.py --baseline instance/benchmarks/startup-20261019T101500.json
+
+Exits non-zero when the median startup exceeds --budget-ms, is more than --tolerance slower than
+--baseline, or a lazy module was imported.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.api_suite import _git_commit
+
+# Must not be imported by create_app() or GET /
+LAZY_MODULES = ('google.generativeai', 'reportlab', 'joblib', 'sklearn')
+
+_PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/')
+served = time.perf_counter()
+print("STARTUP " + json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - created) * 1000,
+    "total_ms": (served - started) * 1000,
+    "status": response.status_code,
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+"""
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def parse_importtime(stderr, top=15):
+    """Modules imported at the top two nesting levels, by cumulative time, from -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match and len(match.group(3)) <= 2:  # two spaces per nesting level
+            modules.append((match.group(4), int(match.group(2))))
+    modules.sort(key=lambda m: m[1], reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in modules[:top]]
+
+
+def run_once(workdir, extra_env=None):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        'GEMINI_API_KEY': '',
+        'REPORT_CACHE_DIR': os.path.join(workdir, 'report_cache'),
+        'PYTHONPATH': BACKEND_DIR,
+    })
+    env.update(extra_env or {})
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', _PROBE % (LAZY_MODULES,)],
+                             cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120)
+    for line in process.stdout.splitlines():
+        if line.startswith("STARTUP "):
+            result = json.loads(line[len("STARTUP "):])
+            result["slowest_imports"] = parse_importtime(process.stderr)
+            return result
+    raise RuntimeError(f"startup probe failed (exit {process.returncode}):\n{process.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, help="fail when the median total exceeds this")
+    parser.add_argument("--baseline", help="earlier startup-*.json to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs the baseline (0.2 = 20%%)")
+    parser.add_argument("--warmup", default='', help="WARMUP value for the probe (default: none)")
+    parser.add_argument("--output", help="result JSON path (default: instance/benchmarks/startup-<timestamp>.json)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="startup-")
+    try:
+        runs = [run_once(workdir, {'WARMUP': args.warmup}) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = {phase: round(statistics.median(r[phase] for r in runs), 1)
+               for phase in ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms')}
+    loaded = sorted({m for r in runs for m in r['loaded']})
+    print(f"median over {args.runs} runs: import {summary['import_ms']} ms, create_app {summary['create_app_ms']} ms, "
+          f"first request {summary['first_request_ms']} ms, total {summary['total_ms']} ms")
+    print("slowest imports (last run):")
+    for entry in runs[-1]['slowest_imports'][:10]:
+        print(f"  {entry['cumulative_ms']:>8} ms  {entry['module']}")
+
+    failures = []
+    if loaded and not args.warmup:
+        failures.append(f"lazy modules imported at startup: {', '.join(loaded)}")
+    if args.budget_ms is not None and summary['total_ms'] > args.budget_ms:
+        failures.append(f"total {summary['total_ms']} ms is over the {args.budget_ms} ms budget")
+    if args.baseline:
+        with open(args.baseline) as f:
+            previous = json.load(f)['median']['total_ms']
+        if summary['total_ms'] > previous * (1 + args.tolerance):
+            failures.append(f"total {summary['total_ms']} ms is more than {args.tolerance:.0%} over "
+                            f"the baseline {previous} ms")
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "warmup": args.warmup,
+        "median": summary,
+        "lazy_modules_loaded": loaded,
+        "runs": runs,
+        "failures": failures,
+    }
+    output = args.output or os.path.join(BACKEND_DIR, 'instance', 'benchmarks',
+                                         f"startup-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {output}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Local stand-ins for the climate data providers ClimateEngine calls.
+
+Each provider gets its own HTTP server on 127.0.0.1 that answers with a payload shaped like
+the real API (Open-Meteo returns the full 24 years of daily temperatures, so response parsing
+costs the same), after a configurable latency, and fails a configurable share of requests with
+a 503 so the fallback paths are exercised too.
+
+Run standalone and point a server at it through the *_URL environment variables it prints:
+
+    python benchmarks/stub_providers.py --latency 80 --jitter 40 --failure-rate 0.02
+    python benchmarks/stub_providers.py --latency overpass=400 --failure-rate nominatim=0.1
+
+or use StubProviders from another benchmark (see benchmarks/api_suite.py).
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from functools import lru_cache
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# provider -> (environment variable / ClimateEngine attribute, path served)
+PROVIDERS = {
+    "nominatim": ("NOMINATIM_URL", "/search"),
+    "open_meteo": ("OPEN_METEO_URL", "/v1/archive"),
+    "overpass": ("OVERPASS_URL", "/api/interpreter"),
+    "nasa_power": ("NASA_POWER_URL", "/api/temporal/climatology/point"),
+    "elevation": ("ELEVATION_URL", "/api/v1/lookup"),
+}
+
+# Rough medians of the public services, used when no latency is given
+DEFAULT_LATENCY_MS = {
+    "nominatim": 250,
+    "open_meteo": 400,
+    "overpass": 900,
+    "nasa_power": 600,
+    "elevation": 300,
+}
+
+
+def _seed(*parts):
+    return int(hashlib.md5(":".join(str(p) for p in parts).encode()).hexdigest()[:8], 16)
+
+
+def _open_meteo_days():
+    days, day = [], date(2000, 1, 1)
+    while day <= date(2023, 12, 31):
+        days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+class _Payloads:
+    """Realistic response bodies, deterministic per coordinate so runs are comparable."""
+    _days = None
+
+    @classmethod
+    def build(cls, provider, query, body):
+        lat = float(query.get('latitude', ['0'])[0])
+        lon = float(query.get('longitude', ['0'])[0])
+        if provider == 'nominatim':
+            q = query.get('q', [''])[0]
+            rng = random.Random(_seed(q))
+            return [{
+                "lat": f"{rng.uniform(-40, 60):.7f}",
+                "lon": f"{rng.uniform(-120, 150):.7f}",
+                "display_name": f"{q}, Stub Region, Stubland"
+            }]
+        if provider == 'open_meteo':
+            if cls._days is None:
+                cls._days = _open_meteo_days()
+            rng = random.Random(_seed(round(lat, 2), round(lon, 2)))
+            base = 30 - abs(lat) * 0.4
+            temps = [round(base + 0.03 * (i / 365.25) + rng.uniform(-4, 4), 1) for i in range(len(cls._days))]
+            return {
+                "latitude": lat, "longitude": lon, "timezone": "GMT",
+                "daily_units": {"time": "iso8601", "temperature_2m_mean": "°C"},
+                "daily": {"time": cls._days, "temperature_2m_mean": temps}
+            }
+        if provider == 'overpass':
+            rng = random.Random(_seed(body))
+            kinds = [("landuse", "forest"), ("natural", "wood"), ("natural", "water"),
+                     ("landuse", "residential"), ("landuse", "commercial")]
+            return {
+                "version": 0.6, "generator": "stub-overpass",
+                "elements": [
+                    {"type": "count", "id": i, "tags": {"count": str(rng.randint(1, 40)), key: value}}
+                    for i, (key, value) in enumerate(kinds) if rng.random() < 0.8
+                ]
+            }
+        if provider == 'nasa_power':
+            rng = random.Random(_seed(round(lat, 2), round(lon, 2)))
+            return {"type": "Feature", "properties": {"parameter": {"PRECTOTCORR": {"point": round(rng.uniform(0.5, 9.0), 2)}}}}
+        if provider == 'elevation':
+            location = query.get('locations', ['0,0'])[0]
+            rng = random.Random(_seed(location))
+            return {"results": [{"elevation": round(rng.uniform(0, 400), 1)}]}
+        return {}
+
+    @classmethod
+    @lru_cache(maxsize=2048)
+    def encoded(cls, provider, query, body):
+        return json.dumps(cls.build(provider, parse_qs(query), body)).encode('utf-8')
+
+
+class StubProvider:
+    """One provider's stand-in server: latency (ms, +/- uniform jitter) and a 503 failure rate."""
+
+    def __init__(self, name, latency_ms=None, jitter_ms=0.0, failure_rate=0.0, port=0):
+        self.name = name
+        self.latency_ms = DEFAULT_LATENCY_MS[name] if latency_ms is None else latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(_seed(name))
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{PROVIDERS[self.name][1]}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _respond(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8', 'replace') if length else ''
+                with stub._lock:
+                    stub.requests += 1
+                    delay = max(0.0, stub.latency_ms + stub._rng.uniform(-stub.jitter_ms, stub.jitter_ms))
+                    failed = stub._rng.random() < stub.failure_rate
+                    if failed:
+                        stub.failures += 1
+                time.sleep(delay / 1000.0)
+
+                if failed:
+                    status, content_type, data = 503, 'text/html', b"<html><body>503 Service Unavailable</body></html>"
+                elif parsed.path != PROVIDERS[stub.name][1]:
+                    status, content_type, data = 404, 'application/json', b'{"error": "not found"}'
+                else:
+                    status, content_type, data = 200, 'application/json', _Payloads.encoded(stub.name, parsed.query, body)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name=f"stub-{self.name}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubProviders:
+    """All provider stand-ins. latency_ms / jitter_ms / failure_rate are a number for every provider or a {name: value} dict."""
+
+    def __init__(self, latency_ms=None, jitter_ms=0.0, failure_rate=0.0):
+        def pick(value, name, default):
+            if isinstance(value, dict):
+                return value.get(name, default)
+            return default if value is None else value
+
+        self.stubs = {
+            name: StubProvider(
+                name,
+                latency_ms=pick(latency_ms, name, DEFAULT_LATENCY_MS[name]),
+                jitter_ms=pick(jitter_ms, name, 0.0),
+                failure_rate=pick(failure_rate, name, 0.0)
+            )
+            for name in PROVIDERS
+        }
+
+    def start(self):
+        for stub in self.stubs.values():
+            stub.start()
+        return self
+
+    def stop(self):
+        for stub in self.stubs.values():
+            stub.stop()
+
+    def env(self):
+        """Environment variables that point ClimateEngine at the stand-ins (see PROVIDER_URLS in config.py)."""
+        return {PROVIDERS[name][0]: stub.url for name, stub in self.stubs.items()}
+
+    def config(self):
+        return {
+            name: {"latency_ms": stub.latency_ms, "jitter_ms": stub.jitter_ms, "failure_rate": stub.failure_rate}
+            for name, stub in self.stubs.items()
+        }
+
+    def stats(self):
+        return {name: {"requests": stub.requests, "failures": stub.failures} for name, stub in self.stubs.items()}
+
+
+def parse_setting(values, kind=float):
+    """
+    ["80"] -> 80.0 for every provider; ["overpass=400", "nominatim=50"] -> per-provider dict.
+    Returns None when nothing was given.
+    """
+    if not values:
+        return None
+    result = {}
+    for value in values:
+        if '=' not in value:
+            return kind(value)
+        name, number = value.split('=', 1)
+        if name not in PROVIDERS:
+            raise argparse.ArgumentTypeError(f"unknown provider '{name}' (expected one of {', '.join(PROVIDERS)})")
+        result[name] = kind(number)
+    return result
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", nargs='*', metavar="MS|PROVIDER=MS",
+                        help="mean provider latency in ms (default: rough public medians)")
+    parser.add_argument("--jitter", nargs='*', metavar="MS|PROVIDER=MS", help="uniform +/- jitter in ms")
+    parser.add_argument("--failure-rate", nargs='*', metavar="P|PROVIDER=P", help="share of requests answered with 503")
+
+
+def from_arguments(args):
+    return StubProviders(
+        latency_ms=parse_setting(args.latency),
+        jitter_ms=parse_setting(args.jitter) or 0.0,
+        failure_rate=parse_setting(args.failure_rate) or 0.0
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    stubs = from_arguments(args).start()
+    for key, url in stubs.env().items():
+        print(f"export {key}={url}")
+    print(json.dumps(stubs.config(), indent=2))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stubs.stop()
+
+
+if __name__ == "__main__":
+    main()
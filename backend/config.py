@@ -1,10 +1,166 @@
+import json
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///climate_engine.db')
+
+# 'production' enables WAL journaling and connection pragmas for multi-worker gunicorn; deployments
+# opt in with SQLITE_PROFILE=production. 'default' leaves SQLite in rollback-journal mode.
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'default')
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000))
+
+def _engine_options(url, profile):
+    if not url.startswith('sqlite') or profile != 'production':
+        return {}
+    return {
+        # pysqlite's own lock wait, in seconds; the busy_timeout pragma covers the same ground
+        "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000.0, "check_same_thread": False},
+        "pool_size": int(os.environ.get('SQLITE_POOL_SIZE', 10)),
+        "max_overflow": int(os.environ.get('SQLITE_MAX_OVERFLOW', 20)),
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": 3600
+    }
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key')
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///climate_engine.db')
+    SQLALCHEMY_DATABASE_URI = DATABASE_URL
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(DATABASE_URL, SQLITE_PROFILE)
+
+    # Applied to every pooled SQLite connection when SQLITE_PROFILE=production
+    SQLITE_PROFILE = SQLITE_PROFILE
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "synchronous": os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        "cache_size": int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),    # negative = KiB, i.e. 64 MB
+        "mmap_size": int(os.environ.get('SQLITE_MMAP_SIZE', 268435456)),   # 256 MB
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000
+    }
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-dev-secret-key')
+
+    # Background bulk analysis jobs
+    BULK_JOB_WORKERS = int(os.environ.get('BULK_JOB_WORKERS', 8))
+    BULK_JOB_MAX_ROWS = int(os.environ.get('BULK_JOB_MAX_ROWS', 50000))
+    BULK_JOBS_RESUME_ON_START = os.environ.get('BULK_JOBS_RESUME_ON_START', 'false').lower() == 'true'
+
+    # Re-scoring jobs after a model retrain or scoring profile change
+    RESCORING_CHUNK_ROWS = int(os.environ.get('RESCORING_CHUNK_ROWS', 5000))
+    RESCORING_RESUME_ON_START = os.environ.get('RESCORING_RESUME_ON_START', 'false').lower() == 'true'
+
+    # Background task queue in the database (services/task_queue.py), run by worker.py processes.
+    # TASK_DISPATCH='queue' hands bulk and re-scoring jobs to the workers instead of web-process threads
+    TASK_DISPATCH = os.environ.get('TASK_DISPATCH', 'thread')
+    TASK_WORKERS = int(os.environ.get('TASK_WORKERS', 2))
+    TASK_POLL_SECONDS = float(os.environ.get('TASK_POLL_SECONDS', 1.0))
+    TASK_MAX_ATTEMPTS = int(os.environ.get('TASK_MAX_ATTEMPTS', 3))
+    TASK_RETRY_BACKOFF = float(os.environ.get('TASK_RETRY_BACKOFF', 30)) # seconds, doubled per attempt
+    TASK_RETRAIN_TIMEOUT = float(os.environ.get('TASK_RETRAIN_TIMEOUT', 3600))
+    TASK_RESULTS_DIR = os.environ.get('TASK_RESULTS_DIR') # default instance/task_results
+
+    # Max concurrent outbound calls per climate data provider, per process
+    PROVIDER_CONCURRENCY = {
+        "nominatim": int(os.environ.get('NOMINATIM_CONCURRENCY', 1)),
+        "open_meteo": int(os.environ.get('OPEN_METEO_CONCURRENCY', 4)),
+        "overpass": int(os.environ.get('OVERPASS_CONCURRENCY', 2)),
+        "nasa_power": int(os.environ.get('NASA_POWER_CONCURRENCY', 4)),
+        "elevation": int(os.environ.get('ELEVATION_CONCURRENCY', 4))
+    }
+
+    # Provider usage policies, paced with a token bucket per provider (requests/second, 0 = unlimited).
+    # RATE_LIMIT_SCOPE 'host' shares each bucket across workers via files in RATE_LIMIT_DIR
+    # (default instance/rate_limits); calls that would queue past PROVIDER_RATE_MAX_WAIT seconds fail over
+    PROVIDER_RATE_LIMITS = {
+        "nominatim": float(os.environ.get('NOMINATIM_RATE', 1)),
+        "open_meteo": float(os.environ.get('OPEN_METEO_RATE', 0)),
+        "overpass": float(os.environ.get('OVERPASS_RATE', 1)),
+        "nasa_power": float(os.environ.get('NASA_POWER_RATE', 0)),
+        "elevation": float(os.environ.get('ELEVATION_RATE', 0))
+    }
+    PROVIDER_RATE_BURST = {
+        "nominatim": int(os.environ.get('NOMINATIM_BURST', 1)),
+        "overpass": int(os.environ.get('OVERPASS_BURST', 2))
+    }
+    RATE_LIMIT_SCOPE = os.environ.get('RATE_LIMIT_SCOPE', 'host')
+    RATE_LIMIT_DIR = os.environ.get('RATE_LIMIT_DIR')
+    PROVIDER_RATE_MAX_WAIT = float(os.environ.get('PROVIDER_RATE_MAX_WAIT', 60))
+
+    # Provider endpoint overrides, e.g. the stand-in servers from benchmarks/stub_providers.py
+    PROVIDER_URLS = {
+        name: os.environ.get(name)
+        for name in ('NOMINATIM_URL', 'OPEN_METEO_URL', 'OVERPASS_URL', 'NASA_POWER_URL', 'ELEVATION_URL')
+    }
+
+    # ASGI serving (asgi.py): pooled provider connections per worker, and threads for Gemini calls
+    ASYNC_MAX_CONNECTIONS = int(os.environ.get('ASYNC_MAX_CONNECTIONS', 200))
+    GEMINI_CONCURRENCY = int(os.environ.get('GEMINI_CONCURRENCY', 16))
+
+    # /api/analyze and /api/analyze-property depth when the caller sends no ?mode= / ?include=
+    # (fast | standard | full, see services/analysis_depth.py)
+    ANALYSIS_DEFAULT_MODE = os.environ.get('ANALYSIS_DEFAULT_MODE', 'full')
+
+    # Dependencies loaded at startup instead of on first use (gemini, reportlab, model, or 'all');
+    # for gunicorn --preload, so workers inherit them from the master
+    WARMUP = os.environ.get('WARMUP', '')
+
+    # Identical concurrent provider/Gemini calls run once: 'process', 'host' (also across workers,
+    # results kept SINGLE_FLIGHT_TTL seconds in SINGLE_FLIGHT_DIR, default instance/single_flight) or 'off'
+    SINGLE_FLIGHT = os.environ.get('SINGLE_FLIGHT', 'host')
+    SINGLE_FLIGHT_DIR = os.environ.get('SINGLE_FLIGHT_DIR')
+    SINGLE_FLIGHT_TTL = float(os.environ.get('SINGLE_FLIGHT_TTL', 30))
+    SINGLE_FLIGHT_WAIT = float(os.environ.get('SINGLE_FLIGHT_WAIT', 30))
+
+    # Provider record/replay (off | record | replay | auto) into PROVIDER_CASSETTE_DIR (default
+    # instance/cassettes); replays wait the recorded time x PROVIDER_REPLAY_TIMING (original | none | factor)
+    PROVIDER_CASSETTE_MODE = os.environ.get('PROVIDER_CASSETTE_MODE', 'off')
+    PROVIDER_CASSETTE_DIR = os.environ.get('PROVIDER_CASSETTE_DIR')
+    PROVIDER_REPLAY_TIMING = os.environ.get('PROVIDER_REPLAY_TIMING', 'original')
+
+    # Analysis persistence: 'sync' commits inside the request, 'write_behind' group-commits in the
+    # background (SQLite only; see services/analysis_writer.py for the durability trade-offs)
+    ANALYSIS_WRITE_MODE = os.environ.get('ANALYSIS_WRITE_MODE', 'sync')
+    WRITE_BEHIND_DURABILITY = os.environ.get('WRITE_BEHIND_DURABILITY', 'journal') # journal | memory
+    WRITE_BEHIND_FLUSH_MS = int(os.environ.get('WRITE_BEHIND_FLUSH_MS', 5))
+    WRITE_BEHIND_MAX_BATCH = int(os.environ.get('WRITE_BEHIND_MAX_BATCH', 500))
+    WRITE_BEHIND_ID_BLOCK = int(os.environ.get('WRITE_BEHIND_ID_BLOCK', 100))
+    WRITE_BEHIND_JOURNAL_DIR = os.environ.get('WRITE_BEHIND_JOURNAL_DIR')
+
+    # Encoded /api/results bodies kept per process, revalidated against the row mutation counter
+    RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 2048))
+    RESULT_COMPRESS_MIN_BYTES = int(os.environ.get('RESULT_COMPRESS_MIN_BYTES', 512))
+
+    # Rendered property PDFs (default: <instance>/report_cache), evicted LRU past the size limit
+    REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR')
+    REPORT_CACHE_MAX_MB = int(os.environ.get('REPORT_CACHE_MAX_MB', 256))
+    REPORT_PRERENDER = os.environ.get('REPORT_PRERENDER', 'false').lower() == 'true'
+    REPORT_PRERENDER_WORKERS = int(os.environ.get('REPORT_PRERENDER_WORKERS', 1))
+
+    # Batch report ZIPs: reports per request and render processes (default: one per core)
+    REPORT_BATCH_MAX = int(os.environ.get('REPORT_BATCH_MAX', 2000))
+    REPORT_BATCH_WORKERS = int(os.environ.get('REPORT_BATCH_WORKERS', 0)) or None
+
+    # Named warming scenarios for /api/portfolio/stress-test as JSON {name: shocks};
+    # unset uses the +1.5C / +2C / +3C defaults in services/stress_testing.py
+    STRESS_SCENARIOS = json.loads(os.environ['STRESS_SCENARIOS']) if os.environ.get('STRESS_SCENARIOS') else None
+
+    # Monte Carlo loss simulation: draws per API request and simulation processes (default: one per core)
+    LOSS_SIM_MAX_DRAWS = int(os.environ.get('LOSS_SIM_MAX_DRAWS', 100000))
+    LOSS_SIM_WORKERS = int(os.environ.get('LOSS_SIM_WORKERS', 0)) or None
+
+    # Scoring profiles (score weights + loan bands per lending policy), reloaded when the file changes;
+    # unset uses backend/scoring_profiles.json
+    SCORING_PROFILES_PATH = os.environ.get('SCORING_PROFILES_PATH')
+
+    # Sampled request profiling: a PROFILING_SAMPLE_RATE share of requests when enabled, plus any
+    # request sent with "X-Profile: <PROFILING_TOKEN>". Folded stacks go to PROFILING_DIR
+    # (default instance/profiles), newest PROFILING_MAX_FILES kept, browsable at /api/profiles.
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0.01))
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+    PROFILING_INTERVAL_MS = float(os.environ.get('PROFILING_INTERVAL_MS', 5))
+    PROFILING_DIR = os.environ.get('PROFILING_DIR')
+    PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', 200))
@@ -1,8 +1,43 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, text
 
 db = SQLAlchemy()
 
+def _apply_sqlite_pragmas(engine, pragmas):
+    # journal_mode=WAL is persistent in the database file, but the rest are per connection
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def _add_missing_columns(engine):
+    # create_all() only creates missing tables; new nullable model columns are added in place
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"Added column {table.name}.{column.name}")
+            except Exception as e:
+                # Another worker booting at the same time may have added it first
+                print(f"Could not add column {table.name}.{column.name}: {e}")
+
 def init_db(app):
     db.init_app(app)
     with app.app_context():
+        engine = db.engine
+        if (engine.dialect.name == 'sqlite' and app.config.get('SQLITE_PROFILE') == 'production'
+                and engine.url.database not in (None, '', ':memory:')):
+            _apply_sqlite_pragmas(engine, app.config.get('SQLITE_PRAGMAS', {}))
+        _add_missing_columns(engine)
         db.create_all()
@@ -0,0 +1,51 @@
+"""
+Exports property_analyses to CSV, Parquet or Arrow IPC for the risk warehouse.
+
+    python export_portfolio.py --format parquet --output book.parquet
+    python export_portfolio.py --format csv --user-id 3 --output -  > user3.csv
+"""
+import argparse
+import contextlib
+import sys
+import time
+
+from app import create_app
+from services.export_service import ExportService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=list(ExportService.FORMATS), default="parquet")
+    parser.add_argument("--output", help="file to write, or - for stdout (default: portfolio_export.<format>)")
+    parser.add_argument("--user-id", type=int, help="only export this user's portfolio")
+    parser.add_argument("--chunk-rows", type=int, default=ExportService.CHUNK_ROWS)
+    parser.add_argument("--include-insights", action="store_true", help="include the ai_insights text column")
+    args = parser.parse_args()
+
+    if not ExportService.available(args.format):
+        parser.error(f"{args.format} export requires pyarrow (pip install pyarrow)")
+
+    output = args.output or f"portfolio_export.{ExportService.FORMATS[args.format][1]}"
+    kwargs = dict(user_id=args.user_id, include_insights=args.include_insights, chunk_rows=args.chunk_rows)
+
+    # With --output -, stdout carries only the export; the app's startup messages go to stderr
+    out = sys.stdout.buffer
+    with contextlib.redirect_stdout(sys.stderr) if output == "-" else contextlib.nullcontext():
+        app = create_app()
+        with app.app_context():
+            start = time.perf_counter()
+            if output == "-":
+                written = 0
+                for data in ExportService.stream(args.format, **kwargs):
+                    out.write(data)
+                    written += len(data)
+                out.flush()
+            else:
+                written = ExportService.write_file(args.format, output, **kwargs)
+            elapsed = time.perf_counter() - start
+
+    print(f"Exported {written} bytes as {args.format} to {output} in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Renders property reports in parallel into a single ZIP archive.
+
+    python generate_reports.py --ids 1,2,3 --output reports.zip
+    python generate_reports.py --user-id 4 --risk-level High --workers 8
+    python generate_reports.py --all --output book.zip
+"""
+import argparse
+import os
+import sys
+import time
+
+
+def main():
+    # Imported here so spawned render workers, which re-import this script, stay lightweight
+    from app import create_app
+    from services.batch_report_service import BatchReportService
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ids", help="comma-separated analysis ids")
+    parser.add_argument("--all", action="store_true", help="every analysis (subject to --risk-level/--max-score)")
+    parser.add_argument("--user-id", type=int, help="only this user's portfolio")
+    parser.add_argument("--risk-level", help="e.g. High")
+    parser.add_argument("--max-score", type=float, help="only scores at or below this")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="render processes")
+    parser.add_argument("--max-reports", type=int, help="override REPORT_BATCH_MAX")
+    parser.add_argument("--output", default="Climate_Reports.zip")
+    args = parser.parse_args()
+
+    if not (args.ids or args.all or args.user_id):
+        parser.error("one of --ids, --user-id or --all is required")
+    ids = [int(i) for i in args.ids.split(",")] if args.ids else None
+
+    app = create_app()
+    if args.max_reports:
+        BatchReportService.max_reports = args.max_reports
+
+    with app.app_context():
+        rows = BatchReportService.load_rows(ids=ids, user_id=args.user_id,
+                                            risk_level=args.risk_level, max_score=args.max_score)
+    if not rows:
+        sys.exit("No matching analyses")
+    if len(rows) > BatchReportService.max_reports:
+        sys.exit(f"{len(rows)}+ reports requested; raise --max-reports (currently {BatchReportService.max_reports})")
+
+    start = time.perf_counter()
+    written = 0
+    with open(args.output, "wb") as f:
+        for data in BatchReportService.stream_zip(rows, workers=args.workers):
+            f.write(data)
+            written += len(data)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(rows)} reports -> {args.output} ({written / 1e6:.1f} MB) in {elapsed:.2f}s "
+          f"= {len(rows) / elapsed:.1f} reports/s with {args.workers} workers")
+
+
+if __name__ == "__main__":
+    main()
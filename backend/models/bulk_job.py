@@ -0,0 +1,80 @@
+from database import db
+from datetime import datetime
+
+class BulkAnalysisJob(db.Model):
+    __tablename__ = 'bulk_analysis_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    status = db.Column(db.String(20), default='queued', nullable=False) # queued | running | completed | failed | cancelled
+    include_explanations = db.Column(db.Boolean, default=False, nullable=False)
+
+    total_rows = db.Column(db.Integer, default=0, nullable=False)
+    completed_rows = db.Column(db.Integer, default=0, nullable=False)
+    failed_rows = db.Column(db.Integer, default=0, nullable=False)
+
+    # Checkpoint bookkeeping: the run that currently owns the job and when it last reported in
+    owner = db.Column(db.String(64), nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    run_started_at = db.Column(db.DateTime, nullable=True)
+    run_start_completed = db.Column(db.Integer, default=0, nullable=False)
+
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    rows = db.relationship('BulkAnalysisRow', backref='job', lazy='dynamic', cascade='all, delete-orphan')
+
+    def to_dict(self):
+        processed = self.completed_rows + self.failed_rows
+        now = self.finished_at or datetime.utcnow()
+
+        throughput = 0.0
+        if self.run_started_at:
+            elapsed = max((now - self.run_started_at).total_seconds(), 1e-6)
+            throughput = (self.completed_rows - self.run_start_completed) / elapsed
+
+        remaining = self.total_rows - processed
+        eta = round(remaining / throughput, 1) if throughput > 0 and self.status == 'running' else None
+
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total_rows": self.total_rows,
+            "completed_rows": self.completed_rows,
+            "failed_rows": self.failed_rows,
+            "progress": round(processed / self.total_rows, 4) if self.total_rows else 1.0,
+            "throughput_rows_per_sec": round(throughput, 3),
+            "eta_seconds": eta,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "run_started_at": self.run_started_at.isoformat() if self.run_started_at else None,
+            "heartbeat_at": self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class BulkAnalysisRow(db.Model):
+    __tablename__ = 'bulk_analysis_rows'
+    __table_args__ = (db.Index('ix_bulk_rows_job_status', 'job_id', 'status'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('bulk_analysis_jobs.id'), nullable=False)
+    row_index = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False) # pending | done | failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    analysis_id = db.Column(db.Integer, db.ForeignKey('property_analyses.id'), nullable=True)
+    climate_score = db.Column(db.Float, nullable=True)
+    risk_level = db.Column(db.String(50), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "row_index": self.row_index,
+            "status": self.status,
+            "analysis_id": self.analysis_id,
+            "climate_score": self.climate_score,
+            "risk_level": self.risk_level,
+            "error": self.error
+        }
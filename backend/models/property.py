@@ -3,6 +3,7 @@ from datetime import datetime
 
 class PropertyAnalysis(db.Model):
     __tablename__ = 'property_analyses'
+    __table_args__ = (db.Index('ix_property_analyses_lat_lon', 'latitude', 'longitude'),)
     
     id = db.Column(db.Integer, primary_key=True)
     property_name = db.Column(db.String(150), nullable=False)
@@ -38,6 +39,10 @@ class PropertyAnalysis(db.Model):
     loan_recommendation = db.Column(db.JSON, nullable=True) 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # What produced climate_score: ClimateModel.version() (or 'formula') and the scoring profile tag
+    model_version = db.Column(db.String(64), nullable=True)
+    policy_version = db.Column(db.String(120), nullable=True)
+
     def to_dict(self):
         return {
             "analysis_id": self.id,
@@ -71,5 +76,21 @@ class PropertyAnalysis(db.Model):
             "projections": self.projections,
             "ai_insights": self.ai_insights,
             "loan_recommendation": self.loan_recommendation,
+            "model_version": self.model_version,
+            "policy_version": self.policy_version,
             "created_at": self.created_at.isoformat()
         }
+
+    def to_point(self):
+        """Lightweight shape for map layers."""
+        return {
+            "id": self.id,
+            "property_name": self.property_name,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "climate_score": self.climate_score,
+            "ml_risk_score": self.ml_risk_score,
+            "overall_risk_score": self.overall_risk_score,
+            "risk_level": self.risk_level,
+            "asset_value": self.asset_value
+        }
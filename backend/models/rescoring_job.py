@@ -0,0 +1,75 @@
+from database import db
+from datetime import datetime
+
+class RescoringJob(db.Model):
+    __tablename__ = 'rescoring_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), default='queued', nullable=False) # queued | running | completed | failed | cancelled
+
+    # Versions the job scores with; rows already tagged with both are skipped
+    profile = db.Column(db.String(80), nullable=False)
+    model_version = db.Column(db.String(64), nullable=False)
+    policy_version = db.Column(db.String(120), nullable=False)
+    chunk_rows = db.Column(db.Integer, default=5000, nullable=False)
+
+    total_rows = db.Column(db.Integer, default=0, nullable=False)
+    scanned_rows = db.Column(db.Integer, default=0, nullable=False)
+    changed_rows = db.Column(db.Integer, default=0, nullable=False)
+    retagged_rows = db.Column(db.Integer, default=0, nullable=False)
+
+    # Checkpoint: every stale row with id <= last_id has been scored
+    last_id = db.Column(db.Integer, default=0, nullable=False)
+    owner = db.Column(db.String(64), nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    run_started_at = db.Column(db.DateTime, nullable=True)
+    run_start_scanned = db.Column(db.Integer, default=0, nullable=False)
+
+    # Cumulative time spent per stage, for throughput reporting
+    read_seconds = db.Column(db.Float, default=0.0, nullable=False)
+    score_seconds = db.Column(db.Float, default=0.0, nullable=False)
+    write_seconds = db.Column(db.Float, default=0.0, nullable=False)
+
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        now = self.finished_at or datetime.utcnow()
+
+        throughput = 0.0
+        if self.run_started_at:
+            elapsed = max((now - self.run_started_at).total_seconds(), 1e-6)
+            throughput = (self.scanned_rows - self.run_start_scanned) / elapsed
+
+        remaining = max(0, self.total_rows - self.scanned_rows)
+        eta = round(remaining / throughput, 1) if throughput > 0 and self.status == 'running' else None
+
+        def stage_rate(seconds):
+            return round(self.scanned_rows / seconds, 1) if seconds else None
+
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "profile": self.profile,
+            "model_version": self.model_version,
+            "policy_version": self.policy_version,
+            "total_rows": self.total_rows,
+            "scanned_rows": self.scanned_rows,
+            "changed_rows": self.changed_rows,
+            "retagged_rows": self.retagged_rows,
+            "last_id": self.last_id,
+            "progress": round(min(1.0, self.scanned_rows / self.total_rows), 4) if self.total_rows else 1.0,
+            "throughput_rows_per_sec": round(throughput, 1),
+            "stage_rows_per_sec": {
+                "read": stage_rate(self.read_seconds),
+                "score": stage_rate(self.score_seconds),
+                "write": stage_rate(self.write_seconds)
+            },
+            "eta_seconds": eta,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "run_started_at": self.run_started_at.isoformat() if self.run_started_at else None,
+            "heartbeat_at": self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,58 @@
+from database import db
+from datetime import datetime
+
+class Task(db.Model):
+    __tablename__ = 'tasks'
+    # Workers pick the highest-priority due task, oldest first; a dedupe_key is unique among active tasks
+    __table_args__ = (
+        db.Index('ix_tasks_ready', 'status', 'priority', 'run_at'),
+        db.Index('uq_tasks_active_dedupe_key', 'dedupe_key', unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'running')"),
+                 postgresql_where=db.text("status IN ('queued', 'running')")),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False, index=True)
+    status = db.Column(db.String(20), default='queued', nullable=False) # queued | running | succeeded | failed | cancelled
+    priority = db.Column(db.Integer, default=0, nullable=False) # higher runs first
+    payload = db.Column(db.JSON, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    # At most one queued or running task per key (e.g. one per bulk job)
+    dedupe_key = db.Column(db.String(120), nullable=True, index=True)
+
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False) # not before; pushed back between retries
+
+    owner = db.Column(db.String(64), nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        runtime = None
+        if self.started_at:
+            runtime = round(((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds(), 3)
+        return {
+            "task_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "priority": self.priority,
+            "payload": self.payload,
+            # The file itself is served by GET /api/tasks/<id>/file, not its server path
+            "result": {k: v for k, v in self.result.items() if k != 'file'} if isinstance(self.result, dict) else self.result,
+            "file_url": f"/api/tasks/{self.id}/file" if isinstance(self.result, dict) and self.result.get('file') else None,
+            "error": self.error,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "run_at": self.run_at.isoformat() if self.run_at else None,
+            "owner": self.owner,
+            "heartbeat_at": self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "runtime_seconds": runtime
+        }
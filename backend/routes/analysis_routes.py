@@ -1,44 +1,21 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.property import PropertyAnalysis
-from services.climate_engine import ClimateEngine
-from services.report_service import ReportService
+from services.climate_engine import ClimateEngine, gemini
+from services.analysis_pipeline import (
+    apply_ml_score, build_analysis_record, log_training_row
+)
+from services.analysis_writer import AnalysisWriter
+from services.analysis_stream import AnalysisStream
+from services.analysis_depth import AnalysisDepth, InvalidDepth
+from services.result_serializer import ResultSerializer
+from services.report_cache import ReportCache
+from services.batch_report_service import BatchReportService
+from services.scoring_profiles import ScoringProfiles, UnknownProfile
+from services.request_profiler import profile_stage
 from database import db
-import google.generativeai as genai
 import os
 import requests
-import csv
-import joblib
-
-def calculate_loan_pricing(climate_score):
-    base_rate = 8.0
-    try:
-        score = float(climate_score)
-    except (ValueError, TypeError):
-        score = 0.0
-
-    if score >= 80:
-        adjustment = -0.5
-        approval = "Approved"
-        risk_category = "Low Risk"
-    elif score >= 60:
-        adjustment = 1.0
-        approval = "Conditional Approval"
-        risk_category = "Moderate Risk"
-    elif score >= 40:
-        adjustment = 2.5
-        approval = "High Risk Review"
-        risk_category = "Elevated Risk"
-    else:
-        adjustment = 4.0
-        approval = "Rejected"
-        risk_category = "Severe Climate Risk"
-        
-    return {
-        "interest_rate": round(base_rate + adjustment, 2),
-        "approval_status": approval,
-        "risk_category": risk_category
-    }
 
 analysis_bp = Blueprint('analysis', __name__)
 
@@ -46,8 +23,27 @@ analysis_bp = Blueprint('analysis', __name__)
 
 @analysis_bp.route('/report/<int:analysis_id>', methods=['GET'])
 def download_report(analysis_id):
-    analysis = PropertyAnalysis.query.get_or_404(analysis_id)
-    pdf_buffer = ReportService.generate_property_report(analysis)
+    analysis = AnalysisWriter.pending(analysis_id) or PropertyAnalysis.query.get_or_404(analysis_id)
+    path, digest = ReportCache.get_path(analysis)
+
+    # Served from disk through the WSGI file wrapper, with ETag and Range support
+    if path:
+        try:
+            return send_file(
+                path,
+                mimetype='application/pdf',
+                as_attachment=True,
+                download_name=f"Climate_Report_{analysis_id}.pdf",
+                etag=digest,
+                conditional=True,
+                max_age=0
+            )
+        except FileNotFoundError:
+            pass  # evicted between lookup and open; render in memory instead
+
+    from services.report_service import ReportService
+    with profile_stage("reportlab"):
+        pdf_buffer = ReportService.generate_property_report(analysis)
     
     return send_file(
         pdf_buffer,
@@ -56,6 +52,47 @@ def download_report(analysis_id):
         download_name=f"Climate_Report_{analysis_id}.pdf"
     )
 
+@analysis_bp.route('/reports/batch', methods=['POST'])
+@jwt_required(optional=True)
+def download_report_batch():
+    """
+    Streams a ZIP of property reports. Body: {"ids": [...]} and/or a portfolio filter
+    {"portfolio": true, "risk_level": "High", "max_score": 50}.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if ids is None and not data.get('portfolio'):
+        return jsonify({"error": "Provide 'ids' or 'portfolio': true"}), 400
+    if ids is not None:
+        try:
+            if not isinstance(ids, list):
+                raise TypeError
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            return jsonify({"error": "'ids' must be a list of analysis ids"}), 400
+
+    try:
+        max_score = float(data['max_score']) if data.get('max_score') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "'max_score' must be a number"}), 400
+
+    rows = BatchReportService.load_rows(
+        ids=ids,
+        user_id=get_jwt_identity() if data.get('portfolio') else None,
+        risk_level=data.get('risk_level'),
+        max_score=max_score
+    )
+    if not rows:
+        return jsonify({"error": "No matching analyses"}), 404
+    if len(rows) > BatchReportService.max_reports:
+        return jsonify({"error": f"At most {BatchReportService.max_reports} reports per batch"}), 400
+
+    return Response(
+        BatchReportService.stream_zip(rows),
+        mimetype='application/zip',
+        headers={"Content-Disposition": "attachment; filename=Climate_Reports.zip"}
+    )
+
 @analysis_bp.route('/ai-chat', methods=['POST'])
 def ai_chat():
     import logging
@@ -97,6 +134,7 @@ def ai_chat():
             }), 500
 
         logger.info("Initializing Google Gemini API...")
+        genai = gemini()
         genai.configure(api_key=api_key)
         model = genai.GenerativeModel('gemini-2.5-flash')
         
@@ -145,215 +183,105 @@ def ai_chat():
 @analysis_bp.route('/analyze', methods=['POST'])
 def analyze():
     data = request.json
+    try:
+        profile = ScoringProfiles.for_request(data)
+    except UnknownProfile as e:
+        return jsonify({"error": f"Unknown scoring profile: {e.args[0]}"}), 400
+    try:
+        depth = AnalysisDepth.for_request(data)
+    except InvalidDepth as e:
+        return jsonify({"error": str(e)}), 400
+    explain = 'explanation' in depth
     
     # Integrate ClimateEngine analysis
-    analysis_result = ClimateEngine.analyze(data)
+    analysis_result = ClimateEngine.analyze(data, explain=explain, profile=profile, depth=depth)
     
     if "error" in analysis_result:
         return jsonify(analysis_result), 400
 
-    # --- STEP 2: DATA LOGGING ---
-    try:
-        log_file = os.path.join(os.getcwd(), 'ml-earth-engine', 'earth_training_data.csv')
-        # Ensure directory exists if we are running from a different place
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
-        
-        file_exists = os.path.isfile(log_file)
-        with open(log_file, 'a', newline='') as f:
-            writer = csv.writer(f)
-            if not file_exists:
-                writer.writerow(['heat_risk', 'flood_risk', 'storm_risk', 'elevation', 'temperature_trend', 'green_cover_ratio', 'final_climate_score'])
-            
-            writer.writerow([
-                analysis_result['risk_profile']['heat'],
-                analysis_result['risk_profile']['flood'],
-                analysis_result['risk_profile'].get('storm', 0),
-                analysis_result.get('elevation', 45.0),
-                analysis_result.get('temperature_trend', [0.8])[0], # Using first trend value as simplified feature
-                analysis_result.get('environment', {}).get('greenery', 0),
-                analysis_result['climate_score']
-            ])
-    except Exception as e:
-        print(f"ML Logging Error: {e}")
+    # --- STEP 2: DATA LOGGING --- (only rows built from live provider data)
+    if 'live_providers' in depth:
+        log_training_row(analysis_result)
 
     # --- STEP 5 & 6: CONNECT TO ML MODEL & FALLBACK ---
-    ml_score = analysis_result['climate_score'] # Default to original
-    try:
-        model_path = os.path.join(os.getcwd(), 'ml-earth-engine', 'climate_model.pkl')
-        if os.path.exists(model_path):
-            rf_model = joblib.load(model_path)
-            
-            # Match the training features: heat_risk, flood_risk, storm_risk, elevation, temperature_trend, green_cover_ratio
-            features = [[
-                float(analysis_result['risk_profile']['heat']),
-                float(analysis_result['risk_profile']['flood']),
-                float(analysis_result['risk_profile'].get('storm', 0)),
-                float(analysis_result.get('elevation', 45.0)),
-                float(analysis_result.get('temperature_trend', [0.8])[0]),
-                float(analysis_result.get('environment', {}).get('greenery', 0))
-            ]]
-            
-            pred = rf_model.predict(features)[0]
-            ml_score = round(float(pred), 1)
-            analysis_result['climate_score'] = ml_score
-            
-            # REGENERATE AI EXPLANATION WITH NEW ML SCORE
-            new_ai_insight = ClimateEngine._generate_explanation(
-                ml_score, 
-                analysis_result['risk_profile'],
-                analysis_result.get('temperature_projection', []),
-                analysis_result.get('environment', {})
-            )
-            analysis_result['ai_insights'] = new_ai_insight
-            
-            # REGENERATE LOAN RECOMMENDATION WITH NEW ML SCORE
-            new_loan_rec = ClimateEngine._calculate_loan_recommendation(ml_score)
-            analysis_result['loan_recommendation'] = new_loan_rec
-        else:
-            print("Local Model file climate_model.pkl not found, using fallback score.")
-            
-    except Exception as e:
-        print(f"Local ML Prediction failed, falling back to original score: {e}")
-
-    # Fallback/Safe-inject Loan Pricing Logic into the API response
-    if "loan_pricing" not in analysis_result:
-        analysis_result["loan_pricing"] = calculate_loan_pricing(ml_score)
+    apply_ml_score(analysis_result, explain=explain, profile=profile)
 
     # Persist to database for Portfolio
-    analysis = PropertyAnalysis(
-        property_name=data.get('property_id') or analysis_result['location_name'],
-        address=analysis_result['location_name'],
-        latitude=analysis_result['coordinates'][0],
-        longitude=analysis_result['coordinates'][1],
-        asset_value=float(data.get('asset_value', 0)),
-        loan_term=int(data.get('loan_term', 30)),
-        climate_score=analysis_result['climate_score'],
-        risk_level=analysis_result['loan_recommendation']['risk_level'],
-        
-        # Explicit Structural DB mappings
-        heat_risk=analysis_result['risk_profile']['heat'],
-        flood_risk=analysis_result['risk_profile']['flood'],
-        storm_risk=analysis_result['risk_profile'].get('storm', 0),
-        fire_risk=analysis_result['risk_profile'].get('fire', 0),
-        overall_risk_score=analysis_result.get('overall_risk_score', analysis_result['climate_score']),
-        ml_risk_score=analysis_result.get('ml_risk_score', analysis_result['climate_score']),
-        
-        greenery_percent=analysis_result.get('environment', {}).get('greenery', 0),
-        water_percent=analysis_result.get('environment', {}).get('water', 0),
-        builtup_percent=analysis_result.get('environment', {}).get('built_up', 0),
-        
-        avg_temperature=analysis_result.get('avg_temperature', 28.5),
-        precipitation=analysis_result.get('precipitation', 120.0),
-        elevation=analysis_result.get('elevation', 45.0),
+    analysis = build_analysis_record(data, analysis_result, default_asset_value=0, name_keys=('property_id',))
+    if 'persist' in depth:
+        AnalysisWriter.save(analysis)
+        ReportCache.prerender(analysis)
 
-        # Keep legacy fallback structure intact
-        risk_factors=analysis_result['risk_profile'],
-        projections=analysis_result.get('temperature_projection', []), 
-        ai_insights=analysis_result.get('ai_insights'),
-        loan_recommendation=analysis_result.get('loan_recommendation')
-    )
-    
-    db.session.add(analysis)
-    db.session.commit()
+    return ResultSerializer.json_response(analysis, 200, ResultSerializer.requested_version(),
+                                          extra=depth.describe(data, analysis_result['signal_sources']))
 
-    return jsonify(analysis.to_dict()), 200
+@analysis_bp.route('/analyze/stream', methods=['GET', 'POST'])
+def analyze_stream():
+    """
+    /api/analyze as Server-Sent Events, stage by stage (see services/analysis_stream.py).
+    POST takes the /api/analyze body; GET takes the same fields as query parameters, for EventSource.
+    """
+    data = request.args.to_dict() if request.method == 'GET' else request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "JSON object body is required"}), 400
+    try:
+        profile = ScoringProfiles.for_request(data)
+    except UnknownProfile as e:
+        return jsonify({"error": f"Unknown scoring profile: {e.args[0]}"}), 400
+    if (data.get('latitude') is None or data.get('longitude') is None) and not (data.get('address') or data.get('pincode')):
+        return jsonify({"error": "Missing location information"}), 400
+
+    return Response(
+        stream_with_context(AnalysisStream.events(data, profile, ResultSerializer.requested_version())),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @analysis_bp.route('/analyze-property', methods=['POST'])
 @jwt_required(optional=True)
 def analyze_property():
     data = request.get_json()
+    try:
+        profile = ScoringProfiles.for_request(data)
+    except UnknownProfile as e:
+        return jsonify({"error": f"Unknown scoring profile: {e.args[0]}"}), 400
+    try:
+        depth = AnalysisDepth.for_request(data)
+    except InvalidDepth as e:
+        return jsonify({"error": str(e)}), 400
+    explain = 'explanation' in depth
     
     # Perform analysis using Service
-    analysis_result = ClimateEngine.analyze(data)
+    analysis_result = ClimateEngine.analyze(data, explain=explain, profile=profile, depth=depth)
     
     if "error" in analysis_result:
         return jsonify(analysis_result), 400
         
     # --- ML MODEL PREDICTION ---
-    ml_score = analysis_result['climate_score'] # Default to original
-    try:
-        model_path = os.path.join(os.getcwd(), 'ml-earth-engine', 'climate_model.pkl')
-        if os.path.exists(model_path):
-            rf_model = joblib.load(model_path)
-            
-            features = [[
-                float(analysis_result['risk_profile']['heat']),
-                float(analysis_result['risk_profile']['flood']),
-                float(analysis_result['risk_profile'].get('storm', 0)),
-                float(analysis_result.get('elevation', 45.0)),
-                float(analysis_result.get('temperature_trend', [0.8])[0]),
-                float(analysis_result.get('environment', {}).get('greenery', 0))
-            ]]
-            
-            pred = rf_model.predict(features)[0]
-            ml_score = round(float(pred), 1)
-            analysis_result['climate_score'] = ml_score
-            
-            # REGENERATE AI EXPLANATION WITH NEW ML SCORE
-            new_ai_insight = ClimateEngine._generate_explanation(
-                ml_score, 
-                analysis_result['risk_profile'],
-                analysis_result.get('temperature_projection', []),
-                analysis_result.get('environment', {})
-            )
-            analysis_result['ai_insights'] = new_ai_insight
-            
-            # REGENERATE LOAN RECOMMENDATION WITH NEW ML SCORE
-            new_loan_rec = ClimateEngine._calculate_loan_recommendation(ml_score)
-            analysis_result['loan_recommendation'] = new_loan_rec
-        else:
-            print("Local Model file climate_model.pkl not found, using fallback score.")
-            
-    except Exception as e:
-        print(f"Local ML Prediction failed, falling back to original score: {e}")
-        
-    # Fallback/Safe-inject Loan Pricing Logic into the API response
-    if "loan_pricing" not in analysis_result:
-        analysis_result["loan_pricing"] = calculate_loan_pricing(ml_score)
+    apply_ml_score(analysis_result, explain=explain, profile=profile)
         
     # Save analysis to database
-    analysis = PropertyAnalysis(
-        property_name=data.get('property_name') or data.get('property_id') or analysis_result['location_name'],
-        address=analysis_result['location_name'],
-        latitude=analysis_result['coordinates'][0],
-        longitude=analysis_result['coordinates'][1],
-        asset_value=float(data.get('asset_value', 100000)),
-        loan_term=int(data.get('loan_term', 30)),
-        climate_score=analysis_result['climate_score'],
-        risk_level=analysis_result['loan_recommendation']['risk_level'],
-        
-        # Explicit Structural DB mappings defined by requirement
-        heat_risk=analysis_result['risk_profile']['heat'],
-        flood_risk=analysis_result['risk_profile']['flood'],
-        storm_risk=analysis_result['risk_profile'].get('storm', 0),
-        fire_risk=analysis_result['risk_profile'].get('fire', 0),
-        overall_risk_score=analysis_result.get('overall_risk_score', analysis_result['climate_score']),
-        ml_risk_score=analysis_result.get('ml_risk_score', analysis_result['climate_score']),
-        
-        greenery_percent=analysis_result.get('environment', {}).get('greenery', 0),
-        water_percent=analysis_result.get('environment', {}).get('water', 0),
-        builtup_percent=analysis_result.get('environment', {}).get('built_up', 0),
-        
-        avg_temperature=analysis_result.get('avg_temperature', 28.5),
-        precipitation=analysis_result.get('precipitation', 120.0),
-        elevation=analysis_result.get('elevation', 45.0),
+    analysis = build_analysis_record(data, analysis_result)
+    if 'persist' not in depth:
+        return ResultSerializer.json_response(analysis, 200, ResultSerializer.requested_version(),
+                                              extra=depth.describe(data, analysis_result['signal_sources']))
+    AnalysisWriter.save(analysis)
+    ReportCache.prerender(analysis)
 
-        # Keep fallback JSON structure intact for existing legacy mapping hooks
-        risk_factors=analysis_result['risk_profile'],
-        projections=analysis_result.get('temperature_projection', []), 
-        ai_insights=analysis_result.get('ai_insights'),
-        loan_recommendation=analysis_result.get('loan_recommendation')
-    )
-    
-    db.session.add(analysis)
-    db.session.commit()
-    
-    return jsonify(analysis.to_dict()), 201
+    return ResultSerializer.json_response(analysis, 201, ResultSerializer.requested_version(),
+                                          extra=depth.describe(data, analysis_result['signal_sources']))
 
 @analysis_bp.route('/results/<int:analysis_id>', methods=['GET'])
 def get_analysis(analysis_id):
-    analysis = PropertyAnalysis.query.get_or_404(analysis_id)
-    return jsonify(analysis.to_dict()), 200
+    version = ResultSerializer.requested_version()
+    # Write-behind rows are served from the queue until their batch commits
+    entry = ResultSerializer.cached_entry(
+        analysis_id, version,
+        lambda: AnalysisWriter.pending(analysis_id) or db.session.get(PropertyAnalysis, analysis_id)
+    )
+    if entry is None:
+        return jsonify({"error": "Analysis not found"}), 404
+    return ResultSerializer.respond(entry, version)
 
 @analysis_bp.route('/geocode', methods=['GET'])
 def geocode():
@@ -376,3 +304,7 @@ def geocode():
         "display_name": query
     }), 200
 
+@analysis_bp.route('/scoring-profiles', methods=['GET'])
+def list_scoring_profiles():
+    """Loaded scoring profiles with their versions, the default and the tenant mapping."""
+    return jsonify(ScoringProfiles.describe()), 200
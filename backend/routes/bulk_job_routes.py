@@ -0,0 +1,128 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models.bulk_job import BulkAnalysisJob
+from models.rescoring_job import RescoringJob
+from services.bulk_analysis_service import BulkAnalysisService
+from services.rescoring_service import RescoringService
+from services.scoring_profiles import UnknownProfile
+import csv
+import io
+
+bulk_jobs_bp = Blueprint('bulk_jobs', __name__)
+
+def _read_uploaded_rows():
+    """Accepts either a JSON array of assets (same shape as /bulk-upload) or a multipart CSV 'file'."""
+    upload = request.files.get('file')
+    if upload:
+        text = io.TextIOWrapper(upload.stream, encoding='utf-8-sig')
+        return [
+            {k.strip(): v for k, v in row.items() if k and v not in (None, '')}
+            for row in csv.DictReader(text)
+        ]
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('assets')
+    return data
+
+@bulk_jobs_bp.route('/bulk-jobs', methods=['POST'])
+@jwt_required(optional=True)
+def create_bulk_job():
+    user_id = get_jwt_identity()
+    items = _read_uploaded_rows()
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"msg": "Expected a non-empty JSON array of assets or a CSV file"}), 400
+
+    max_rows = current_app.config.get('BULK_JOB_MAX_ROWS', 50000)
+    if len(items) > max_rows:
+        return jsonify({"msg": f"Bulk jobs are limited to {max_rows} rows"}), 413
+
+    include_explanations = str(request.args.get('explain', 'false')).lower() in ('1', 'true', 'yes')
+    job = BulkAnalysisService.create_job(items, user_id=user_id, include_explanations=include_explanations)
+    BulkAnalysisService.start(current_app._get_current_object(), job.id)
+
+    return jsonify({"job_id": job.id, "status_url": f"/api/bulk-jobs/{job.id}", "total_rows": job.total_rows}), 202
+
+@bulk_jobs_bp.route('/bulk-jobs/<int:job_id>', methods=['GET'])
+@jwt_required(optional=True)
+def get_bulk_job(job_id):
+    job = BulkAnalysisJob.query.get_or_404(job_id)
+
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(1000, max(1, request.args.get('limit', 100, type=int)))
+
+    payload = job.to_dict()
+    payload["results"] = BulkAnalysisService.results(job_id, offset=offset, limit=limit)
+    payload["offset"] = offset
+    return jsonify(payload), 200
+
+@bulk_jobs_bp.route('/bulk-jobs/<int:job_id>/resume', methods=['POST'])
+@jwt_required(optional=True)
+def resume_bulk_job(job_id):
+    job = BulkAnalysisJob.query.get_or_404(job_id)
+    if job.status in ('completed', 'cancelled'):
+        return jsonify({"msg": f"Job is already {job.status}"}), 409
+
+    force = str(request.args.get('force', 'false')).lower() in ('1', 'true', 'yes')
+    if not BulkAnalysisService.start(current_app._get_current_object(), job_id, force=force):
+        return jsonify({"msg": "Job is still owned by a live runner; retry later or pass force=true"}), 409
+
+    return jsonify({"job_id": job_id, "status": "running"}), 202
+
+@bulk_jobs_bp.route('/bulk-jobs/<int:job_id>/cancel', methods=['POST'])
+@jwt_required(optional=True)
+def cancel_bulk_job(job_id):
+    BulkAnalysisJob.query.get_or_404(job_id)
+    if not BulkAnalysisService.cancel(job_id):
+        return jsonify({"msg": "Job is not running"}), 409
+    return jsonify({"job_id": job_id, "status": "cancelled"}), 200
+
+@bulk_jobs_bp.route('/rescoring-jobs', methods=['POST'])
+@jwt_required(optional=True)
+def create_rescoring_job():
+    """Re-scores stored analyses that are not tagged with the current model and scoring profile."""
+    data = request.get_json(silent=True) or {}
+    chunk_rows = data.get('chunk_rows') or current_app.config.get('RESCORING_CHUNK_ROWS', 5000)
+    try:
+        chunk_rows = int(chunk_rows)
+    except (TypeError, ValueError):
+        return jsonify({"msg": "chunk_rows must be an integer"}), 400
+    if not 1 <= chunk_rows <= 100000:
+        return jsonify({"msg": "chunk_rows must be between 1 and 100000"}), 400
+
+    try:
+        job = RescoringService.create_job(data.get('profile'), chunk_rows=chunk_rows)
+    except UnknownProfile as e:
+        return jsonify({"msg": f"Unknown scoring profile: {e.args[0]}"}), 400
+    RescoringService.start(current_app._get_current_object(), job.id)
+
+    return jsonify({"job_id": job.id, "status_url": f"/api/rescoring-jobs/{job.id}", "total_rows": job.total_rows,
+                    "model_version": job.model_version, "policy_version": job.policy_version}), 202
+
+@bulk_jobs_bp.route('/rescoring-jobs/<int:job_id>', methods=['GET'])
+@jwt_required(optional=True)
+def get_rescoring_job(job_id):
+    job = RescoringJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict()), 200
+
+@bulk_jobs_bp.route('/rescoring-jobs/<int:job_id>/resume', methods=['POST'])
+@jwt_required(optional=True)
+def resume_rescoring_job(job_id):
+    job = RescoringJob.query.get_or_404(job_id)
+    if job.status in ('completed', 'cancelled'):
+        return jsonify({"msg": f"Job is already {job.status}"}), 409
+
+    force = str(request.args.get('force', 'false')).lower() in ('1', 'true', 'yes')
+    if not RescoringService.start(current_app._get_current_object(), job_id, force=force):
+        return jsonify({"msg": "Job is still owned by a live runner; retry later or pass force=true"}), 409
+
+    return jsonify({"job_id": job_id, "status": "running"}), 202
+
+@bulk_jobs_bp.route('/rescoring-jobs/<int:job_id>/cancel', methods=['POST'])
+@jwt_required(optional=True)
+def cancel_rescoring_job(job_id):
+    RescoringJob.query.get_or_404(job_id)
+    if not RescoringService.cancel(job_id):
+        return jsonify({"msg": "Job is not running"}), 409
+    return jsonify({"job_id": job_id, "status": "cancelled"}), 200
@@ -1,8 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response, Response, stream_with_context, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.portfolio import PortfolioAsset
 from models.property import PropertyAnalysis
+from services.spatial_index import SpatialIndex
+from services.heatmap_tiles import HeatmapTiles
+from services.portfolio_analytics import PortfolioSnapshot, compute_analytics, report_stats
+from services.export_service import ExportService
+from services.stress_testing import StressTestEngine, DEFAULT_SCENARIOS
+from services.scoring_profiles import ScoringProfiles, UnknownProfile
+from services.loss_simulation import LossSimulator, CELL_DEGREES
+from services.request_profiler import profile_stage
 from database import db
+import math
+import time
 
 portfolio_bp = Blueprint('portfolio', __name__)
 
@@ -19,6 +29,85 @@ def get_portfolio():
     analyses = PropertyAnalysis.query.all()
     return jsonify([a.to_dict() for a in analyses]), 200
 
+@portfolio_bp.route('/assets/within', methods=['GET'])
+@jwt_required(optional=True)
+def get_assets_within():
+    """
+    Viewport query for the map: either a bounding box (min_lat, min_lon, max_lat, max_lon)
+    or a circle (lat, lon, radius_km). Pass fields=full for the complete analysis records.
+    """
+    user_id = get_jwt_identity()
+    args = request.args
+    limit = min(max(1, args.get('limit', 5000, type=int)), 50000)
+    full = args.get('fields') == 'full'
+
+    try:
+        if args.get('radius_km') is not None:
+            lat, lon = float(args['lat']), float(args['lon'])
+            radius_km = float(args['radius_km'])
+            if radius_km <= 0:
+                raise ValueError("radius_km must be positive")
+            hits = SpatialIndex.query_radius(lat, lon, radius_km, user_id=user_id, limit=limit + 1)
+            assets = []
+            for distance, a in hits[:limit]:
+                item = a.to_dict() if full else a.to_point()
+                item["distance_km"] = round(distance, 3)
+                assets.append(item)
+            truncated = len(hits) > limit
+        else:
+            min_lat, max_lat = float(args['min_lat']), float(args['max_lat'])
+            min_lon, max_lon = float(args['min_lon']), float(args['max_lon'])
+            if min_lat > max_lat:
+                raise ValueError("min_lat must not exceed max_lat")
+            rows = SpatialIndex.query_bbox(min_lat, min_lon, max_lat, max_lon, user_id=user_id, limit=limit + 1)
+            assets = [a.to_dict() if full else a.to_point() for a in rows[:limit]]
+            truncated = len(rows) > limit
+    except (KeyError, ValueError) as e:
+        return jsonify({"msg": f"Provide min_lat/min_lon/max_lat/max_lon or lat/lon/radius_km ({e})"}), 400
+
+    return jsonify({"count": len(assets), "truncated": truncated, "assets": assets}), 200
+
+@portfolio_bp.route('/heatmap/tiles', methods=['GET'])
+@jwt_required(optional=True)
+def get_heatmap_tiles():
+    """
+    Pre-aggregated heatmap cells for the viewport at a map zoom level, scoped to the caller's
+    portfolio like /assets/within. format=json returns column arrays; format=binary returns
+    packed float32 rows.
+    """
+    user_id = get_jwt_identity()
+    args = request.args
+    try:
+        zoom = float(args['zoom'])
+        min_lat, max_lat = float(args['min_lat']), float(args['max_lat'])
+        min_lon, max_lon = float(args['min_lon']), float(args['max_lon'])
+    except (KeyError, ValueError):
+        return jsonify({"msg": "zoom, min_lat, min_lon, max_lat and max_lon are required"}), 400
+
+    level = HeatmapTiles.level_for_zoom(zoom, args.get('cell_px', type=int))
+    cells = HeatmapTiles.query(level, min_lat, min_lon, max_lat, max_lon, user_id=user_id)
+    cell_deg = 360.0 / 2 ** level
+
+    if args.get('format') == 'binary':
+        response = make_response(HeatmapTiles.pack(cells))
+        response.headers['Content-Type'] = 'application/octet-stream'
+        response.headers['X-Heatmap-Level'] = str(level)
+        response.headers['X-Heatmap-Cell-Deg'] = repr(cell_deg)
+        response.headers['X-Heatmap-Fields'] = ','.join(HeatmapTiles.BINARY_FIELDS)
+        return response
+
+    return jsonify({
+        "level": level,
+        "cell_deg": cell_deg,
+        "cells": len(cells),
+        "lat": [round(c[0], 5) for c in cells],
+        "lon": [round(c[1], 5) for c in cells],
+        "count": [c[2] for c in cells],
+        "avg_score": [round(c[3], 1) for c in cells],
+        "total_value": [round(c[4], 2) for c in cells],
+        "intensity": [round(c[5], 4) for c in cells]
+    }), 200
+
 @portfolio_bp.route('/upload', methods=['POST'])
 @jwt_required()
 def add_to_portfolio():
@@ -232,6 +321,122 @@ def get_portfolio_alerts():
         
     return jsonify({"alerts": alerts}), 200
 
+def _portfolio_ids(user_id):
+    if not user_id:
+        return None
+    return [a.property_id for a in PortfolioAsset.query.with_entities(PortfolioAsset.property_id)
+            .filter_by(user_id=user_id).all()]
+
+@portfolio_bp.route('/portfolio/analytics', methods=['GET'])
+@jwt_required(optional=True)
+def get_portfolio_analytics():
+    """Vectorized portfolio risk analytics over the in-memory columnar snapshot."""
+    started = time.perf_counter()
+    user_id = get_jwt_identity()
+    hazard_threshold = request.args.get('hazard_threshold', 60.0, type=float)
+
+    snapshot = PortfolioSnapshot.get()
+    analytics = compute_analytics(snapshot.view(_portfolio_ids(user_id)), hazard_threshold=hazard_threshold)
+    analytics["snapshot_rows"] = len(snapshot)
+    analytics["compute_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return jsonify(analytics), 200
+
+@portfolio_bp.route('/portfolio/stress-test', methods=['GET', 'POST'])
+@jwt_required(optional=True)
+def stress_test_portfolio():
+    """
+    Re-scores the book under warming scenarios. GET runs the configured scenarios
+    (?scenarios=+2C,+3C picks a subset); POST {"scenarios": {name: shocks}} runs custom ones.
+    """
+    started = time.perf_counter()
+    scenarios = current_app.config.get('STRESS_SCENARIOS') or DEFAULT_SCENARIOS
+
+    if request.method == 'POST':
+        scenarios = (request.get_json(silent=True) or {}).get('scenarios')
+    elif request.args.get('scenarios'):
+        # An unescaped "+" in "+2C" arrives as a space, so names match with or without it
+        by_name = {name.lstrip('+'): name for name in scenarios}
+        names = [n.strip().lstrip('+') for n in request.args['scenarios'].split(',')]
+        missing = [n for n in names if n not in by_name]
+        if missing:
+            return jsonify({"error": f"Unknown scenarios: {missing}", "scenarios": list(scenarios)}), 400
+        scenarios = {by_name[n]: scenarios[by_name[n]] for n in names}
+
+    try:
+        scenarios = StressTestEngine.validate(scenarios)
+        profile = ScoringProfiles.for_request(request.get_json(silent=True) if request.method == 'POST' else None)
+    except UnknownProfile as e:
+        return jsonify({"error": f"Unknown scoring profile: {e.args[0]}"}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    snapshot = PortfolioSnapshot.get()
+    result = StressTestEngine.run(snapshot.view(_portfolio_ids(get_jwt_identity())), scenarios, profile=profile)
+    result["compute_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return jsonify(result), 200
+
+@portfolio_bp.route('/portfolio/loss-simulation', methods=['GET', 'POST'])
+@jwt_required(optional=True)
+def simulate_portfolio_losses():
+    """
+    Monte Carlo loss distribution for the book. Parameters (query string or JSON body):
+    draws, seed, horizon ("loan_term" or years) and cell_degrees for the spatial grid.
+    """
+    started = time.perf_counter()
+    params = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+
+    try:
+        draws = int(params.get('draws', 10000))
+        seed = int(params.get('seed', 0))
+        cell_degrees = float(params.get('cell_degrees', CELL_DEGREES))
+        horizon = params.get('horizon', 'loan_term')
+        if horizon != 'loan_term':
+            horizon = float(horizon)
+    except (TypeError, ValueError):
+        return jsonify({"error": "draws and seed must be integers; horizon must be 'loan_term' or a number of years"}), 400
+
+    if not 1 <= draws <= LossSimulator.max_draws:
+        return jsonify({"error": f"draws must be between 1 and {LossSimulator.max_draws}"}), 400
+    if seed < 0:
+        return jsonify({"error": "seed must be non-negative"}), 400
+    if horizon != 'loan_term' and not 0 < horizon <= 100:
+        return jsonify({"error": "horizon must be between 0 and 100 years"}), 400
+    if not math.isfinite(cell_degrees) or cell_degrees <= 0:
+        return jsonify({"error": "cell_degrees must be a positive finite number"}), 400
+
+    snapshot = PortfolioSnapshot.get()
+    result = LossSimulator.run(snapshot.view(_portfolio_ids(get_jwt_identity())), draws=draws, seed=seed,
+                               horizon=horizon, cell_degrees=cell_degrees)
+    result["compute_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return jsonify(result), 200
+
+@portfolio_bp.route('/portfolio/export', methods=['GET'])
+@jwt_required(optional=True)
+def export_portfolio():
+    """
+    Streams every analysis (or the user's portfolio) as ?format=csv|parquet|arrow, chunk by chunk.
+    JSON columns are flattened into typed columns; ?include_insights=true adds the AI text.
+    """
+    user_id = get_jwt_identity()
+    fmt = request.args.get('format', 'csv').lower()
+    include_insights = request.args.get('include_insights', 'false').lower() == 'true'
+    chunk_rows = request.args.get('chunk_rows', type=int)
+
+    if fmt not in ExportService.FORMATS:
+        return jsonify({"error": f"Unsupported format '{fmt}'", "formats": list(ExportService.FORMATS)}), 400
+    if not ExportService.available(fmt):
+        return jsonify({"error": f"{fmt} export requires pyarrow on the server"}), 501
+    if chunk_rows is not None and not 1 <= chunk_rows <= 100000:
+        return jsonify({"error": "chunk_rows must be between 1 and 100000"}), 400
+
+    mimetype, extension = ExportService.FORMATS[fmt]
+    body = ExportService.stream(fmt, user_id=user_id, include_insights=include_insights, chunk_rows=chunk_rows)
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=portfolio_export.{extension}"}
+    )
+
 @portfolio_bp.route('/portfolio/report', methods=['GET'])
 @jwt_required(optional=True)
 def download_portfolio_report():
@@ -249,22 +454,13 @@ def download_portfolio_report():
     if not properties:
         return jsonify({"error": "No assets in portfolio"}), 404
         
-    total_score = sum((p.climate_score or 0) for p in properties)
-    total_value = sum((p.asset_value or 0) for p in properties)
-    
-    high = sum(1 for p in properties if (p.climate_score or 0) < 50)
-    med = sum(1 for p in properties if 50 <= (p.climate_score or 0) < 80)
-    low = sum(1 for p in properties if (p.climate_score or 0) >= 80)
-    
-    stats = {
-        'avg_score': round(total_score / len(properties)),
-        'total_value': total_value,
-        'high_risk': high,
-        'med_risk': med,
-        'low_risk': low
-    }
+    stats = report_stats(
+        [p.climate_score or 0 for p in properties],
+        [p.asset_value or 0 for p in properties]
+    )
     
-    pdf_buffer = ReportService.generate_portfolio_report(properties, stats)
+    with profile_stage("reportlab"):
+        pdf_buffer = ReportService.generate_portfolio_report(properties, stats)
     
     return send_file(
         pdf_buffer,
@@ -0,0 +1,25 @@
+from flask import Blueprint, request, jsonify, send_file
+from services.request_profiler import RequestProfiler
+
+profiles_bp = Blueprint('profiles', __name__)
+
+@profiles_bp.route('/profiles', methods=['GET'])
+def list_profiles():
+    """Recent request profiles, newest first (?route= filters, ?limit= caps)."""
+    if not RequestProfiler.authorized(request):
+        return jsonify({"error": "Resource not found"}), 404
+    limit = min(500, max(1, request.args.get('limit', 50, type=int)))
+    entries = RequestProfiler.recent(limit=limit, route=request.args.get('route'))
+    for entry in entries:
+        entry["folded_url"] = f"/api/profiles/{entry['name']}"
+    return jsonify({"profiles": entries, "directory": RequestProfiler.directory}), 200
+
+@profiles_bp.route('/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    """Folded stacks for one profile; feed to flamegraph.pl, inferno or speedscope."""
+    if not RequestProfiler.authorized(request):
+        return jsonify({"error": "Resource not found"}), 404
+    path = RequestProfiler.folded_path(name)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=f"{name}.folded")
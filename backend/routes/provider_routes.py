@@ -0,0 +1,15 @@
+from flask import Blueprint, jsonify
+from services.rate_limiter import ProviderRateLimiter
+from services.single_flight import SingleFlight
+from services.provider_cassettes import ProviderCassettes
+
+providers_bp = Blueprint('providers', __name__)
+
+@providers_bp.route('/providers/metrics', methods=['GET'])
+def provider_metrics():
+    """Outbound provider traffic: rate-limit queues, coalesced calls and cassette use."""
+    return jsonify({
+        "rate_limits": ProviderRateLimiter.metrics(),
+        "single_flight": SingleFlight.stats(),
+        "cassettes": ProviderCassettes.stats()
+    }), 200
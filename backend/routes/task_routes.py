@@ -0,0 +1,107 @@
+import os
+
+from flask import Blueprint, request, jsonify, send_file, abort
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import or_, select
+
+from database import db
+from models.task import Task
+from services.task_queue import InvalidPayload, TaskQueue, UnknownTask
+
+tasks_bp = Blueprint('tasks', __name__)
+
+# Tasks anyone may queue or cancel; the rest (retraining, bulk and re-scoring runs) need a logged-in user
+PUBLIC_TASKS = ('report.render', 'reports.batch')
+
+def _visible_to(user_id):
+    """Tasks queued for a user (payload user_id) are shown only to that user."""
+    owner = Task.payload['user_id'].as_string()
+    if user_id is None:
+        return owner.is_(None)
+    return or_(owner.is_(None), owner == str(user_id))
+
+def _get_visible(task_id):
+    task = db.session.scalar(select(Task).where(Task.id == task_id, _visible_to(get_jwt_identity())))
+    if task is None:
+        abort(404)
+    return task
+
+@tasks_bp.route('/tasks', methods=['POST'])
+@jwt_required(optional=True)
+def create_task():
+    """
+    Queues a background task. Body: {"name": "reports.batch", "payload": {...}} plus optional
+    "priority" (higher first), "max_attempts", "delay_seconds" and "dedupe_key". Only
+    PUBLIC_TASKS can be queued without a token.
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get('name') not in PUBLIC_TASKS and data.get('name') in TaskQueue.handlers and get_jwt_identity() is None:
+        return jsonify({"error": f"Task '{data.get('name')}' requires authentication"}), 401
+    payload = data.get('payload') or {}
+    if not isinstance(payload, dict):
+        return jsonify({"error": "payload must be a JSON object"}), 400
+    # user_id is only ever the caller's own identity
+    payload.pop('user_id', None)
+    if data.get('name') == 'reports.batch' and payload.get('portfolio') and get_jwt_identity() is not None:
+        payload['user_id'] = get_jwt_identity()
+
+    try:
+        task = TaskQueue.enqueue(
+            data.get('name'), payload,
+            priority=data.get('priority'),
+            max_attempts=data.get('max_attempts'),
+            delay_seconds=data.get('delay_seconds') or 0,
+            dedupe_key=data.get('dedupe_key')
+        )
+    except UnknownTask:
+        return jsonify({"error": f"Unknown task '{data.get('name')}'; choose from {sorted(TaskQueue.handlers)}"}), 400
+    except InvalidPayload as e:
+        return jsonify({"error": str(e)}), 400
+    except (TypeError, ValueError):
+        return jsonify({"error": "priority, max_attempts and delay_seconds must be numbers"}), 400
+
+    return jsonify({**task.to_dict(), "status_url": f"/api/tasks/{task.id}"}), 202
+
+@tasks_bp.route('/tasks', methods=['GET'])
+@jwt_required(optional=True)
+def list_tasks():
+    limit = min(500, max(1, request.args.get('limit', 50, type=int)))
+    stmt = select(Task).where(_visible_to(get_jwt_identity())).order_by(Task.id.desc()).limit(limit)
+    if request.args.get('status'):
+        stmt = stmt.where(Task.status == request.args['status'])
+    if request.args.get('name'):
+        stmt = stmt.where(Task.name == request.args['name'])
+    return jsonify([task.to_dict() for task in db.session.scalars(stmt)]), 200
+
+@tasks_bp.route('/tasks/stats', methods=['GET'])
+@jwt_required(optional=True)
+def task_stats():
+    return jsonify(TaskQueue.stats()), 200
+
+@tasks_bp.route('/tasks/<int:task_id>', methods=['GET'])
+@jwt_required(optional=True)
+def get_task(task_id):
+    task = _get_visible(task_id)
+    return jsonify(task.to_dict()), 200
+
+@tasks_bp.route('/tasks/<int:task_id>/cancel', methods=['POST'])
+@jwt_required(optional=True)
+def cancel_task(task_id):
+    task = _get_visible(task_id)
+    if task.name not in PUBLIC_TASKS and get_jwt_identity() is None:
+        return jsonify({"error": f"Cancelling a '{task.name}' task requires authentication"}), 401
+    if not TaskQueue.cancel(task_id):
+        return jsonify({"error": "Task is not queued or running"}), 409
+    return jsonify({"task_id": task_id, "status": "cancelled"}), 200
+
+@tasks_bp.route('/tasks/<int:task_id>/file', methods=['GET'])
+@jwt_required(optional=True)
+def download_task_file(task_id):
+    """The file a finished task produced (a report PDF or a batch ZIP)."""
+    task = _get_visible(task_id)
+    path = (task.result or {}).get('file') if task.status == 'succeeded' else None
+    if not path:
+        return jsonify({"error": f"Task {task_id} has no file (status: {task.status})"}), 404
+    if not os.path.exists(path):
+        return jsonify({"error": "The task's file has been removed"}), 410
+    return send_file(path, as_attachment=True, download_name=os.path.basename(path))
@@ -0,0 +1,98 @@
+# Optional stages of an analysis; the score itself (from whatever provider data is at hand) always runs
+STAGES = ('live_providers', 'land_use', 'explanation', 'persist')
+
+# include option replacing live_providers: score from provider results already cached on this host
+CACHE_ONLY = 'cache_only'
+
+MODES = {
+    # Score from live provider data only: no Overpass, Gemini or database write
+    'fast': frozenset({'live_providers'}),
+    # Live provider data and a saved record, without the Gemini explanation
+    'standard': frozenset({'live_providers', 'land_use', 'persist'}),
+    'full': frozenset(STAGES),
+}
+
+
+class InvalidDepth(ValueError):
+    """Unknown mode or include stage."""
+
+
+class AnalysisDepth:
+    """
+    Which optional stages an /api/analyze or /api/analyze-property call runs.
+
+    Chosen by ?mode= (fast | standard | full) or a "mode" body field, defaulting to
+    ANALYSIS_DEFAULT_MODE. ?include= (or "include", a comma list or JSON list) names the stages
+    outright instead, e.g. include=land_use,persist:
+
+      land_use        the Overpass land-use query (otherwise the generated composition)
+      explanation     the Gemini explanation
+      persist         save the analysis (otherwise the response has no id)
+      cache_only      skip the climate provider calls and use only results still cached on this
+                      host (single-flight store, cassettes), otherwise fallbacks
+
+    Every mode, and every include list without cache_only, calls the providers live
+    (live_providers). The response's signal_sources says where each signal came from.
+    """
+    default_mode = 'full'
+
+    def __init__(self, mode, stages):
+        self.mode = mode
+        self.stages = frozenset(stages)
+
+    def __contains__(self, stage):
+        return stage in self.stages
+
+    @classmethod
+    def init_app(cls, app):
+        mode = (app.config.get('ANALYSIS_DEFAULT_MODE') or 'full').lower()
+        if mode not in MODES:
+            raise ValueError(f"ANALYSIS_DEFAULT_MODE must be one of {sorted(MODES)}, not '{mode}'")
+        cls.default_mode = mode
+
+    @classmethod
+    def parse(cls, mode=None, include=None):
+        if include is not None:
+            names = include.split(',') if isinstance(include, str) else include
+            stages = {str(name).strip() for name in names if str(name).strip()}
+            unknown = stages - set(STAGES) - {CACHE_ONLY}
+            if unknown:
+                raise InvalidDepth(f"Unknown stages {sorted(unknown)}; choose from {[*STAGES[1:], CACHE_ONLY]}")
+            if CACHE_ONLY in stages:
+                if 'live_providers' in stages:
+                    raise InvalidDepth(f"{CACHE_ONLY} and live_providers cannot be combined")
+                return cls('custom', stages - {CACHE_ONLY})
+            return cls('custom', stages | {'live_providers'})
+        mode = (mode or cls.default_mode).lower()
+        if mode not in MODES:
+            raise InvalidDepth(f"Unknown mode '{mode}'; choose from {sorted(MODES)}")
+        return cls(mode, MODES[mode])
+
+    @classmethod
+    def for_request(cls, data=None, args=None):
+        """Depth chosen by query parameters (args, default flask.request.args) or body fields."""
+        if args is None:
+            from flask import request
+            args = request.args
+        data = data or {}
+        return cls.parse(args.get('mode') or data.get('mode'), args.get('include') or data.get('include'))
+
+    def stages_run(self, geocoded):
+        """The stages an analysis at this depth runs, in order, for the response."""
+        stages = ['geocode'] if geocoded else []
+        stages.append('providers' if 'live_providers' in self else 'cached_providers')
+        if 'land_use' in self:
+            stages.append('land_use')
+        stages += ['score', 'loan_pricing']
+        if 'explanation' in self:
+            stages.append('explanation')
+        if 'persist' in self:
+            stages.append('persist')
+        return stages
+
+    def describe(self, data, signal_sources=None):
+        geocoded = data.get('latitude') is None or data.get('longitude') is None
+        described = {"analysis_mode": self.mode, "stages_run": self.stages_run(geocoded)}
+        if signal_sources is not None:
+            described["signal_sources"] = signal_sources
+        return described
@@ -0,0 +1,181 @@
+import csv
+import hashlib
+import os
+import threading
+from datetime import datetime
+
+from models.property import PropertyAnalysis
+from services.climate_engine import ClimateEngine
+from services.scoring_profiles import ScoringProfiles
+from services.request_profiler import profile_stage
+
+# Training features, in the order the RandomForest in ml_training.py was fitted on
+ML_FEATURES = ['heat_risk', 'flood_risk', 'storm_risk', 'elevation', 'temperature_trend', 'green_cover_ratio']
+
+# model_version of scores that come straight from the scoring profile formula
+FORMULA_VERSION = 'formula'
+
+
+def calculate_loan_pricing(climate_score, profile=None):
+    """Interest rate and approval from the scoring profile's band; non-numeric scores land in the lowest band."""
+    return (profile or ScoringProfiles.get()).pricing(climate_score)
+
+
+class ClimateModel:
+    """
+    Process-wide cache of the trained climate_model.pkl.
+    The pickle is reloaded only when the file on disk changes, instead of on every request.
+    Its version is a hash of the file contents, so a retrained model gets a new one.
+    """
+    _lock = threading.Lock()
+    _model = None
+    _mtime = None
+    _version = None
+
+    @staticmethod
+    def path():
+        return os.path.join(os.getcwd(), 'ml-earth-engine', 'climate_model.pkl')
+
+    @classmethod
+    def get(cls):
+        return cls.get_with_version()[0]
+
+    @classmethod
+    def get_with_version(cls):
+        """(model, version), or (None, FORMULA_VERSION) when no model is trained."""
+        path = cls.path()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None, FORMULA_VERSION
+
+        with cls._lock:
+            if cls._model is None or cls._mtime != mtime:
+                import joblib
+                with open(path, 'rb') as f:
+                    version = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+                cls._model = joblib.load(path)
+                cls._mtime = mtime
+                cls._version = version
+            return cls._model, cls._version
+
+
+def extract_features(analysis_result):
+    return [
+        float(analysis_result['risk_profile']['heat']),
+        float(analysis_result['risk_profile']['flood']),
+        float(analysis_result['risk_profile'].get('storm', 0)),
+        float(analysis_result.get('elevation', 45.0)),
+        float(analysis_result.get('temperature_trend', [0.8])[0]),
+        float(analysis_result.get('environment', {}).get('greenery', 0))
+    ]
+
+
+def log_training_row(analysis_result):
+    """Appends the analysed features to the ML training CSV."""
+    try:
+        log_file = os.path.join(os.getcwd(), 'ml-earth-engine', 'earth_training_data.csv')
+        # Ensure directory exists if we are running from a different place
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+
+        file_exists = os.path.isfile(log_file)
+        with open(log_file, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(['heat_risk', 'flood_risk', 'storm_risk', 'elevation', 'temperature_trend', 'green_cover_ratio', 'final_climate_score'])
+
+            writer.writerow([
+                analysis_result['risk_profile']['heat'],
+                analysis_result['risk_profile']['flood'],
+                analysis_result['risk_profile'].get('storm', 0),
+                analysis_result.get('elevation', 45.0),
+                analysis_result.get('temperature_trend', [0.8])[0], # Using first trend value as simplified feature
+                analysis_result.get('environment', {}).get('greenery', 0),
+                analysis_result['climate_score']
+            ])
+    except Exception as e:
+        print(f"ML Logging Error: {e}")
+
+
+def apply_ml_score(analysis_result, explain=True, profile=None):
+    """
+    Re-scores a ClimateEngine result with the local ML model, if one is trained.
+    Mutates analysis_result in place and returns the final score.
+    Loan recommendation and pricing use the same scoring profile as the analysis.
+    """
+    ml_score = analysis_result['climate_score'] # Default to original
+    analysis_result['model_version'] = FORMULA_VERSION
+    try:
+        with profile_stage("model"):
+            rf_model, model_version = ClimateModel.get_with_version()
+            pred = rf_model.predict([extract_features(analysis_result)])[0] if rf_model is not None else None
+        if rf_model is not None:
+            ml_score = round(float(pred), 1)
+            analysis_result['climate_score'] = ml_score
+            analysis_result['model_version'] = model_version
+
+            # REGENERATE AI EXPLANATION WITH NEW ML SCORE
+            if explain:
+                analysis_result['ai_insights'] = ClimateEngine._generate_explanation(
+                    ml_score,
+                    analysis_result['risk_profile'],
+                    analysis_result.get('temperature_projection', []),
+                    analysis_result.get('environment', {})
+                )
+
+            # REGENERATE LOAN RECOMMENDATION WITH NEW ML SCORE
+            analysis_result['loan_recommendation'] = ClimateEngine._calculate_loan_recommendation(ml_score, profile)
+        else:
+            print("Local Model file climate_model.pkl not found, using fallback score.")
+
+    except Exception as e:
+        print(f"Local ML Prediction failed, falling back to original score: {e}")
+
+    # Fallback/Safe-inject Loan Pricing Logic into the API response
+    if "loan_pricing" not in analysis_result:
+        analysis_result["loan_pricing"] = calculate_loan_pricing(ml_score, profile)
+
+    return ml_score
+
+
+def build_analysis_record(data, analysis_result, default_asset_value=100000, name_keys=('property_name', 'property_id')):
+    """
+    Maps a scored ClimateEngine result onto a (not yet persisted) PropertyAnalysis row.
+    name_keys are the request fields tried in order for the property name, before the location.
+    """
+    name = next((data.get(key) for key in name_keys if data.get(key)), None)
+    return PropertyAnalysis(
+        property_name=name or analysis_result['location_name'],
+        address=analysis_result['location_name'],
+        latitude=analysis_result['coordinates'][0],
+        longitude=analysis_result['coordinates'][1],
+        asset_value=float(data.get('asset_value', default_asset_value)),
+        loan_term=int(data.get('loan_term', 30)),
+        climate_score=analysis_result['climate_score'],
+        risk_level=analysis_result['loan_recommendation']['risk_level'],
+
+        # Explicit Structural DB mappings
+        heat_risk=analysis_result['risk_profile']['heat'],
+        flood_risk=analysis_result['risk_profile']['flood'],
+        storm_risk=analysis_result['risk_profile'].get('storm', 0),
+        fire_risk=analysis_result['risk_profile'].get('fire', 0),
+        overall_risk_score=analysis_result.get('overall_risk_score', analysis_result['climate_score']),
+        ml_risk_score=analysis_result.get('ml_risk_score', analysis_result['climate_score']),
+
+        greenery_percent=analysis_result.get('environment', {}).get('greenery', 0),
+        water_percent=analysis_result.get('environment', {}).get('water', 0),
+        builtup_percent=analysis_result.get('environment', {}).get('built_up', 0),
+
+        avg_temperature=analysis_result.get('avg_temperature', 28.5),
+        precipitation=analysis_result.get('precipitation', 120.0),
+        elevation=analysis_result.get('elevation', 45.0),
+
+        # Keep legacy fallback structure intact
+        risk_factors=analysis_result['risk_profile'],
+        projections=analysis_result.get('temperature_projection', []),
+        ai_insights=analysis_result.get('ai_insights'),
+        loan_recommendation=analysis_result.get('loan_recommendation'),
+        model_version=analysis_result.get('model_version'),
+        policy_version=(analysis_result.get('scoring_profile') or {}).get('tag'),
+        created_at=datetime.utcnow()
+    )
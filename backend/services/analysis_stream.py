@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from services.analysis_pipeline import apply_ml_score, build_analysis_record, log_training_row
+from services.analysis_writer import AnalysisWriter
+from services.climate_engine import ClimateEngine
+from services.report_cache import ReportCache
+from services.result_serializer import ResultSerializer, dumps
+
+
+class AnalysisStream:
+    """
+    /api/analyze as Server-Sent Events, so a client can draw charts before the slowest provider
+    and Gemini have answered. Events, in order:
+
+      geocode      location_name, latitude, longitude
+      provisional  result from fallback data (generated baseline, no provider signals)
+      signal       one per provider as it returns: signal, source (live or fallback), remaining,
+                   refined result
+      ml_score     climate_score and model_version after the local model, and result
+      loan         loan_recommendation and loan_pricing
+      explanation  ai_insights
+      complete     the persisted result, exactly as /api/analyze returns it (with its id)
+      error        error, then the stream ends
+
+    Every event carries elapsed_ms since the request started. Each "result" is a full snapshot in
+    the requested result version's shape, so a client can simply replace what it shows. All
+    stages refine the same generated baseline, so scores only move as real data arrives.
+    """
+    _pool = None
+    _pool_lock = threading.Lock()
+    POOL_THREADS = 32
+
+    @classmethod
+    def _executor(cls):
+        with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = ThreadPoolExecutor(max_workers=cls.POOL_THREADS, thread_name_prefix="analysis-stream")
+            return cls._pool
+
+    @staticmethod
+    def event(name, started, **data):
+        data = {"elapsed_ms": round((time.perf_counter() - started) * 1000, 1), **data}
+        return f"event: {name}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+    @classmethod
+    def events(cls, data, profile, version=1):
+        """Generator of SSE frames for one analysis; data is the /api/analyze request body."""
+        started = time.perf_counter()
+
+        def snapshot(result):
+            record = build_analysis_record(data, result, default_asset_value=0, name_keys=('property_id',))
+            return ResultSerializer.payload(record, version)
+
+        # STEP 1 & 2 — INPUT HANDLING & GEOCODING, as in ClimateEngine.analyze
+        lat, lon = data.get('latitude'), data.get('longitude')
+        display_name = data.get('address') or data.get('pincode')
+        if lat is None or lon is None:
+            location = data.get('address') or data.get('pincode')
+            geo_result = ClimateEngine._geocode(location)
+            if not geo_result:
+                yield cls.event('error', started, error=f"Could not find coordinates for: {location}")
+                return
+            lat, lon, display_name = geo_result['lat'], geo_result['lon'], geo_result['display_name']
+        try:
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            yield cls.event('error', started, error="latitude and longitude must be numbers")
+            return
+        display_name = display_name or f"{lat}, {lon}"
+        yield cls.event('geocode', started, location_name=display_name, latitude=lat, longitude=lon)
+
+        calls = ClimateEngine._signal_calls(lat, lon)
+        signals = {name: spec[5] for name, spec in calls.items()}  # each provider's fallback
+        base = ClimateEngine.generate_climate_analysis(lat, lon)
+        result = ClimateEngine.analyze_signals(lat, lon, display_name, signals, explain=False,
+                                               profile=profile, base=base)
+        yield cls.event('provisional', started, result=snapshot(result))
+
+        pool = cls._executor()
+        futures = {pool.submit(ClimateEngine._fetch_sourced, *spec): name for name, spec in calls.items()}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                name = futures[future]
+                signals[name], source = future.result()
+                result = ClimateEngine.analyze_signals(lat, lon, display_name, signals, explain=False,
+                                                       profile=profile, base=base)
+                yield cls.event('signal', started, signal=name, source=source, remaining=len(futures) - done,
+                                result=snapshot(result))
+        finally:
+            # Client went away: drop calls that have not started yet
+            for future in futures:
+                future.cancel()
+
+        log_training_row(result)
+        apply_ml_score(result, explain=False, profile=profile)
+        yield cls.event('ml_score', started, climate_score=result['climate_score'],
+                        model_version=result['model_version'], result=snapshot(result))
+        yield cls.event('loan', started, loan_recommendation=result['loan_recommendation'],
+                        loan_pricing=result.get('loan_pricing'))
+
+        # Explained once, for the final score
+        result['ai_insights'] = ClimateEngine._generate_explanation(
+            result['climate_score'], result['risk_profile'],
+            result.get('temperature_projection', []), result.get('environment', {})
+        )
+        yield cls.event('explanation', started, ai_insights=result['ai_insights'])
+
+        analysis = build_analysis_record(data, result, default_asset_value=0, name_keys=('property_id',))
+        AnalysisWriter.save(analysis)
+        ReportCache.prerender(analysis)
+        yield cls.event('complete', started, result=ResultSerializer.payload(analysis, version))
@@ -0,0 +1,379 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models.property import PropertyAnalysis
+
+
+class IdAllocator:
+    """
+    Hands out PropertyAnalysis ids before the row is written, in blocks reserved from an
+    id_blocks table. Blocks always start above max(id), so they never overlap rows that were
+    inserted with plain autoincrement. SQLite only (INSERT OR IGNORE, UPDATE ... RETURNING).
+    """
+
+    def __init__(self, engine, name='property_analyses', block_size=100):
+        self.engine = engine
+        self.name = name
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        self._pid = os.getpid()
+
+    def _reserve(self):
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS id_blocks (name TEXT PRIMARY KEY, next_id INTEGER NOT NULL)"))
+            conn.execute(text("INSERT OR IGNORE INTO id_blocks (name, next_id) VALUES (:name, 1)"), {"name": self.name})
+            start = conn.execute(text(
+                "UPDATE id_blocks SET next_id = max(next_id, (SELECT coalesce(max(id), 0) + 1 FROM property_analyses)) + :n "
+                "WHERE name = :name RETURNING next_id - :n"
+            ), {"name": self.name, "n": self.block_size}).scalar()
+        self._next, self._end = start, start + self.block_size
+
+    def next_id(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked worker must not reuse the parent's block
+                self._next = self._end = 0
+                self._pid = os.getpid()
+            if self._next >= self._end:
+                self._reserve()
+            value = self._next
+            self._next += 1
+            return value
+
+
+class AnalysisWriter:
+    """
+    Persists PropertyAnalysis rows either synchronously (the default) or write-behind.
+
+    In write-behind mode (ANALYSIS_WRITE_MODE=write_behind) the id is assigned up front and the
+    response is returned immediately. A background thread group-commits queued rows in one
+    transaction every WRITE_BEHIND_FLUSH_MS, or sooner once WRITE_BEHIND_MAX_BATCH rows are waiting.
+
+    Durability (WRITE_BEHIND_DURABILITY):
+      - "journal" (default): each row is appended to a per-process journal file and fsynced
+        before the request is acknowledged. Journals are replayed on the next startup, and the
+        replay is idempotent because ids are preassigned. A crash loses nothing that was acknowledged.
+        Flushes use a plain INSERT: a row whose id was meanwhile taken by a writer outside the
+        allocator is written to conflicts-<pid>.jsonl in the journal directory, never dropped silently.
+      - "memory": rows live only in the in-process queue until the flush. A crash or kill -9
+        loses up to one flush interval of acknowledged analyses. Use it only when the rows can
+        be regenerated.
+
+    Until its batch commits, a queued row is visible through pending() in the process that
+    accepted it, which /results/<id> uses. Other workers see it once it is flushed.
+
+    Write-behind needs SQLite: the id allocator and the journal replay use SQLite statements.
+    """
+    mode = 'sync'
+    durability = 'journal'
+    flush_interval = 0.005
+    max_batch = 500
+    journal_dir = None
+
+    _app = None
+    _queue = None
+    _pending = {}
+    _pending_lock = threading.Lock()
+    _allocator = None
+    _thread = None
+    _thread_pid = None
+    _journal = None
+    _journal_lock = threading.Lock()
+    _keep_segments = False
+    _columns = [c.key for c in PropertyAnalysis.__table__.columns]
+
+    @classmethod
+    def init_app(cls, app):
+        cls.mode = app.config.get('ANALYSIS_WRITE_MODE', 'sync')
+        if cls.mode != 'write_behind':
+            return
+
+        with app.app_context():
+            dialect = db.engine.dialect.name
+        if dialect != 'sqlite':
+            raise ValueError(f"ANALYSIS_WRITE_MODE=write_behind requires SQLite, not {dialect}; use 'sync'")
+
+        cls._app = app
+        cls.durability = app.config.get('WRITE_BEHIND_DURABILITY', 'journal')
+        cls.flush_interval = app.config.get('WRITE_BEHIND_FLUSH_MS', 5) / 1000.0
+        cls.max_batch = app.config.get('WRITE_BEHIND_MAX_BATCH', 500)
+        cls.journal_dir = app.config.get('WRITE_BEHIND_JOURNAL_DIR') or os.path.join(app.instance_path, 'write_behind')
+        os.makedirs(cls.journal_dir, exist_ok=True)
+
+        with app.app_context():
+            cls._allocator = IdAllocator(db.engine, block_size=app.config.get('WRITE_BEHIND_ID_BLOCK', 100))
+            cls._replay_journals()
+
+        # Every insert in this process takes its id from the allocator, including bulk uploads
+        if not event.contains(PropertyAnalysis, 'before_insert', cls._assign_id):
+            event.listen(PropertyAnalysis, 'before_insert', cls._assign_id)
+        atexit.register(cls.shutdown)
+
+    @classmethod
+    def _assign_id(cls, mapper, connection, target):
+        if target.id is None and cls._allocator is not None:
+            target.id = cls._allocator.next_id()
+
+    @classmethod
+    def save(cls, analysis):
+        """Persists a new PropertyAnalysis; on return analysis.id is set and to_dict() is safe."""
+        if analysis.created_at is None:
+            analysis.created_at = datetime.utcnow()
+
+        if cls.mode != 'write_behind':
+            db.session.add(analysis)
+            db.session.commit()
+            return analysis
+
+        analysis.id = cls._allocator.next_id()
+        row = {key: getattr(analysis, key) for key in cls._columns}
+
+        cls._ensure_flusher()
+        with cls._pending_lock:
+            cls._pending[analysis.id] = analysis
+        cls._journal_and_enqueue(row)
+        return analysis
+
+    @classmethod
+    def pending(cls, analysis_id):
+        with cls._pending_lock:
+            return cls._pending.get(analysis_id)
+
+    # --- journal -------------------------------------------------------------
+
+    JOURNAL_ROTATE_SECONDS = 1.0
+    JOURNAL_ROTATE_BYTES = 1 << 20
+    _journal_seq = 0
+    _journal_opened = 0.0
+
+    @classmethod
+    def _open_segment(cls):
+        cls._journal_seq += 1
+        path = os.path.join(cls.journal_dir, f"journal-{os.getpid()}-{cls._journal_seq}.jsonl")
+        cls._journal = open(path, 'a', encoding='utf-8')
+        cls._journal_opened = time.monotonic()
+
+    @classmethod
+    def _journal_and_enqueue(cls, row):
+        """Journal append and enqueue happen under one lock so segment markers stay ordered."""
+        with cls._journal_lock:
+            if cls.durability == 'journal':
+                if cls._journal is None:
+                    cls._open_segment()
+                cls._journal.write(cls._encode(row) + "\n")
+                cls._journal.flush()
+                os.fsync(cls._journal.fileno())
+            cls._queue.put(row)
+
+    @staticmethod
+    def _encode(row):
+        return json.dumps(row, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+
+    @classmethod
+    def _write_lines(cls, path, rows):
+        with open(path, 'a', encoding='utf-8') as f:
+            for row in rows:
+                f.write(cls._encode(row) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def _maybe_rotate(cls):
+        """
+        Closes the current segment once it is old or large enough and queues a marker behind
+        its rows. When the batch containing the marker commits, the segment can be deleted.
+        """
+        with cls._journal_lock:
+            journal = cls._journal
+            if journal is None or journal.tell() == 0:
+                return
+            if (time.monotonic() - cls._journal_opened < cls.JOURNAL_ROTATE_SECONDS
+                    and journal.tell() < cls.JOURNAL_ROTATE_BYTES):
+                return
+            journal.close()
+            cls._journal = None
+            cls._queue.put(('segment_done', journal.name))
+
+    @staticmethod
+    def _pid_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    @classmethod
+    def _replay_journals(cls):
+        for path in sorted(glob.glob(os.path.join(cls.journal_dir, "journal-*.jsonl"))):
+            try:
+                pid = int(os.path.basename(path).split('-')[1])
+            except (IndexError, ValueError):
+                continue
+            # Segments of live workers (e.g. siblings booting alongside us) are theirs to flush
+            if pid == os.getpid() or cls._pid_alive(pid):
+                continue
+
+            rows = []
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue  # torn final write from the crash
+                    if row.get('created_at'):
+                        row['created_at'] = datetime.fromisoformat(row['created_at'])
+                    rows.append(row)
+            if rows:
+                # Rows from a flush that did commit before the crash are already there
+                with db.engine.begin() as conn:
+                    conn.execute(insert(PropertyAnalysis).prefix_with("OR IGNORE"), rows)
+                print(f"Write-behind: replayed {len(rows)} journaled analyses from {os.path.basename(path)}")
+            os.remove(path)
+
+    # --- flusher -------------------------------------------------------------
+
+    @classmethod
+    def _ensure_flusher(cls):
+        if cls._thread is not None and cls._thread_pid == os.getpid() and cls._thread.is_alive():
+            return
+        with cls._pending_lock:
+            if cls._thread is not None and cls._thread_pid == os.getpid() and cls._thread.is_alive():
+                return
+            # A flusher that died leaves its queue behind; only a forked child starts empty
+            if cls._queue is None or cls._thread_pid != os.getpid():
+                cls._queue = queue.Queue()
+            cls._thread_pid = os.getpid()
+            cls._thread = threading.Thread(target=cls._flush_loop, name="analysis-write-behind", daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def _flush_loop(cls):
+        while True:
+            first = cls._queue.get()
+            if first is None:
+                return
+            items = [first]
+            deadline = time.monotonic() + cls.flush_interval
+            stop = False
+            while len(items) < cls.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = cls._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                items.append(item)
+
+            batch = [i for i in items if isinstance(i, dict)]
+            segments = [i[1] for i in items if isinstance(i, tuple)]
+            if cls._write_batch(batch) and not cls._keep_segments:
+                for path in segments:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            if cls.durability == 'journal':
+                cls._maybe_rotate()
+            if stop:
+                return
+
+    @classmethod
+    def _write_batch(cls, batch):
+        if not batch:
+            return True
+        for attempt in range(5):
+            try:
+                with cls._app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(insert(PropertyAnalysis), batch)
+                break
+            except IntegrityError:
+                # An id was taken by a writer that bypasses the allocator; save what can be saved
+                cls._write_rows_individually(batch)
+                break
+            except Exception as e:
+                print(f"Write-behind flush of {len(batch)} rows failed (attempt {attempt + 1}): {e}")
+                time.sleep(0.05 * 2 ** attempt)
+        else:
+            if cls.durability != 'journal':
+                # Nothing else holds these rows, so spill them to a segment for replay on restart
+                with cls._journal_lock:
+                    cls._journal_seq += 1
+                    path = os.path.join(cls.journal_dir, f"journal-{os.getpid()}-{cls._journal_seq}.jsonl")
+                cls._write_lines(path, batch)
+            # Keep every segment from here on so the next startup replays these rows
+            print(f"Write-behind: giving up on {len(batch)} rows; they remain in the journal")
+            cls._keep_segments = True
+            return False
+
+        with cls._pending_lock:
+            for row in batch:
+                cls._pending.pop(row['id'], None)
+        return True
+
+    @classmethod
+    def _write_rows_individually(cls, batch):
+        """Inserts rows one at a time; rows whose id belongs to a different analysis go to a conflicts file."""
+        conflicts = []
+        with cls._app.app_context():
+            for row in batch:
+                try:
+                    with db.engine.begin() as conn:
+                        conn.execute(insert(PropertyAnalysis), [row])
+                except IntegrityError:
+                    table = PropertyAnalysis.__table__
+                    with db.engine.connect() as conn:
+                        existing = conn.execute(select(table.c.created_at, table.c.property_name)
+                                                .where(table.c.id == row['id'])).first()
+                    # The same row means an earlier attempt did commit
+                    if existing is None or tuple(existing) != (row.get('created_at'), row.get('property_name')):
+                        conflicts.append(row)
+        if conflicts:
+            path = os.path.join(cls.journal_dir, f"conflicts-{os.getpid()}.jsonl")
+            cls._write_lines(path, conflicts)
+            print(f"Write-behind: {len(conflicts)} analyses collided with existing ids "
+                  f"{[row['id'] for row in conflicts]}; saved to {path}")
+
+    @classmethod
+    def flush(cls, timeout=5.0):
+        """Blocks until everything queued so far has been committed."""
+        if cls.mode != 'write_behind' or cls._queue is None:
+            return
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with cls._pending_lock:
+                if not cls._pending:
+                    return
+            time.sleep(cls.flush_interval)
+
+    @classmethod
+    def shutdown(cls):
+        if cls._thread is not None and cls._thread_pid == os.getpid() and cls._thread.is_alive():
+            with cls._journal_lock:
+                if cls._journal is not None:
+                    cls._journal.close()
+                    cls._queue.put(('segment_done', cls._journal.name))
+                    cls._journal = None
+            cls._queue.put(None)
+            cls._thread.join(timeout=10)
@@ -0,0 +1,254 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+
+from services.analysis_depth import AnalysisDepth, InvalidDepth
+from services.analysis_pipeline import apply_ml_score, build_analysis_record, log_training_row
+from services.analysis_writer import AnalysisWriter
+from services.climate_engine import ClimateEngine
+from services.provider_cassettes import ProviderCassettes
+from services.report_cache import ReportCache
+from services.result_serializer import ResultSerializer, V2_MEDIA_TYPE, VERSIONS
+from services.scoring_profiles import ScoringProfiles, UnknownProfile
+from services.rate_limiter import ProviderRateLimiter
+from services.single_flight import SingleFlight
+
+# Analysis endpoints served on the event loop; both mirror their Flask views in analysis_routes.py
+ROUTES = {
+    '/api/analyze': {"log_training_row": True, "default_asset_value": 0, "name_keys": ('property_id',), "status": 200},
+    '/api/analyze-property': {"log_training_row": False, "default_asset_value": 100000,
+                              "name_keys": ('property_name', 'property_id'), "status": 201},
+}
+
+
+class AsyncProviders:
+    """
+    The ClimateEngine provider calls over one shared httpx.AsyncClient, limited per provider by
+    asyncio semaphores sized from ClimateEngine.PROVIDER_LIMITS (the same per-process limits the
+    sync path applies with threads). Cassette record/replay applies here too.
+    """
+
+    def __init__(self, max_connections=200):
+        self.client = httpx.AsyncClient(limits=httpx.Limits(max_connections=max_connections,
+                                                            max_keepalive_connections=max_connections))
+        self._slots = {}
+
+    def _slot(self, provider):
+        slot = self._slots.get(provider)
+        if slot is None:
+            slot = asyncio.Semaphore(max(1, int(ClimateEngine.PROVIDER_LIMITS.get(provider, 4))))
+            self._slots[provider] = slot
+        return slot
+
+    async def _send(self, provider, method, url, **kwargs):
+        await ProviderRateLimiter.aacquire(provider)
+        response = await self.client.request(method, url, **kwargs)
+        ProviderRateLimiter.observe(provider, response)
+        return response
+
+    async def request(self, provider, method, url, **kwargs):
+        async with self._slot(provider):
+            if ProviderCassettes.active():
+                return await ProviderCassettes.arequest(provider, method, url, partial(self._send, provider), **kwargs)
+            return await self._send(provider, method, url, **kwargs)
+
+    async def fetch(self, provider, method, url, kwargs, parse, fallback, label):
+        """ClimateEngine._fetch on the event loop."""
+        return (await self.fetch_sourced(provider, method, url, kwargs, parse, fallback, label))[0]
+
+    async def fetch_sourced(self, provider, method, url, kwargs, parse, fallback, label, cached_only=False):
+        """ClimateEngine._fetch_sourced on the event loop: (value, 'live' | 'cached' | 'fallback')."""
+        key = ClimateEngine.call_key(provider, method, url, kwargs)
+        if cached_only:
+            result = ClimateEngine._cached(provider, method, url, kwargs, parse, key)
+            return (fallback, 'fallback') if result is None else (result, 'cached')
+
+        async def call():
+            response = await self.request(provider, method, url, **kwargs)
+            return parse(response.json())
+        try:
+            result = await SingleFlight.ado(key, call)
+        except Exception as e:
+            print(f"{label}: {e}")
+            return fallback, 'fallback'
+        return (fallback, 'fallback') if result is None else (result, 'live')
+
+    async def signals(self, lat, lon, land_use=True, cached_only=False):
+        """All of one analysis's provider signals, fetched concurrently, as {name: (value, source)}."""
+        calls = ClimateEngine._signal_calls(lat, lon, land_use)
+        fetched = await asyncio.gather(*(self.fetch_sourced(*spec, cached_only=cached_only) for spec in calls.values()))
+        return dict(zip(calls, fetched))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class AsyncAnalysisApp:
+    """
+    ASGI application: POST /api/analyze and /api/analyze-property run on the event loop, every
+    other request goes to the Flask app through asgiref's WsgiToAsgi.
+
+    An analysis awaits geocoding and then its four provider calls concurrently, so one worker
+    holds hundreds of in-flight analyses instead of one per sync worker. CPU and database steps
+    (ML scoring, persistence, encoding) run in the default thread pool inside an app context; the
+    Gemini explanation runs on its own pool of GEMINI_CONCURRENCY threads, once, for the final
+    score. Requests carrying an Authorization header to /api/analyze-property, and bodies that are
+    not a JSON object, are handed to the Flask view so JWT and error handling stay identical.
+
+        uvicorn asgi:app --workers 1
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.max_connections = int(flask_app.config.get('ASYNC_MAX_CONNECTIONS', 200))
+        self.gemini_pool = ThreadPoolExecutor(max_workers=int(flask_app.config.get('GEMINI_CONCURRENCY', 16)),
+                                              thread_name_prefix="gemini")
+        self.providers = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] in ROUTES:
+            return await self._analyze(scope, receive, send, ROUTES[scope['path']])
+        return await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.providers = AsyncProviders(self.max_connections)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.providers is not None:
+                    await self.providers.aclose()
+                self.gemini_pool.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # --- request handling -----------------------------------------------------------
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    @staticmethod
+    async def _respond(send, status, body, content_type='application/json', headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', content_type.encode()),
+                (b'content-length', str(len(body)).encode()),
+                (b'access-control-allow-origin', b'*'),
+                *headers,
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _error(self, send, message, status=400):
+        await self._respond(send, status, json.dumps({"error": message}).encode('utf-8'))
+
+    async def _to_flask(self, scope, body, send):
+        async def replay():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await self.wsgi(scope, replay, send)
+
+    @staticmethod
+    def _version(query, headers):
+        """ResultSerializer.requested_version() for an ASGI request."""
+        try:
+            version = int(query['v'][0]) if 'v' in query else None
+        except ValueError:
+            version = None
+        if version is None and V2_MEDIA_TYPE in headers.get('accept', ''):
+            version = 2
+        return version if version in VERSIONS else 1
+
+    async def _analyze(self, scope, receive, send, route):
+        body = await self._read_body(receive)
+        headers = {k.decode('latin1').lower(): v.decode('latin1') for k, v in scope['headers']}
+        try:
+            data = json.loads(body or b'null')
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or (route['status'] == 201 and 'authorization' in headers):
+            return await self._to_flask(scope, body, send)
+
+        query = parse_qs(scope.get('query_string', b'').decode('latin1'))
+        try:
+            profile = ScoringProfiles.get(query.get('profile', [None])[0] or data.get('scoring_profile'),
+                                          headers.get('x-tenant'))
+        except UnknownProfile as e:
+            return await self._error(send, f"Unknown scoring profile: {e.args[0]}")
+        try:
+            depth = AnalysisDepth.for_request(data, {name: values[0] for name, values in query.items()})
+        except InvalidDepth as e:
+            return await self._error(send, str(e))
+
+        providers = self.providers
+        if providers is None:  # server without lifespan support
+            providers = self.providers = AsyncProviders(self.max_connections)
+
+        # STEP 1 & 2 — INPUT HANDLING & GEOCODING, as in ClimateEngine.analyze
+        lat, lon = data.get('latitude'), data.get('longitude')
+        display_name = data.get('address') or data.get('pincode')
+        if lat is None or lon is None:
+            location = data.get('address') or data.get('pincode')
+            if not location:
+                return await self._error(send, "Missing location information")
+            geo_result = await providers.fetch(*ClimateEngine._geocode_call(location))
+            if not geo_result:
+                return await self._error(send, f"Could not find coordinates for: {location}")
+            lat, lon, display_name = geo_result['lat'], geo_result['lon'], geo_result['display_name']
+        try:
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            return await self._to_flask(scope, body, send)
+        display_name = display_name or f"{lat}, {lon}"
+
+        fetched = await providers.signals(lat, lon, 'land_use' in depth, 'live_providers' not in depth)
+        signals = {name: value for name, (value, _) in fetched.items()}
+        result = ClimateEngine.analyze_signals(lat, lon, display_name, signals, explain=False, profile=profile)
+        result['signal_sources'] = ClimateEngine.signal_sources(fetched)
+        await asyncio.to_thread(self._score, result, profile, route, depth)
+
+        if 'explanation' in depth:
+            loop = asyncio.get_running_loop()
+            result['ai_insights'] = await loop.run_in_executor(
+                self.gemini_pool, ClimateEngine._generate_explanation,
+                result['climate_score'], result['risk_profile'],
+                result.get('temperature_projection', []), result.get('environment', {})
+            )
+
+        version = self._version(query, headers)
+        payload = await asyncio.to_thread(self._persist, data, result, route, version, depth)
+        status = route['status'] if 'persist' in depth else 200
+        await self._respond(send, status, payload,
+                            V2_MEDIA_TYPE if version == 2 else 'application/json',
+                            [(b'x-result-version', str(version).encode())])
+
+    def _score(self, result, profile, route, depth):
+        with self.flask_app.app_context():
+            if route['log_training_row'] and 'live_providers' in depth:
+                log_training_row(result)
+            apply_ml_score(result, explain=False, profile=profile)
+
+    def _persist(self, data, result, route, version, depth):
+        with self.flask_app.app_context():
+            analysis = build_analysis_record(data, result, default_asset_value=route['default_asset_value'],
+                                             name_keys=route['name_keys'])
+            if 'persist' in depth:
+                AnalysisWriter.save(analysis)
+                ReportCache.prerender(analysis)
+            return ResultSerializer.encode(analysis, version, depth.describe(data, result['signal_sources']))
@@ -0,0 +1,185 @@
+import csv
+import io
+import multiprocessing as mp
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+
+from services.export_service import ChunkSink
+from services.report_cache import ReportCache, REPORT_FIELDS
+
+
+class BatchReportService:
+    """
+    Renders many property reports in parallel and streams them into one ZIP archive.
+
+    Rows are read up front (only the columns the report prints) and handed to a process pool
+    of REPORT_BATCH_WORKERS workers, so rendering scales with cores instead of being serialized
+    by the GIL. Each PDF is appended to the archive as soon as it finishes, with at most two
+    renders per worker in flight, so memory stays flat however many reports are requested.
+    Reports already in the ReportCache are read from disk and fresh renders are added to it.
+    The archive ends with manifest.csv, which lists each id with its file name or error.
+    """
+    max_reports = 2000
+    workers = os.cpu_count() or 1
+
+    _pool = None
+    _pool_pid = None
+    _pool_lock = threading.Lock()
+
+    @classmethod
+    def init_app(cls, app):
+        cls.max_reports = app.config.get('REPORT_BATCH_MAX', 2000)
+        cls.workers = app.config.get('REPORT_BATCH_WORKERS') or os.cpu_count() or 1
+
+    @classmethod
+    def _get_pool(cls, workers):
+        from services.report_service import init_render_worker
+        with cls._pool_lock:
+            if cls._pool is None or cls._pool_pid != os.getpid() or cls._pool._max_workers != workers:
+                if cls._pool is not None and cls._pool_pid == os.getpid():
+                    cls._pool.shutdown(wait=False, cancel_futures=True)
+                # spawn, not fork: the web process has threads (write-behind, pre-render) holding locks
+                cls._pool = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=mp.get_context('spawn'), initializer=init_render_worker
+                )
+                cls._pool_pid = os.getpid()
+            return cls._pool
+
+    @classmethod
+    def _reset_pool(cls):
+        with cls._pool_lock:
+            cls._pool = None
+
+    @classmethod
+    def load_rows(cls, ids=None, user_id=None, risk_level=None, max_score=None):
+        """Report fields for the requested ids or portfolio filter, ordered by id."""
+        from sqlalchemy import select
+        from database import db
+        from models.property import PropertyAnalysis
+
+        table = PropertyAnalysis.__table__
+        stmt = select(*[table.c[field] for field in REPORT_FIELDS]).order_by(table.c.id)
+        if ids is not None:
+            stmt = stmt.where(table.c.id.in_(ids))
+        if user_id:
+            from models.portfolio import PortfolioAsset
+            stmt = stmt.join(PortfolioAsset.__table__, PortfolioAsset.property_id == table.c.id) \
+                       .where(PortfolioAsset.user_id == user_id)
+        if risk_level:
+            stmt = stmt.where(table.c.risk_level == risk_level)
+        if max_score is not None:
+            stmt = stmt.where(table.c.climate_score <= max_score)
+        stmt = stmt.limit(cls.max_reports + 1)
+        return [dict(row) for row in db.session.execute(stmt).mappings()]
+
+    @staticmethod
+    def file_name(analysis_id):
+        return f"Climate_Report_{analysis_id}.pdf"
+
+    @classmethod
+    def stream_zip(cls, rows, workers=None):
+        """Generator of ZIP archive bytes; entries are appended in completion order."""
+        from services.report_service import render_report_fields
+        workers = max(1, workers or cls.workers)
+        sink = ChunkSink()
+        archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED)  # PDFs are already compressed
+        manifest = []
+        digests = {}
+
+        def add(analysis_id, pdf):
+            # The cache is best effort: a failed store (e.g. disk full) must not turn a rendered
+            # report into an error row, so it is kept out of the caller's exception handling
+            try:
+                ReportCache.store(analysis_id, digests[analysis_id], pdf)
+            except Exception as e:
+                print(f"Batch reports: could not cache report {analysis_id}: {e}")
+            archive.writestr(cls.file_name(analysis_id), pdf)
+            manifest.append((analysis_id, cls.file_name(analysis_id), ''))
+
+        pending_rows = []
+        for fields in rows:
+            path, digest = ReportCache.lookup(SimpleNamespace(**fields))
+            digests[fields['id']] = digest
+            pdf = None
+            if path is not None:
+                try:
+                    with open(path, 'rb') as f:
+                        pdf = f.read()
+                except OSError:
+                    pdf = None
+            if pdf is None:
+                pending_rows.append(fields)
+                continue
+            archive.writestr(cls.file_name(fields['id']), pdf)
+            manifest.append((fields['id'], cls.file_name(fields['id']), ''))
+            yield sink.drain()
+
+        if workers == 1 or len(pending_rows) <= 1:
+            for fields in pending_rows:
+                try:
+                    add(*render_report_fields(fields))
+                except Exception as e:
+                    manifest.append((fields['id'], '', str(e)))
+                yield sink.drain()
+        else:
+            yield from cls._render_parallel(pending_rows, workers, add, manifest, sink)
+
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerow(['analysis_id', 'file', 'error'])
+        writer.writerows(manifest)
+        archive.writestr('manifest.csv', text.getvalue())
+        archive.close()
+        yield sink.drain()
+
+    @classmethod
+    def _render_parallel(cls, rows, workers, add, manifest, sink):
+        from services.report_service import render_report_fields
+        pool = cls._get_pool(workers)
+        window = workers * 2
+        queue = iter(rows)
+        in_flight = {}
+
+        def submit_next():
+            fields = next(queue, None)
+            if fields is not None:
+                in_flight[pool.submit(render_report_fields, fields)] = fields
+
+        leftover = []
+        try:
+            for _ in range(window):
+                submit_next()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    fields = in_flight.pop(future)
+                    try:
+                        add(*future.result())
+                    except BrokenProcessPool:
+                        leftover.append(fields)
+                        continue
+                    except Exception as e:
+                        manifest.append((fields['id'], '', str(e)))
+                    submit_next()
+                yield sink.drain()
+                if leftover:
+                    break
+        finally:
+            # Client went away or a worker died: drop whatever has not started yet
+            for future in in_flight:
+                future.cancel()
+
+        if leftover:
+            # A worker died (OOM kill, crash); finish the archive in this process
+            print("Batch report pool broke, rendering the remaining reports inline")
+            cls._reset_pool()
+            for fields in leftover + list(in_flight.values()) + list(queue):
+                try:
+                    add(*render_report_fields(fields))
+                except Exception as e:
+                    manifest.append((fields['id'], '', str(e)))
+                yield sink.drain()
@@ -0,0 +1,296 @@
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update, select, or_
+
+from database import db
+from models.bulk_job import BulkAnalysisJob, BulkAnalysisRow
+from models.portfolio import PortfolioAsset
+from services.climate_engine import ClimateEngine
+from services.analysis_pipeline import apply_ml_score, build_analysis_record
+from services.scoring_profiles import ScoringProfiles, UnknownProfile
+from services.task_queue import TaskQueue
+
+
+class BulkAnalysisService:
+    """
+    Runs the real ClimateEngine pipeline over an uploaded portfolio in the background.
+
+    Every row is checkpointed in the same transaction as its PropertyAnalysis insert, so a job
+    that is interrupted (crash, deploy, cancel) can be resumed and will only pick up rows that
+    are still pending.
+    """
+    HEARTBEAT_STALE_SECONDS = 60
+    HEARTBEAT_SECONDS = 10
+
+    @staticmethod
+    def create_job(items, user_id=None, include_explanations=False):
+        job = BulkAnalysisJob(
+            user_id=user_id,
+            include_explanations=include_explanations,
+            total_rows=len(items)
+        )
+        db.session.add(job)
+        db.session.flush()
+
+        if items:
+            db.session.execute(insert(BulkAnalysisRow), [
+                {"job_id": job.id, "row_index": i, "payload": item, "status": "pending"}
+                for i, item in enumerate(items)
+            ])
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def _new_owner():
+        return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @classmethod
+    def claim(cls, job_id, owner, force=False):
+        """Atomically takes ownership of a job. Fails if another live runner holds it."""
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=cls.HEARTBEAT_STALE_SECONDS)
+
+        stmt = update(BulkAnalysisJob).where(
+            BulkAnalysisJob.id == job_id,
+            BulkAnalysisJob.status.in_(['queued', 'running'])
+        )
+        if not force:
+            stmt = stmt.where(or_(
+                BulkAnalysisJob.status == 'queued',
+                BulkAnalysisJob.heartbeat_at.is_(None),
+                BulkAnalysisJob.heartbeat_at < stale
+            ))
+        stmt = stmt.values(
+            status='running',
+            owner=owner,
+            heartbeat_at=now,
+            run_started_at=now,
+            run_start_completed=BulkAnalysisJob.completed_rows,
+            error=None
+        )
+        claimed = db.session.execute(stmt).rowcount == 1
+        db.session.commit()
+        return claimed
+
+    @classmethod
+    def start(cls, app, job_id, force=False):
+        """Claims the job and runs it on a background thread. Returns False if it is already running."""
+        if TaskQueue.queued_dispatch():
+            # A worker process (worker.py) claims and runs it instead
+            TaskQueue.enqueue('bulk.analysis', {"job_id": job_id, "force": force}, dedupe_key=f"bulk-job:{job_id}")
+            return True
+
+        owner = cls._new_owner()
+        if not cls.claim(job_id, owner, force=force):
+            return False
+
+        thread = threading.Thread(
+            target=cls._run, args=(app, job_id, owner),
+            name=f"bulk-job-{job_id}", daemon=True
+        )
+        thread.start()
+        return True
+
+    @classmethod
+    def resume_interrupted(cls, app):
+        """Restarts queued jobs and running jobs whose runner stopped sending heartbeats."""
+        with app.app_context():
+            stale = datetime.utcnow() - timedelta(seconds=cls.HEARTBEAT_STALE_SECONDS)
+            job_ids = db.session.scalars(select(BulkAnalysisJob.id).where(or_(
+                BulkAnalysisJob.status == 'queued',
+                (BulkAnalysisJob.status == 'running') & (BulkAnalysisJob.heartbeat_at < stale)
+            ))).all()
+            for job_id in job_ids:
+                cls.start(app, job_id)
+            return job_ids
+
+    @classmethod
+    def cancel(cls, job_id):
+        result = db.session.execute(
+            update(BulkAnalysisJob)
+            .where(BulkAnalysisJob.id == job_id, BulkAnalysisJob.status.in_(['queued', 'running']))
+            .values(status='cancelled', owner=None, finished_at=datetime.utcnow())
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    @classmethod
+    def _run(cls, app, job_id, owner):
+        with app.app_context():
+            job = db.session.get(BulkAnalysisJob, job_id)
+            include_explanations = job.include_explanations
+            user_id = job.user_id
+            workers = max(1, int(app.config.get('BULK_JOB_WORKERS', 8)))
+
+            pending = db.session.scalars(
+                select(BulkAnalysisRow.id)
+                .where(BulkAnalysisRow.job_id == job_id, BulkAnalysisRow.status == 'pending')
+                .order_by(BulkAnalysisRow.row_index)
+            ).all()
+            db.session.remove()
+
+        stop = threading.Event()
+        # A single row can wait on provider rate limits for longer than the stale window,
+        # so liveness is signalled on a timer rather than per finished row
+        done = threading.Event()
+        beat = threading.Thread(target=cls._heartbeat, args=(app, job_id, owner, stop, done),
+                                name=f"bulk-{job_id}-heartbeat", daemon=True)
+        beat.start()
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"bulk-{job_id}") as pool:
+                # Keep a bounded window of rows in flight so a cancel takes effect quickly
+                in_flight = set()
+                for row_id in pending:
+                    if stop.is_set():
+                        break
+                    in_flight.add(pool.submit(
+                        cls._process_row, app, job_id, row_id, owner, user_id, include_explanations, stop
+                    ))
+                    if len(in_flight) >= workers * 2:
+                        _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                wait(in_flight)
+        except Exception as e:
+            print(f"Bulk job {job_id} runner crashed: {e}")
+            with app.app_context():
+                db.session.execute(
+                    update(BulkAnalysisJob)
+                    .where(BulkAnalysisJob.id == job_id, BulkAnalysisJob.owner == owner)
+                    .values(status='failed', error=str(e), finished_at=datetime.utcnow())
+                )
+                db.session.commit()
+            return
+        finally:
+            done.set()
+            beat.join()
+
+        with app.app_context():
+            # Only the current owner may finalize; a cancelled or re-claimed job is left alone
+            remaining = db.session.scalar(
+                select(db.func.count(BulkAnalysisRow.id))
+                .where(BulkAnalysisRow.job_id == job_id, BulkAnalysisRow.status == 'pending')
+            )
+            if remaining == 0:
+                db.session.execute(
+                    update(BulkAnalysisJob)
+                    .where(BulkAnalysisJob.id == job_id, BulkAnalysisJob.owner == owner,
+                           BulkAnalysisJob.status == 'running')
+                    .values(status='completed', owner=None, finished_at=datetime.utcnow())
+                )
+                db.session.commit()
+
+    @classmethod
+    def _heartbeat(cls, app, job_id, owner, stop, done):
+        """Keeps the job's heartbeat fresh while it runs; stops the rows if the job was cancelled or taken over."""
+        while not done.wait(cls.HEARTBEAT_SECONDS):
+            try:
+                with app.app_context():
+                    owned = db.session.execute(
+                        update(BulkAnalysisJob)
+                        .where(BulkAnalysisJob.id == job_id, BulkAnalysisJob.owner == owner,
+                               BulkAnalysisJob.status == 'running')
+                        .values(heartbeat_at=datetime.utcnow())
+                    ).rowcount
+                    db.session.commit()
+                if owned == 0:
+                    stop.set()
+                    return
+            except Exception as e:
+                print(f"Bulk job {job_id} heartbeat failed: {e}")
+
+    @classmethod
+    def _process_row(cls, app, job_id, row_id, owner, user_id, include_explanations, stop):
+        if stop.is_set():
+            return
+
+        with app.app_context():
+            row = db.session.get(BulkAnalysisRow, row_id)
+            if row is None or row.status != 'pending':
+                return
+            payload = dict(row.payload or {})
+            db.session.rollback()
+
+            analysis = None
+            error = None
+            try:
+                profile = ScoringProfiles.get(payload.get('scoring_profile'))
+                analysis_result = ClimateEngine.analyze(payload, explain=include_explanations, profile=profile)
+                if "error" in analysis_result:
+                    error = analysis_result["error"]
+                else:
+                    apply_ml_score(analysis_result, explain=include_explanations, profile=profile)
+                    analysis = build_analysis_record(payload, analysis_result)
+            except UnknownProfile as e:
+                error = f"Unknown scoring profile: {e.args[0]}"
+            except Exception as e:
+                error = str(e)
+
+            try:
+                now = datetime.utcnow()
+                if analysis is not None:
+                    db.session.add(analysis)
+                    db.session.flush()
+                    if user_id:
+                        db.session.add(PortfolioAsset(user_id=user_id, property_id=analysis.id))
+                    row_values = dict(status='done', analysis_id=analysis.id, climate_score=analysis.climate_score,
+                                      risk_level=analysis.risk_level, completed_at=now)
+                    counter = {"completed_rows": BulkAnalysisJob.completed_rows + 1}
+                else:
+                    row_values = dict(status='failed', error=error, completed_at=now)
+                    counter = {"failed_rows": BulkAnalysisJob.failed_rows + 1}
+
+                # Checkpoint: the row flip, the counters and the analysis insert commit together.
+                # If the row was already handled or the job changed hands, nothing is written.
+                flipped = db.session.execute(
+                    update(BulkAnalysisRow)
+                    .where(BulkAnalysisRow.id == row_id, BulkAnalysisRow.status == 'pending')
+                    .values(attempts=BulkAnalysisRow.attempts + 1, **row_values)
+                ).rowcount
+                owned = db.session.execute(
+                    update(BulkAnalysisJob)
+                    .where(BulkAnalysisJob.id == job_id, BulkAnalysisJob.owner == owner,
+                           BulkAnalysisJob.status == 'running')
+                    .values(heartbeat_at=now, **counter)
+                ).rowcount
+
+                if flipped == 1 and owned == 1:
+                    db.session.commit()
+                else:
+                    db.session.rollback()
+                    if owned == 0:
+                        stop.set()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Bulk job {job_id}: failed to checkpoint row {row_id}: {e}")
+                cls._mark_failed(job_id, row_id, owner, str(e))
+
+    @staticmethod
+    def _mark_failed(job_id, row_id, owner, error):
+        try:
+            flipped = db.session.execute(
+                update(BulkAnalysisRow)
+                .where(BulkAnalysisRow.id == row_id, BulkAnalysisRow.status == 'pending')
+                .values(status='failed', error=error, attempts=BulkAnalysisRow.attempts + 1,
+                        completed_at=datetime.utcnow())
+            ).rowcount
+            if flipped:
+                db.session.execute(
+                    update(BulkAnalysisJob)
+                    .where(BulkAnalysisJob.id == job_id, BulkAnalysisJob.owner == owner)
+                    .values(failed_rows=BulkAnalysisJob.failed_rows + 1, heartbeat_at=datetime.utcnow())
+                )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+
+    @staticmethod
+    def results(job_id, offset=0, limit=100):
+        rows = (BulkAnalysisRow.query
+                .filter(BulkAnalysisRow.job_id == job_id, BulkAnalysisRow.status != 'pending')
+                .order_by(BulkAnalysisRow.row_index)
+                .offset(offset).limit(limit).all())
+        return [r.to_dict() for r in rows]
@@ -1,15 +1,37 @@
+import copy
 import requests
 import os
-import google.generativeai as genai
 import random
+import threading
+from contextlib import contextmanager
+from functools import partial
 from dotenv import load_dotenv
 
+from services.scoring_profiles import ScoringProfiles
+from services.request_profiler import profile_stage
+from services.provider_cassettes import ProviderCassettes, normalize_request
+from services.single_flight import SingleFlight, flight_key
+from services.rate_limiter import ProviderRateLimiter
+
 load_dotenv()
 
-# Configure Gemini
+# Gemini SDK: imported and configured on first use, since importing it takes most of a second
 api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def gemini():
+    """The google.generativeai module, configured with GEMINI_API_KEY."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                if api_key:
+                    genai.configure(api_key=api_key)
+                _genai = genai
+    return _genai
 
 class ClimateEngine:
     # API endpoints
@@ -18,6 +40,60 @@ class ClimateEngine:
     OVERPASS_URL = "https://overpass-api.de/api/interpreter"
     NASA_POWER_URL = "https://power.larc.nasa.gov/api/temporal/climatology/point"
     ELEVATION_URL = "https://api.open-elevation.com/api/v1/lookup"
+
+    # Provider signals behind one analysis (see _signal_calls)
+    SIGNALS = ("temperature_trend", "environment", "precipitation", "elevation")
+
+    # Max in-flight requests per provider within one process (overridable via PROVIDER_CONCURRENCY)
+    PROVIDER_LIMITS = {
+        "nominatim": 1,
+        "open_meteo": 4,
+        "overpass": 2,
+        "nasa_power": 4,
+        "elevation": 4
+    }
+    _provider_slots = {}
+    _slots_lock = threading.Lock()
+
+    @classmethod
+    def configure_provider_limits(cls, limits):
+        with cls._slots_lock:
+            cls.PROVIDER_LIMITS = {**cls.PROVIDER_LIMITS, **(limits or {})}
+            cls._provider_slots = {}
+
+    @classmethod
+    def configure_provider_urls(cls, urls):
+        """Points providers at other endpoints (e.g. local stand-ins); unset entries keep the public URLs."""
+        for name, url in (urls or {}).items():
+            if url:
+                setattr(cls, name, url)
+
+    @classmethod
+    @contextmanager
+    def _provider_slot(cls, provider):
+        with cls._slots_lock:
+            slot = cls._provider_slots.get(provider)
+            if slot is None:
+                slot = threading.BoundedSemaphore(max(1, int(cls.PROVIDER_LIMITS.get(provider, 4))))
+                cls._provider_slots[provider] = slot
+        with slot:
+            yield
+
+    @classmethod
+    def _request(cls, provider, method, url, **kwargs):
+        """Single choke point for outbound provider calls."""
+        with profile_stage(f"network:{provider}"), cls._provider_slot(provider):
+            if ProviderCassettes.active():
+                return ProviderCassettes.request(provider, method, url, send=partial(cls._send, provider), **kwargs)
+            return cls._send(provider, method, url, **kwargs)
+
+    @staticmethod
+    def _send(provider, method, url, **kwargs):
+        """A live provider call, paced by the provider's rate limit (replays skip it)."""
+        ProviderRateLimiter.acquire(provider)
+        response = requests.request(method, url, **kwargs)
+        ProviderRateLimiter.observe(provider, response)
+        return response
     
     @classmethod
     def generate_climate_analysis(cls, lat, lon):
@@ -71,10 +147,15 @@ class ClimateEngine:
         }
     
     @classmethod
-    def analyze(cls, data):
+    def analyze(cls, data, explain=True, profile=None, depth=None):
         """
         Accepts property data, returns strictly numeric climate analysis.
         Ensures compatibility with existing charts (Radar, Line, Pie).
+        Pass explain=False to skip the Gemini explanation (e.g. bulk screening).
+        profile is a CompiledProfile for the score weights and loan bands (default profile if None).
+        depth is an AnalysisDepth; without its land_use stage Overpass is skipped, and without
+        live_providers only provider results cached on this host are used. The result's
+        signal_sources says whether each signal was live, cached or a fallback.
         """
         # STEP 1 & 2 — INPUT HANDLING & GEOCODING
         lat = data.get('latitude')
@@ -85,11 +166,11 @@ class ClimateEngine:
             query = data.get('address') or data.get('pincode')
             if not query:
                 return {"error": "Missing location information"}
-            
+
             geo_result = cls._geocode(query)
             if not geo_result:
                 return {"error": f"Could not find coordinates for: {query}"}
-            
+
             lat = geo_result['lat']
             lon = geo_result['lon']
             display_name = geo_result['display_name']
@@ -97,27 +178,48 @@ class ClimateEngine:
         # Ensure numeric lat/lon
         lat = float(lat)
         lon = float(lon)
+        if not display_name:
+            display_name = f"{lat}, {lon}"
+
+        land_use = depth is None or 'land_use' in depth
+        cached_only = depth is not None and 'live_providers' not in depth
+        fetched = {name: cls._fetch_sourced(*spec, cached_only=cached_only)
+                   for name, spec in cls._signal_calls(lat, lon, land_use).items()}
+        signals = {name: value for name, (value, _) in fetched.items()}
+        result = cls.analyze_signals(lat, lon, display_name, signals, explain, profile)
+        result['signal_sources'] = cls.signal_sources(fetched)
+        return result
+
+    @classmethod
+    def analyze_signals(cls, lat, lon, display_name, signals, explain=True, profile=None, base=None):
+        """
+        The rest of analyze() once the provider signals are in: signals maps each _signal_calls()
+        name to its parsed value (or fallback). Makes no network calls except the Gemini explanation.
+        base is a generate_climate_analysis() result to refine (left unchanged); the streaming
+        endpoint passes the same one at every stage so provisional and refined results agree.
+        """
+        profile = profile or ScoringProfiles.get()
 
         # 1. ALWAYS GENERATE VALID NUMERIC DATA (Requirement 1 & 2)
-        analysis = cls.generate_climate_analysis(lat, lon)
-        
+        analysis = copy.deepcopy(base) if base is not None else cls.generate_climate_analysis(lat, lon)
+
         # 2. ATTEMPT REAL API REFINEMENT (Requirement 2)
         try:
-            temp_trend_raw = cls._get_temperature_trends(lat, lon)
+            temp_trend_raw = signals['temperature_trend']
             if temp_trend_raw and len(temp_trend_raw) >= 5:
                 # Update structured trend
                 years = [2030, 2040, 2050, 2060, 2070]
                 analysis["temperature_trend"] = [
                     {"year": years[i], "value": float(temp_trend_raw[i])} for i in range(5)
                 ]
-            
-            real_env = cls._get_environmental_data(lat, lon)
+
+            real_env = signals.get('environment')
             if real_env:
                 analysis["environmental_composition"] = real_env
-                
-            precip = cls._get_precipitation_data(lat, lon)
-            elevation = cls._get_elevation_data(lat, lon)
-            
+
+            precip = signals['precipitation']
+            elevation = signals['elevation']
+
             # Recalculate risks using real data if available
             import random
             real_risks = cls._calculate_risk_profile(
@@ -136,19 +238,15 @@ class ClimateEngine:
         except Exception as e:
             print(f"Real-time refinement failed, using fallback: {e}")
 
-        # 3. CALCULATE FINAL SCORE
+        # 3. CALCULATE FINAL SCORE (weights come from the scoring profile)
         risks = analysis["risk_profile"]
-        score = 100 - (
-            risks['heat'] * 0.30 +
-            risks['flood'] * 0.30 +
-            risks['sea_level'] * 0.20 +
-            analysis['environmental_composition']['built_up'] * 0.20
-        )
-        climate_score = round(float(min(100.0, max(0.0, float(score)))), 1)
+        climate_score = profile.score(risks, analysis['environmental_composition']['built_up'])
 
         # AI & Loan (Keep compatible)
-        ai_explanation = cls._generate_explanation(climate_score, risks, analysis["temperature_trend"], analysis["environmental_composition"])
-        loan_rec = cls._calculate_loan_recommendation(climate_score)
+        ai_explanation = None
+        if explain:
+            ai_explanation = cls._generate_explanation(climate_score, risks, analysis["temperature_trend"], analysis["environmental_composition"])
+        loan_rec = cls._calculate_loan_recommendation(climate_score, profile)
 
         # 4. FRONTEND COMPATIBILITY MAPPING (Requirement 10)
         # Existing UI expects simple arrays for charts
@@ -156,7 +254,7 @@ class ClimateEngine:
             "location_name": display_name,
             "coordinates": [lat, lon],
             "climate_score": climate_score,
-            
+
             # For Radar Chart: expects flood, heat, storm, fire
             "risk_profile": {
                 "flood": risks["flood"],
@@ -165,40 +263,108 @@ class ClimateEngine:
                 "fire": risks["fire"],
                 "sea_level": risks["sea_level"]
             },
-            
+
             # For Line Chart: expects array of numbers
             "temperature_trend": [d["value"] for d in analysis["temperature_trend"]],
-            
+
             # For Pie Chart: expects 'environment' key with built_up, greenery, water
             "environment": analysis["environmental_composition"],
-            
+
             # New Keys for compliance with latest prompt
             "environmental_composition": analysis["environmental_composition"],
             "temperature_projection": analysis["temperature_trend"], # Structured version
-            
+
             "ai_insights": ai_explanation,
-            "loan_recommendation": loan_rec
+            "loan_recommendation": loan_rec,
+            "scoring_profile": {"name": profile.name, "version": profile.version, "tag": profile.tag}
         }
 
+    # --- provider calls ---------------------------------------------------------
+    # Each call is a spec: (provider, method, url, request kwargs, parser, fallback, error label).
+    # _fetch runs it over requests; services/async_analysis.py runs the same specs over httpx.
+
     @classmethod
-    def _geocode(cls, query):
-        headers = {'User-Agent': 'ClimateCreditScoreEngine/1.1'}
-        params = {'q': query, 'format': 'json', 'limit': 1}
+    def _fetch(cls, provider, method, url, kwargs, parse, fallback, label):
+        return cls._fetch_sourced(provider, method, url, kwargs, parse, fallback, label)[0]
+
+    @classmethod
+    def _fetch_sourced(cls, provider, method, url, kwargs, parse, fallback, label, cached_only=False):
+        """(value, source): source is 'live', 'cached' (cached_only) or 'fallback'."""
+        key = cls.call_key(provider, method, url, kwargs)
+        if cached_only:
+            result = cls._cached(provider, method, url, kwargs, parse, key)
+            return (fallback, 'fallback') if result is None else (result, 'cached')
+
+        def call():
+            return parse(cls._request(provider, method, url, **kwargs).json())
+        try:
+            result = SingleFlight.do(key, call)
+        except Exception as e:
+            print(f"{label}: {e}")
+            return fallback, 'fallback'
+        return (fallback, 'fallback') if result is None else (result, 'live')
+
+    @classmethod
+    def _cached(cls, provider, method, url, kwargs, parse, key):
+        """A provider result available on this host without calling out (single-flight store, then cassettes)."""
+        found, result = SingleFlight.peek(key)
+        if found:
+            return result
+        response = ProviderCassettes.lookup(provider, method, url, kwargs.get('params'), kwargs.get('data'))
+        if response is None:
+            return None
         try:
-            response = requests.get(cls.NOMINATIM_URL, params=params, headers=headers, timeout=5)
-            data = response.json()
-            if data:
-                return {
-                    'lat': float(data[0]['lat']), 
-                    'lon': float(data[0]['lon']),
-                    'display_name': data[0]['display_name']
-                }
+            return parse(response.json())
         except Exception as e:
-            print(f"Geocoding error: {e}")
+            print(f"Cached {provider} response unusable: {e}")
+            return None
+
+    @staticmethod
+    def call_key(provider, method, url, kwargs):
+        """Single-flight key of a provider call: identical requests to the same endpoint share one."""
+        return flight_key(url, normalize_request(provider, method, url, kwargs.get('params'), kwargs.get('data')))
+
+    @classmethod
+    def signal_sources(cls, fetched):
+        """Source of every signal from {name: (value, source)}; a signal that was not fetched is a fallback."""
+        return {name: fetched[name][1] if name in fetched else 'fallback' for name in cls.SIGNALS}
+
+    @classmethod
+    def _signal_calls(cls, lat, lon, land_use=True):
+        """The provider calls behind one analysis, all independent of each other."""
+        calls = {
+            "temperature_trend": cls._temperature_call(lat, lon),
+            "environment": cls._environment_call(lat, lon),
+            "precipitation": cls._precipitation_call(lat, lon),
+            "elevation": cls._elevation_call(lat, lon),
+        }
+        if not land_use:
+            del calls["environment"]
+        return calls
+
+    @classmethod
+    def _geocode_call(cls, query):
+        headers = {'User-Agent': 'ClimateCreditScoreEngine/1.1'}
+        params = {'q': query, 'format': 'json', 'limit': 1}
+        return ('nominatim', 'GET', cls.NOMINATIM_URL, {'params': params, 'headers': headers, 'timeout': 5},
+                cls._parse_geocode, None, "Geocoding error")
+
+    @classmethod
+    def _geocode(cls, query):
+        return cls._fetch(*cls._geocode_call(query))
+
+    @staticmethod
+    def _parse_geocode(data):
+        if data:
+            return {
+                'lat': float(data[0]['lat']),
+                'lon': float(data[0]['lon']),
+                'display_name': data[0]['display_name']
+            }
         return None
 
     @classmethod
-    def _get_temperature_trends(cls, lat, lon):
+    def _temperature_call(cls, lat, lon):
         params = {
             "latitude": lat,
             "longitude": lon,
@@ -207,63 +373,67 @@ class ClimateEngine:
             "daily": "temperature_2m_mean",
             "timezone": "auto"
         }
-        try:
-            response = requests.get(cls.OPEN_METEO_URL, params=params, timeout=5)
-            data = response.json()
-            if 'daily' in data:
-                dates = data['daily'].get('time', [])
-                temps = data['daily'].get('temperature_2m_mean', [])
-                
-                # Group by year
-                yearly_data = {}
-                for i in range(len(dates)):
-                    d = dates[i]
-                    t = temps[i]
-                    if d is None or t is None:
-                        continue
-                    
-                    year = str(d)[:4]
-                    if year not in yearly_data:
-                        yearly_data[year] = []
-                    
-                    # Store as float
-                    val = float(t)
-                    yearly_data[year].append(val)
-                
-                # Calculate yearly averages
-                years = sorted(yearly_data.keys())
-                averages = []
-                for y in years:
-                    vals = yearly_data[y]
-                    if vals:
-                        avg = sum(vals) / len(vals)
-                        averages.append(round(float(avg), 2))
-                
-                if not averages:
-                    return [0.5, 0.8, 1.2, 1.5, 2.0, 2.5]
-
-                # Calculate relative trend
-                base_temp = averages[0]
-                trend = [round(float(a) - float(base_temp), 2) for a in averages]
-
-                if len(trend) >= 6:
-                    step = len(trend) // 5
-                    # Pick 6 points
-                    result = []
-                    for i in range(6):
-                        idx = i * step
-                        if idx < len(trend):
-                            result.append(trend[idx])
-                        else:
-                            result.append(trend[-1])
-                    return result
-                return trend
-        except Exception as e:
-            print(f"Climate data error: {e}")
+        return ('open_meteo', 'GET', cls.OPEN_METEO_URL, {'params': params, 'timeout': 5},
+                cls._parse_temperature_trends, None, "Climate data error")
+
+    @classmethod
+    def _get_temperature_trends(cls, lat, lon):
+        return cls._fetch(*cls._temperature_call(lat, lon))
+
+    @staticmethod
+    def _parse_temperature_trends(data):
+        if 'daily' in data:
+            dates = data['daily'].get('time', [])
+            temps = data['daily'].get('temperature_2m_mean', [])
+
+            # Group by year
+            yearly_data = {}
+            for i in range(len(dates)):
+                d = dates[i]
+                t = temps[i]
+                if d is None or t is None:
+                    continue
+
+                year = str(d)[:4]
+                if year not in yearly_data:
+                    yearly_data[year] = []
+
+                # Store as float
+                val = float(t)
+                yearly_data[year].append(val)
+
+            # Calculate yearly averages
+            years = sorted(yearly_data.keys())
+            averages = []
+            for y in years:
+                vals = yearly_data[y]
+                if vals:
+                    avg = sum(vals) / len(vals)
+                    averages.append(round(float(avg), 2))
+
+            if not averages:
+                return [0.5, 0.8, 1.2, 1.5, 2.0, 2.5]
+
+            # Calculate relative trend
+            base_temp = averages[0]
+            trend = [round(float(a) - float(base_temp), 2) for a in averages]
+
+            if len(trend) >= 6:
+                step = len(trend) // 5
+                # Pick 6 points
+                result = []
+                for i in range(6):
+                    idx = i * step
+                    if idx < len(trend):
+                        result.append(trend[idx])
+                    else:
+                        result.append(trend[-1])
+                return result
+            return trend
         return None
 
     @classmethod
-    def _get_precipitation_data(cls, lat, lon):
+    def _precipitation_call(cls, lat, lon):
         params = {
             "latitude": lat,
             "longitude": lon,
@@ -271,32 +441,39 @@ class ClimateEngine:
             "community": "RE",
             "format": "JSON"
         }
-        try:
-            response = requests.get(cls.NASA_POWER_URL, params=params, timeout=5)
-            data = response.json()
-            # Extract point average precipitation
-            precip = data.get('properties', {}).get('parameter', {}).get('PRECTOTCORR', {}).get('point', 0)
-            return float(precip)
-        except Exception as e:
-            print(f"NASA POWER error: {e}")
-            return 3.5 # Moderate fallback
+        return ('nasa_power', 'GET', cls.NASA_POWER_URL, {'params': params, 'timeout': 5},
+                cls._parse_precipitation, 3.5, "NASA POWER error")  # Moderate fallback
 
     @classmethod
-    def _get_elevation_data(cls, lat, lon):
+    def _get_precipitation_data(cls, lat, lon):
+        return cls._fetch(*cls._precipitation_call(lat, lon))
+
+    @staticmethod
+    def _parse_precipitation(data):
+        # Extract point average precipitation
+        precip = data.get('properties', {}).get('parameter', {}).get('PRECTOTCORR', {}).get('point', 0)
+        return float(precip)
+
+    @classmethod
+    def _elevation_call(cls, lat, lon):
         params = {
             "locations": f"{lat},{lon}"
         }
-        try:
-            response = requests.get(cls.ELEVATION_URL, params=params, timeout=5)
-            data = response.json()
-            if 'results' in data and len(data['results']) > 0:
-                return float(data['results'][0]['elevation'])
-        except Exception as e:
-            print(f"Elevation error: {e}")
-        return 10.0 # Low elevation fallback
+        return ('elevation', 'GET', cls.ELEVATION_URL, {'params': params, 'timeout': 5},
+                cls._parse_elevation, 10.0, "Elevation error")  # Low elevation fallback
 
     @classmethod
-    def _get_environmental_data(cls, lat, lon):
+    def _get_elevation_data(cls, lat, lon):
+        return cls._fetch(*cls._elevation_call(lat, lon))
+
+    @staticmethod
+    def _parse_elevation(data):
+        if 'results' in data and len(data['results']) > 0:
+            return float(data['results'][0]['elevation'])
+        return None
+
+    @classmethod
+    def _environment_call(cls, lat, lon):
         """Uses Overpass API to estimate greenery, water, and built-up areas."""
         # Query for landuse/natural features within 5km
         query = f"""
@@ -307,10 +484,10 @@ class ClimateEngine:
           relation["landuse"="forest"](around:5000, {lat}, {lon});
           node["natural"="wood"](around:5000, {lat}, {lon});
           way["natural"="wood"](around:5000, {lat}, {lon});
-          
+
           node["natural"="water"](around:5000, {lat}, {lon});
           way["natural"="water"](around:5000, {lat}, {lon});
-          
+
           node["landuse"="residential"](around:5000, {lat}, {lon});
           way["landuse"="residential"](around:5000, {lat}, {lon});
           node["landuse"="commercial"](around:5000, {lat}, {lon});
@@ -318,39 +495,43 @@ class ClimateEngine:
         );
         out count;
         """
-        try:
-            response = requests.post(cls.OVERPASS_URL, data={"data": query}, timeout=10)
-            data = response.json()
-            elements = data.get('elements', [])
-            
-            # Simple heuristic based on counts
-            total = sum(int(e.get('tags', {}).get('count', 1)) for e in elements) or 1
-            green_count = sum(1 for e in elements if 'forest' in str(e) or 'wood' in str(e))
-            water_count = sum(1 for e in elements if 'water' in str(e))
-            built_count = total - green_count - water_count
-            
-            # Normalize to 100%
-            green_p = round((green_count / total) * 100)
-            water_p = round((water_count / total) * 100)
-            
-            # Ensure reasonable distribution
-            if green_p == 0 and water_p == 0:
-                # Fallback to coordinate-based semi-random but consistent 
-                import hashlib
-                h = int(hashlib.md5(f"{lat}{lon}".encode()).hexdigest(), 16)
-                green_p = (h % 20) + 5
-                water_p = (h % 10) + 2
-                
-            built_p = 100 - green_p - water_p
-            
-            return {
-                "built_up": max(0, built_p),
-                "greenery": green_p,
-                "water": water_p
-            }
-        except Exception as e:
-            print(f"Overpass error: {e}")
-            return None
+        parse = lambda data: cls._parse_environment(data, lat, lon)
+        return ('overpass', 'POST', cls.OVERPASS_URL, {'data': {"data": query}, 'timeout': 10},
+                parse, None, "Overpass error")
+
+    @classmethod
+    def _get_environmental_data(cls, lat, lon):
+        return cls._fetch(*cls._environment_call(lat, lon))
+
+    @staticmethod
+    def _parse_environment(data, lat, lon):
+        elements = data.get('elements', [])
+
+        # Simple heuristic based on counts
+        total = sum(int(e.get('tags', {}).get('count', 1)) for e in elements) or 1
+        green_count = sum(1 for e in elements if 'forest' in str(e) or 'wood' in str(e))
+        water_count = sum(1 for e in elements if 'water' in str(e))
+        built_count = total - green_count - water_count
+
+        # Normalize to 100%
+        green_p = round((green_count / total) * 100)
+        water_p = round((water_count / total) * 100)
+
+        # Ensure reasonable distribution
+        if green_p == 0 and water_p == 0:
+            # Fallback to coordinate-based semi-random but consistent
+            import hashlib
+            h = int(hashlib.md5(f"{lat}{lon}".encode()).hexdigest(), 16)
+            green_p = (h % 20) + 5
+            water_p = (h % 10) + 2
+
+        built_p = 100 - green_p - water_p
+
+        return {
+            "built_up": max(0, built_p),
+            "greenery": green_p,
+            "water": water_p
+        }
 
     @classmethod
     def _calculate_risk_profile(cls, temp_trend, env, precip, elevation):
@@ -427,33 +608,19 @@ class ClimateEngine:
         
         Provide a concise 3-4 sentence explanation focusing on how these factors affect long-term asset value and loan safety.
         """
-        try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            response = model.generate_content(prompt)
+        def call():
+            model = gemini().GenerativeModel('gemini-2.5-flash')
+            with profile_stage("network:gemini"):
+                response = model.generate_content(prompt)
             return response.text.strip()
+        try:
+            return SingleFlight.do(flight_key('gemini', prompt), call)
         except Exception as e:
             print(f"Gemini error: {e}")
             return f"The property has a climate score of {score}. Key risks include {max(risks, key=risks.get)} exposure. Long-term trends suggests moderate environmental sensitivity affecting asset resilience."
 
     @classmethod
-    def _calculate_loan_recommendation(cls, score):
-        """Logic for interest rate adjustment."""
-        if score > 80:
-            adjustment = -0.15
-            risk_level = "Low"
-            text = "Reduced interest rate recommended due to high climate resilience."
-        elif score >= 50:
-            adjustment = 0.0
-            risk_level = "Medium"
-            text = "Standard loan terms apply. Monitor environmental changes periodically."
-        else:
-            adjustment = 0.25
-            risk_level = "High"
-            text = "Increased rate recommended + mandatory flood/fire insurance suggested."
-            
-        return {
-            "recommended_interest_adjustment": adjustment,
-            "risk_level": risk_level,
-            "recommendation_text": text
-        }
+    def _calculate_loan_recommendation(cls, score, profile=None):
+        """Interest rate adjustment from the scoring profile's band for this score."""
+        return (profile or ScoringProfiles.get()).recommendation(score)
 
@@ -0,0 +1,253 @@
+import csv
+import io
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database import db
+from models.property import PropertyAnalysis
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet / Arrow exports are unavailable, CSV still works
+    pa = None
+    pq = None
+
+RISK_FACTOR_KEYS = ('flood', 'heat', 'storm', 'fire', 'sea_level')
+PROJECTION_YEARS = (2030, 2040, 2050, 2060, 2070)
+
+# (column, type) of the flattened export schema, in output order
+EXPORT_COLUMNS = [
+    ('id', 'int'),
+    ('property_name', 'str'),
+    ('address', 'str'),
+    ('latitude', 'float'),
+    ('longitude', 'float'),
+    ('asset_value', 'float'),
+    ('loan_term', 'int'),
+    ('climate_score', 'float'),
+    ('risk_level', 'str'),
+    ('heat_risk', 'float'),
+    ('flood_risk', 'float'),
+    ('storm_risk', 'float'),
+    ('fire_risk', 'float'),
+    ('overall_risk_score', 'float'),
+    ('ml_risk_score', 'float'),
+    ('greenery_percent', 'float'),
+    ('water_percent', 'float'),
+    ('builtup_percent', 'float'),
+    ('avg_temperature', 'float'),
+    ('precipitation', 'float'),
+    ('elevation', 'float'),
+] + [(f'risk_factor_{k}', 'float') for k in RISK_FACTOR_KEYS] \
+  + [(f'projection_{y}', 'float') for y in PROJECTION_YEARS] + [
+    ('loan_interest_adjustment', 'float'),
+    ('loan_risk_level', 'str'),
+    ('loan_recommendation_text', 'str'),
+    ('created_at', 'timestamp'),
+]
+
+INSIGHTS_COLUMN = ('ai_insights', 'str')
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file object that collects bytes until the streaming generator drains them."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        data = bytes(b)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _float(value):
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value):
+    value = _float(value)
+    return int(value) if value is not None else None
+
+
+def _timestamp(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+class ExportService:
+    """
+    Streams property_analyses out as CSV, Parquet or Arrow IPC, one chunk at a time.
+
+    Rows are read with a server-side cursor in CHUNK_ROWS batches and the JSON columns
+    (risk_factors, projections, loan_recommendation) are flattened into typed columns, so
+    memory stays bounded by one chunk however large the book is. Parquet gets one row group
+    per chunk.
+    """
+    CHUNK_ROWS = 5000
+
+    FORMATS = {
+        'csv': ('text/csv', 'csv'),
+        'parquet': ('application/vnd.apache.parquet', 'parquet'),
+        'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+    }
+
+    @classmethod
+    def columns(cls, include_insights=False):
+        return EXPORT_COLUMNS + [INSIGHTS_COLUMN] if include_insights else list(EXPORT_COLUMNS)
+
+    @classmethod
+    def available(cls, fmt):
+        return fmt == 'csv' or pa is not None
+
+    @staticmethod
+    def flatten(row, include_insights=False):
+        """Maps one property_analyses row onto the flat export columns."""
+        risk_factors = row.risk_factors if isinstance(row.risk_factors, dict) else {}
+        loan = row.loan_recommendation if isinstance(row.loan_recommendation, dict) else {}
+        projections = {}
+        for point in row.projections or []:
+            if isinstance(point, dict) and 'year' in point:
+                projections[_int(point['year'])] = _float(point.get('value'))
+
+        flat = {
+            'id': row.id,
+            'property_name': row.property_name,
+            'address': row.address,
+            'latitude': _float(row.latitude),
+            'longitude': _float(row.longitude),
+            'asset_value': _float(row.asset_value),
+            'loan_term': _int(row.loan_term),
+            'climate_score': _float(row.climate_score),
+            'risk_level': row.risk_level,
+            'heat_risk': _float(row.heat_risk),
+            'flood_risk': _float(row.flood_risk),
+            'storm_risk': _float(row.storm_risk),
+            'fire_risk': _float(row.fire_risk),
+            'overall_risk_score': _float(row.overall_risk_score),
+            'ml_risk_score': _float(row.ml_risk_score),
+            'greenery_percent': _float(row.greenery_percent),
+            'water_percent': _float(row.water_percent),
+            'builtup_percent': _float(row.builtup_percent),
+            'avg_temperature': _float(row.avg_temperature),
+            'precipitation': _float(row.precipitation),
+            'elevation': _float(row.elevation),
+            'loan_interest_adjustment': _float(loan.get('recommended_interest_adjustment')),
+            'loan_risk_level': loan.get('risk_level'),
+            'loan_recommendation_text': loan.get('recommendation_text'),
+            'created_at': _timestamp(row.created_at),
+        }
+        for key in RISK_FACTOR_KEYS:
+            flat[f'risk_factor_{key}'] = _float(risk_factors.get(key))
+        for year in PROJECTION_YEARS:
+            flat[f'projection_{year}'] = projections.get(year)
+        if include_insights:
+            flat['ai_insights'] = row.ai_insights
+        return flat
+
+    @classmethod
+    def _statement(cls, user_id=None):
+        table = PropertyAnalysis.__table__
+        stmt = select(table).order_by(table.c.id)
+        if user_id:
+            from models.portfolio import PortfolioAsset
+            stmt = stmt.join(PortfolioAsset.__table__, PortfolioAsset.property_id == table.c.id) \
+                       .where(PortfolioAsset.user_id == user_id)
+        return stmt
+
+    @classmethod
+    def iter_chunks(cls, user_id=None, include_insights=False, chunk_rows=None):
+        """Yields lists of flattened row dicts, at most chunk_rows at a time."""
+        chunk_rows = chunk_rows or cls.CHUNK_ROWS
+        with db.engine.connect() as conn:
+            result = conn.execution_options(yield_per=chunk_rows).execute(cls._statement(user_id))
+            for partition in result.partitions():
+                yield [cls.flatten(row, include_insights) for row in partition]
+
+    # --- writers ---------------------------------------------------------------
+
+    @staticmethod
+    def _arrow_schema(columns):
+        types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string(), 'timestamp': pa.timestamp('us')}
+        return pa.schema([(name, types[kind]) for name, kind in columns])
+
+    @classmethod
+    def stream(cls, fmt, user_id=None, include_insights=False, chunk_rows=None):
+        """Generator of encoded byte chunks for the whole export, suitable for a streamed response."""
+        if fmt not in cls.FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        if not cls.available(fmt):
+            raise RuntimeError(f"{fmt} export requires pyarrow to be installed")
+
+        columns = cls.columns(include_insights)
+        names = [name for name, _ in columns]
+        chunks = cls.iter_chunks(user_id, include_insights, chunk_rows)
+
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            for chunk in chunks:
+                for row in chunk:
+                    writer.writerow([
+                        row[name].isoformat() if isinstance(row[name], datetime) else row[name]
+                        for name in names
+                    ])
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode('utf-8')
+            return
+
+        schema = cls._arrow_schema(columns)
+        sink = ChunkSink()
+        out = pa.PythonFile(sink, mode='w')
+        if fmt == 'parquet':
+            writer = pq.ParquetWriter(out, schema, compression='zstd')
+            write = writer.write_table
+        else:
+            writer = pa.ipc.new_file(out, schema)
+            write = writer.write_table
+
+        try:
+            for chunk in chunks:
+                write(pa.Table.from_pylist(chunk, schema=schema))
+                data = sink.drain()
+                if data:
+                    yield data
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    @classmethod
+    def write_file(cls, fmt, path, **kwargs):
+        """Exports straight to a file; returns the number of bytes written."""
+        written = 0
+        with open(path, 'wb') as f:
+            for data in cls.stream(fmt, **kwargs):
+                f.write(data)
+                written += len(data)
+        return written
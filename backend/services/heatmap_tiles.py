@@ -0,0 +1,218 @@
+import math
+import struct
+
+from sqlalchemy import text, func, select
+
+from database import db
+from models.property import PropertyAnalysis
+
+
+class HeatmapTiles:
+    """
+    Pre-aggregated heatmap cells for every zoom level.
+
+    Level L splits the world into square cells of 360 / 2**L degrees. A web map at zoom z draws
+    256px tiles spanning 360 / 2**z degrees, so level z + 4 gives ~16px cells on screen. The
+    payload for a viewport is bounded by screen size / cell size, whatever the portfolio size.
+
+    On SQLite the cells are maintained by triggers on property_analyses (count, score and value
+    sums, plus coordinate sums for a weighted centroid), so inserts and deletes from any code
+    path update the aggregates incrementally. Other databases, and a single user's portfolio,
+    aggregate on the fly.
+
+    A cell's intensity is its score sum relative to the viewport's largest, so a cluster of
+    assets weighs more than one asset with the same average score.
+    """
+    MIN_LEVEL = 2
+    MAX_LEVEL = 18
+    CELL_PX = 16
+
+    BINARY_FIELDS = ('lat', 'lon', 'count', 'avg_score', 'total_value', 'intensity')
+
+    _maintained = False
+
+    # Cell indices only involve non-negative values, so CAST truncation is floor()
+    _CELL_X = "CAST((({lon}) + 180.0) * l.scale AS INTEGER)"
+    _CELL_Y = "CAST((({lat}) + 90.0) * l.scale AS INTEGER)"
+
+    @classmethod
+    def _add_sql(cls, ref):
+        return f"""
+            INSERT INTO heatmap_cells (level, cx, cy, count, sum_score, sum_value, sum_lat, sum_lon)
+            SELECT l.level,
+                   {cls._CELL_X.format(lon=ref + '.longitude')},
+                   {cls._CELL_Y.format(lat=ref + '.latitude')},
+                   1, {ref}.climate_score, {ref}.asset_value, {ref}.latitude, {ref}.longitude
+            FROM heatmap_levels l
+            WHERE {ref}.latitude IS NOT NULL AND {ref}.longitude IS NOT NULL
+            ON CONFLICT(level, cx, cy) DO UPDATE SET
+                count = count + 1,
+                sum_score = sum_score + excluded.sum_score,
+                sum_value = sum_value + excluded.sum_value,
+                sum_lat = sum_lat + excluded.sum_lat,
+                sum_lon = sum_lon + excluded.sum_lon;"""
+
+    @classmethod
+    def _cell_keys(cls, ref):
+        return f"""(level, cx, cy) IN (
+                SELECT l.level,
+                       {cls._CELL_X.format(lon=ref + '.longitude')},
+                       {cls._CELL_Y.format(lat=ref + '.latitude')}
+                FROM heatmap_levels l)"""
+
+    @classmethod
+    def _remove_sql(cls, ref):
+        # Both statements are keyed on the row's own cells so they stay on the primary key
+        return f"""
+            UPDATE heatmap_cells SET
+                count = count - 1,
+                sum_score = sum_score - {ref}.climate_score,
+                sum_value = sum_value - {ref}.asset_value,
+                sum_lat = sum_lat - {ref}.latitude,
+                sum_lon = sum_lon - {ref}.longitude
+            WHERE {ref}.latitude IS NOT NULL AND {ref}.longitude IS NOT NULL
+              AND {cls._cell_keys(ref)};
+            DELETE FROM heatmap_cells
+            WHERE {ref}.latitude IS NOT NULL AND {ref}.longitude IS NOT NULL
+              AND count <= 0 AND {cls._cell_keys(ref)};"""
+
+    @classmethod
+    def _ddl(cls):
+        return [
+            "CREATE TABLE IF NOT EXISTS heatmap_levels (level INTEGER PRIMARY KEY, scale REAL NOT NULL)",
+            """CREATE TABLE IF NOT EXISTS heatmap_cells (
+                level INTEGER NOT NULL, cx INTEGER NOT NULL, cy INTEGER NOT NULL,
+                count INTEGER NOT NULL, sum_score REAL NOT NULL, sum_value REAL NOT NULL,
+                sum_lat REAL NOT NULL, sum_lon REAL NOT NULL,
+                PRIMARY KEY (level, cx, cy)
+            ) WITHOUT ROWID""",
+            f"""CREATE TRIGGER IF NOT EXISTS heatmap_cells_insert AFTER INSERT ON property_analyses
+            BEGIN {cls._add_sql('NEW')}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS heatmap_cells_delete AFTER DELETE ON property_analyses
+            BEGIN {cls._remove_sql('OLD')}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS heatmap_cells_update
+            AFTER UPDATE OF latitude, longitude, climate_score, asset_value ON property_analyses
+            BEGIN {cls._remove_sql('OLD')} {cls._add_sql('NEW')}
+            END""",
+        ]
+
+    @classmethod
+    def init_app(cls, app):
+        with app.app_context():
+            if db.engine.dialect.name != 'sqlite':
+                return
+            try:
+                with db.engine.begin() as conn:
+                    for statement in cls._ddl():
+                        conn.execute(text(statement))
+                    cls._sync_levels(conn)
+                cls._maintained = True
+            except Exception as e:
+                print(f"Heatmap tile maintenance unavailable, aggregating on the fly: {e}")
+                cls._maintained = False
+
+    @classmethod
+    def _sync_levels(cls, conn):
+        """Rebuilds the aggregates if the level set changed or the cells drifted from the source rows."""
+        wanted = {level: 2 ** level / 360.0 for level in range(cls.MIN_LEVEL, cls.MAX_LEVEL + 1)}
+        stored = dict(conn.execute(text("SELECT level, scale FROM heatmap_levels")).fetchall())
+
+        indexed = conn.execute(text(
+            "SELECT coalesce(sum(count), 0) FROM heatmap_cells WHERE level = :level"
+        ), {"level": cls.MIN_LEVEL}).scalar()
+        located = conn.execute(text(
+            "SELECT count(*) FROM property_analyses WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+        )).scalar()
+
+        if stored == wanted and indexed == located:
+            return
+
+        conn.execute(text("DELETE FROM heatmap_levels"))
+        conn.execute(text("INSERT INTO heatmap_levels (level, scale) VALUES (:level, :scale)"),
+                     [{"level": k, "scale": v} for k, v in wanted.items()])
+        cls.rebuild(conn)
+
+    @classmethod
+    def rebuild(cls, conn):
+        conn.execute(text("DELETE FROM heatmap_cells"))
+        conn.execute(text(f"""
+            INSERT INTO heatmap_cells (level, cx, cy, count, sum_score, sum_value, sum_lat, sum_lon)
+            SELECT l.level,
+                   {cls._CELL_X.format(lon='p.longitude')} AS cx,
+                   {cls._CELL_Y.format(lat='p.latitude')} AS cy,
+                   count(*), sum(p.climate_score), sum(p.asset_value), sum(p.latitude), sum(p.longitude)
+            FROM property_analyses p CROSS JOIN heatmap_levels l
+            WHERE p.latitude IS NOT NULL AND p.longitude IS NOT NULL
+            GROUP BY l.level, cx, cy
+        """))
+
+    @classmethod
+    def level_for_zoom(cls, zoom, cell_px=None):
+        cell_px = max(2, min(256, cell_px or cls.CELL_PX))
+        level = int(round(zoom + math.log2(256 / cell_px)))
+        return max(cls.MIN_LEVEL, min(cls.MAX_LEVEL, level))
+
+    @classmethod
+    def query(cls, level, min_lat, min_lon, max_lat, max_lon, user_id=None):
+        """
+        Returns [(lat, lon, count, avg_score, total_value, intensity)] for the cells intersecting
+        the viewport; with user_id, only that user's portfolio assets.
+        """
+        scale = 2 ** level / 360.0
+        cells_per_row = 2 ** level
+
+        min_lat, max_lat = max(-90.0, min_lat), min(90.0, max_lat)
+        y0 = int(math.floor((min_lat + 90.0) * scale))
+        y1 = int(math.floor((max_lat + 90.0) * scale))
+
+        if max_lon - min_lon >= 360:
+            x_ranges = [(0, cells_per_row - 1)]
+        else:
+            west = ((min_lon + 180) % 360) - 180
+            east = ((max_lon + 180) % 360) - 180
+            x0 = int(math.floor((west + 180.0) * scale))
+            x1 = int(math.floor((east + 180.0) * scale))
+            x_ranges = [(x0, x1)] if x0 <= x1 else [(x0, cells_per_row - 1), (0, x1)]
+
+        if cls._maintained and not user_id:
+            rows = []
+            for x0, x1 in x_ranges:
+                rows.extend(db.session.execute(text(
+                    "SELECT count, sum_score, sum_value, sum_lat, sum_lon FROM heatmap_cells "
+                    "WHERE level = :level AND cx BETWEEN :x0 AND :x1 AND cy BETWEEN :y0 AND :y1"
+                ), {"level": level, "x0": x0, "x1": x1, "y0": y0, "y1": y1}).fetchall())
+        else:
+            rows = cls._aggregate(scale, x_ranges, y0, y1, user_id)
+
+        rows = [row for row in rows if row[0] > 0]
+        top = max((s_score for _, s_score, _, _, _ in rows), default=0) or 1.0
+        return [
+            (s_lat / n, s_lon / n, n, s_score / n, s_value, max(0.0, s_score) / top)
+            for n, s_score, s_value, s_lat, s_lon in rows
+        ]
+
+    @staticmethod
+    def _aggregate(scale, x_ranges, y0, y1, user_id=None):
+        cx = func.floor((PropertyAnalysis.longitude + 180.0) * scale)
+        cy = func.floor((PropertyAnalysis.latitude + 90.0) * scale)
+        rows = []
+        for x0, x1 in x_ranges:
+            stmt = (select(func.count(), func.sum(PropertyAnalysis.climate_score), func.sum(PropertyAnalysis.asset_value),
+                           func.sum(PropertyAnalysis.latitude), func.sum(PropertyAnalysis.longitude))
+                    .where(PropertyAnalysis.latitude.isnot(None), PropertyAnalysis.longitude.isnot(None),
+                           cx.between(x0, x1), cy.between(y0, y1))
+                    .group_by(cx, cy))
+            if user_id:
+                from models.portfolio import PortfolioAsset
+                stmt = stmt.join(PortfolioAsset, PortfolioAsset.property_id == PropertyAnalysis.id) \
+                           .where(PortfolioAsset.user_id == user_id)
+            rows.extend(db.session.execute(stmt).fetchall())
+        return rows
+
+    @classmethod
+    def pack(cls, cells):
+        """Little-endian float32 rows of BINARY_FIELDS, for clients that want raw arrays."""
+        flat = [float(v) for cell in cells for v in cell]
+        return struct.pack(f"<{len(flat)}f", *flat)
@@ -0,0 +1,282 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, text
+
+from database import db
+from models.property import PropertyAnalysis
+
+HAZARDS = ('heat', 'flood', 'storm', 'fire')
+
+# Same bands as the portfolio report and the frontend risk badges
+RISK_BANDS = (
+    ('high', -np.inf, 50.0),
+    ('medium', 50.0, 80.0),
+    ('low', 80.0, np.inf),
+)
+
+SCORE_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+class PortfolioSnapshot:
+    """
+    Columnar in-memory copy of the numeric property_analyses columns, for vectorized analytics.
+
+    New rows are appended incrementally by created_at. Rows are re-read from a short lag window
+    behind the watermark, so write-behind rows that commit slightly late are not missed. Updates
+    and deletes bump a mutation counter, maintained by triggers on SQLite, which forces a full
+    reload. Refreshes run at most once per MIN_REFRESH_SECONDS and swap the arrays atomically.
+    """
+    MIN_REFRESH_SECONDS = 1.0
+    LAG_SECONDS = 5.0
+    CHUNK_ROWS = 50000
+
+    # (column name or fn(table) -> expression, snapshot key, dtype). Hazard and land-use features are float32 to halve memory.
+    COLUMNS = (
+        ('id', 'id', np.int64),
+        ('latitude', 'latitude', np.float64),
+        ('longitude', 'longitude', np.float64),
+        ('asset_value', 'asset_value', np.float64),
+        ('loan_term', 'loan_term', np.float64),
+        ('climate_score', 'climate_score', np.float64),
+        ('ml_risk_score', 'ml_risk_score', np.float64),
+        ('overall_risk_score', 'overall_risk_score', np.float64),
+        ('heat_risk', 'heat', np.float32),
+        ('flood_risk', 'flood', np.float32),
+        ('storm_risk', 'storm', np.float32),
+        ('fire_risk', 'fire', np.float32),
+        ('greenery_percent', 'greenery', np.float32),
+        ('water_percent', 'water', np.float32),
+        ('builtup_percent', 'built_up', np.float32),
+        ('avg_temperature', 'avg_temperature', np.float32),
+        ('precipitation', 'precipitation', np.float32),
+        ('elevation', 'elevation', np.float32),
+        # Stored sea-level risk and first projection point, as scored
+        (lambda t: t.c.risk_factors['sea_level'].as_float(), 'sea_level', np.float32),
+        (lambda t: t.c.projections[(0, 'value')].as_float(), 'trend0', np.float32),
+    )
+
+    _instance = None
+    _instance_lock = threading.Lock()
+    _triggers_installed = False
+
+    _TRIGGERS = [
+        "CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, mutations INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO table_versions (name, mutations) VALUES ('property_analyses', 0)",
+        """CREATE TRIGGER IF NOT EXISTS property_analyses_mutation_update AFTER UPDATE ON property_analyses
+           BEGIN UPDATE table_versions SET mutations = mutations + 1 WHERE name = 'property_analyses'; END""",
+        """CREATE TRIGGER IF NOT EXISTS property_analyses_mutation_delete AFTER DELETE ON property_analyses
+           BEGIN UPDATE table_versions SET mutations = mutations + 1 WHERE name = 'property_analyses'; END""",
+    ]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.columns = self._empty()
+        self.watermark = None
+        self.mutations = None
+        self.refreshed_at = 0.0
+        self._tail_ids = set()
+
+    @classmethod
+    def init_app(cls, app):
+        with app.app_context():
+            if db.engine.dialect.name != 'sqlite':
+                return
+            try:
+                with db.engine.begin() as conn:
+                    for statement in cls._TRIGGERS:
+                        conn.execute(text(statement))
+                cls._triggers_installed = True
+            except Exception as e:
+                print(f"Snapshot mutation tracking unavailable, falling back to row counts: {e}")
+
+    @classmethod
+    def get(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+        snapshot = cls._instance
+        snapshot.refresh()
+        return snapshot
+
+    def _empty(self):
+        return {key: np.empty(0, dtype=dtype) for _, key, dtype in self.COLUMNS}
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    @classmethod
+    def mutation_count(cls, conn):
+        """Updates + deletes ever applied to property_analyses, or None where triggers are unavailable."""
+        if cls._triggers_installed:
+            return conn.execute(text(
+                "SELECT mutations FROM table_versions WHERE name = 'property_analyses'"
+            )).scalar()
+        return None
+
+    def _fetch(self, conn, where=None):
+        table = PropertyAnalysis.__table__
+        stmt = select(*(table.c[c] if isinstance(c, str) else c(table) for c, _, _ in self.COLUMNS),
+                      table.c.created_at).order_by(table.c.created_at, table.c.id)
+        if where is not None:
+            stmt = stmt.where(where)
+        result = conn.execute(stmt)
+
+        chunks = {key: [] for _, key, _ in self.COLUMNS}
+        created = []
+        while True:
+            rows = result.fetchmany(self.CHUNK_ROWS)
+            if not rows:
+                break
+            matrix = np.array([r[:-1] for r in rows], dtype=object)
+            for i, (_, key, dtype) in enumerate(self.COLUMNS):
+                # None -> NaN for the float columns
+                chunks[key].append(np.array(matrix[:, i], dtype=np.float64).astype(dtype))
+            created.extend(r[-1] for r in rows)
+
+        columns = {
+            key: np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+            for (_, key, dtype), parts in zip(self.COLUMNS, chunks.values())
+        }
+        return columns, created
+
+    @staticmethod
+    def _as_datetime(value):
+        if isinstance(value, datetime) or value is None:
+            return value
+        return datetime.fromisoformat(str(value))
+
+    def refresh(self, force=False):
+        if not force and time.monotonic() - self.refreshed_at < self.MIN_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if not force and time.monotonic() - self.refreshed_at < self.MIN_REFRESH_SECONDS:
+                return
+            with db.engine.connect() as conn:
+                mutations = self.mutation_count(conn)
+                if force or self.watermark is None or mutations != self.mutations:
+                    self._full_reload(conn)
+                else:
+                    self._append_new(conn)
+                    # Without triggers, a row count mismatch is the only sign of a delete
+                    if mutations is None:
+                        total = conn.execute(text("SELECT count(*) FROM property_analyses")).scalar()
+                        if total != len(self):
+                            self._full_reload(conn)
+                self.mutations = mutations
+            self.refreshed_at = time.monotonic()
+
+    def _set_tail(self, ids, created):
+        if not created or created[-1] is None:
+            return
+        watermark = self._as_datetime(created[-1])
+        cutoff = watermark - timedelta(seconds=self.LAG_SECONDS)
+        self.watermark = watermark
+        self._tail_ids = {int(i) for i, c in zip(ids, created) if c is not None and self._as_datetime(c) >= cutoff}
+
+    def _full_reload(self, conn):
+        columns, created = self._fetch(conn)
+        self.columns = columns
+        self.watermark = None
+        self._tail_ids = set()
+        self._set_tail(columns['id'], created)
+        if self.watermark is None:
+            # Empty table: start the incremental window from the epoch
+            self.watermark = datetime(1970, 1, 1)
+
+    def _append_new(self, conn):
+        # The typed column binds since in SQLAlchemy's stored format, so the comparison is exact
+        since = self.watermark - timedelta(seconds=self.LAG_SECONDS)
+        columns, created = self._fetch(conn, PropertyAnalysis.__table__.c.created_at >= since)
+        if not created:
+            return
+
+        fresh = np.array([int(i) not in self._tail_ids for i in columns['id']], dtype=bool)
+        if fresh.any():
+            self.columns = {
+                key: np.concatenate([self.columns[key], columns[key][fresh]]) for key in self.columns
+            }
+        # The re-read window becomes the new tail
+        self._set_tail(columns['id'], created)
+
+    def view(self, ids=None):
+        """Column dict, optionally restricted to a set of analysis ids (e.g. a user's portfolio)."""
+        columns = self.columns
+        if ids is None:
+            return columns
+        mask = np.isin(columns['id'], np.asarray(list(ids), dtype=np.int64))
+        return {key: values[mask] for key, values in columns.items()}
+
+
+def report_stats(scores, values):
+    """Headline stats used by the portfolio PDF, computed without Python loops."""
+    scores = np.nan_to_num(np.asarray(scores, dtype=np.float64))
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64))
+    n = len(scores)
+    return {
+        'avg_score': round(float(scores.sum() / n)) if n else 0,
+        'total_value': float(values.sum()),
+        'high_risk': int(np.count_nonzero(scores < 50)),
+        'med_risk': int(np.count_nonzero((scores >= 50) & (scores < 80))),
+        'low_risk': int(np.count_nonzero(scores >= 80))
+    }
+
+
+def compute_analytics(columns, hazard_threshold=60.0):
+    """Value-weighted scores, percentiles, risk-band exposure and per-hazard concentration."""
+    scores = columns['climate_score']
+    values = np.nan_to_num(columns['asset_value'])
+    valid = ~np.isnan(scores)
+    scores, values = scores[valid], values[valid]
+
+    n = len(scores)
+    total_value = float(values.sum())
+    if n == 0:
+        return {"count": 0, "total_value": 0.0}
+
+    weighted_score = float(np.dot(scores, values) / total_value) if total_value > 0 else None
+
+    percentiles = np.percentile(scores, SCORE_PERCENTILES)
+    bands = {}
+    for name, lo, hi in RISK_BANDS:
+        mask = (scores >= lo) & (scores < hi)
+        band_value = float(values[mask].sum())
+        bands[name] = {
+            "count": int(np.count_nonzero(mask)),
+            "value": round(band_value, 2),
+            "value_share": round(band_value / total_value, 4) if total_value > 0 else 0.0
+        }
+
+    hazards = {}
+    top_k = max(1, int(np.ceil(n * 0.10)))
+    for hazard in HAZARDS:
+        risk = np.nan_to_num(columns[hazard][valid].astype(np.float64))
+        exposed = risk >= hazard_threshold
+        exposed_value = float(values[exposed].sum())
+
+        # Concentration: share of value-weighted hazard exposure held by the top 10% of assets
+        exposure = values * risk
+        exposure_total = float(exposure.sum())
+        top_share = float(np.partition(exposure, n - top_k)[n - top_k:].sum() / exposure_total) if exposure_total > 0 else 0.0
+
+        hazards[hazard] = {
+            "value_weighted_risk": round(float(exposure_total / total_value), 2) if total_value > 0 else None,
+            "mean_risk": round(float(risk.mean()), 2),
+            "exposed_count": int(np.count_nonzero(exposed)),
+            "exposed_value": round(exposed_value, 2),
+            "exposed_value_share": round(exposed_value / total_value, 4) if total_value > 0 else 0.0,
+            "top10pct_exposure_share": round(top_share, 4)
+        }
+
+    return {
+        "count": n,
+        "total_value": round(total_value, 2),
+        "avg_score": round(float(scores.mean()), 2),
+        "value_weighted_score": round(weighted_score, 2) if weighted_score is not None else None,
+        "score_percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(SCORE_PERCENTILES, percentiles)},
+        "risk_bands": bands,
+        "hazards": hazards,
+        "hazard_threshold": hazard_threshold
+    }
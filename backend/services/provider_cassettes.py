@@ -0,0 +1,242 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from urllib.parse import urlsplit, parse_qsl
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+MODES = ('off', 'record', 'replay', 'auto')
+REPLAY_TIMINGS = {'original': 1.0, 'none': 0.0}
+
+
+class CassetteMiss(requests.ConnectionError):
+    """No recorded response for a request in replay mode; providers treat it like a network error."""
+
+
+def normalize_request(provider, method, url, params=None, data=None):
+    """
+    The parts of a provider call that decide its response: method, query parameters (from the
+    URL and params, sorted) and form fields with whitespace collapsed (the Overpass query is an
+    indented f-string). Host and path are left out, so a cassette replays whichever endpoint
+    PROVIDER_URLS points at.
+    """
+    query = parse_qsl(urlsplit(url).query, keep_blank_values=True)
+    if params:
+        query += [(str(k), str(v)) for k, v in (params.items() if isinstance(params, dict) else params)]
+    form = []
+    if isinstance(data, dict):
+        form = [(str(k), ' '.join(str(v).split())) for k, v in data.items()]
+    elif data:
+        form = [('', ' '.join(str(data).split()))]
+    return {
+        "provider": provider,
+        "method": method.upper(),
+        "query": sorted(query),
+        "form": sorted(form),
+    }
+
+
+def request_key(normalized):
+    return hashlib.blake2b(json.dumps(normalized, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ProviderCassettes:
+    """
+    Record and replay of ClimateEngine provider calls.
+
+    PROVIDER_CASSETTE_MODE:
+      record  every call goes to the provider and its response is saved
+      replay  calls are answered from the cassette only; a miss raises CassetteMiss
+      auto    replay when recorded, otherwise call the provider and record
+      off     (default) calls go straight to the provider
+
+    Each response is one gzip'd JSON file, PROVIDER_CASSETTE_DIR/<provider>/<key>.json.gz, where
+    key hashes the normalized request (see normalize_request), so recordings from several runs
+    merge and concurrent workers never write the same file twice. Replays wait the recorded
+    elapsed time scaled by PROVIDER_REPLAY_TIMING ('original' = 1, 'none' = 0, or a factor).
+    """
+    mode = 'off'
+    directory = None
+    timing = 1.0
+
+    _lock = threading.Lock()
+    _stats = {"hits": 0, "misses": 0, "recorded": 0}
+
+    @classmethod
+    def init_app(cls, app):
+        mode = (app.config.get('PROVIDER_CASSETTE_MODE') or 'off').lower()
+        if mode not in MODES:
+            raise ValueError(f"PROVIDER_CASSETTE_MODE must be one of {MODES}, not '{mode}'")
+        cls.configure(
+            mode,
+            app.config.get('PROVIDER_CASSETTE_DIR') or os.path.join(app.instance_path, 'cassettes'),
+            app.config.get('PROVIDER_REPLAY_TIMING', 'original')
+        )
+        if cls.mode != 'off':
+            print(f"Provider cassettes: {cls.mode} in {cls.directory} (replay timing x{cls.timing})")
+
+    @classmethod
+    def configure(cls, mode, directory, timing='original'):
+        cls.mode = mode
+        cls.directory = directory
+        timing = str(timing).lower()
+        cls.timing = REPLAY_TIMINGS[timing] if timing in REPLAY_TIMINGS else max(0.0, float(timing))
+        cls._load.cache_clear()
+        if mode in ('record', 'auto'):
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def active(cls):
+        return cls.mode != 'off'
+
+    @classmethod
+    def path(cls, provider, key):
+        return os.path.join(cls.directory, provider, f"{key}.json.gz")
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return dict(cls._stats, mode=cls.mode, directory=cls.directory)
+
+    @classmethod
+    def _count(cls, name):
+        with cls._lock:
+            cls._stats[name] += 1
+
+    # --- request path -------------------------------------------------------------
+
+    @classmethod
+    def request(cls, provider, method, url, send=None, **kwargs):
+        """
+        Drop-in for requests.request(method, url, **kwargs) honoring the cassette mode; send
+        replaces requests.request for the live call.
+        """
+        normalized = normalize_request(provider, method, url, kwargs.get('params'), kwargs.get('data'))
+        key = request_key(normalized)
+
+        if cls.mode in ('replay', 'auto'):
+            entry = cls._load(cls.path(provider, key))
+            if entry is not None:
+                cls._count('hits')
+                return cls._replay(entry, url)
+            cls._count('misses')
+            if cls.mode == 'replay':
+                raise CassetteMiss(f"no {provider} recording for {normalized['query'] or normalized['form']}")
+
+        started = time.perf_counter()
+        response = (send or requests.request)(method, url, **kwargs)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        try:
+            cls._save(provider, key, normalized, url, response, elapsed_ms)
+        except OSError as e:
+            print(f"Could not record {provider} response: {e}")
+        return response
+
+    @classmethod
+    def lookup(cls, provider, method, url, params=None, data=None):
+        """The recorded response for a call, without waiting or going live; None if not recorded."""
+        if not cls.active():
+            return None
+        entry = cls._load(cls.path(provider, request_key(normalize_request(provider, method, url, params, data))))
+        if entry is None:
+            return None
+        cls._count('hits')
+        return cls._response(entry, url)
+
+    @classmethod
+    async def arequest(cls, provider, method, url, send, **kwargs):
+        """request() for the async path: send(method, url, **kwargs) is the awaitable live call."""
+        normalized = normalize_request(provider, method, url, kwargs.get('params'), kwargs.get('data'))
+        key = request_key(normalized)
+
+        if cls.mode in ('replay', 'auto'):
+            entry = cls._load(cls.path(provider, key))
+            if entry is not None:
+                cls._count('hits')
+                delay = cls._delay(entry)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                return cls._response(entry, url)
+            cls._count('misses')
+            if cls.mode == 'replay':
+                raise CassetteMiss(f"no {provider} recording for {normalized['query'] or normalized['form']}")
+
+        started = time.perf_counter()
+        response = await send(method, url, **kwargs)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        try:
+            cls._save(provider, key, normalized, url, response, elapsed_ms)
+        except OSError as e:
+            print(f"Could not record {provider} response: {e}")
+        return response
+
+    @classmethod
+    def _delay(cls, entry):
+        return entry['elapsed_ms'] * cls.timing / 1000.0
+
+    @classmethod
+    def _replay(cls, entry, url):
+        delay = cls._delay(entry)
+        if delay > 0:
+            time.sleep(delay)
+        return cls._response(entry, url)
+
+    @staticmethod
+    def _response(entry, url):
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = url
+        response.reason = entry.get('reason')
+        response.elapsed = timedelta(milliseconds=entry['elapsed_ms'])
+        return response
+
+    @classmethod
+    def _save(cls, provider, key, normalized, url, response, elapsed_ms):
+        entry = {
+            "request": dict(normalized, url=url),
+            "status": response.status_code,
+            "reason": getattr(response, 'reason', None) or getattr(response, 'reason_phrase', None),
+            "headers": {k: v for k, v in response.headers.items() if k.lower() == 'content-type'},
+            "body": response.text,
+            "elapsed_ms": round(elapsed_ms, 3),
+            "recorded_at": datetime.utcnow().isoformat()
+        }
+        path = cls.path(provider, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a concurrent replay never reads half a file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(json.dumps(entry).encode('utf-8'), compresslevel=6))
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        cls._load.cache_clear()
+        cls._count('recorded')
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _load(path):
+        try:
+            with open(path, 'rb') as f:
+                return json.loads(gzip.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Unreadable cassette {path}: {e}")
+            return None
@@ -0,0 +1,197 @@
+import asyncio
+import fcntl
+import math
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+SCOPES = ('process', 'host')
+
+# Shared bucket file: next theoretical arrival time, then counters (requests, waited, wait seconds, rejected)
+_STATE = struct.Struct('<dqqdq')
+
+
+class RateLimitExceeded(requests.ConnectionError):
+    """The provider's queue is longer than PROVIDER_RATE_MAX_WAIT; callers treat it like a network error."""
+
+
+class ProviderRateLimiter:
+    """
+    Paces outbound calls to each provider at its allowed rate instead of letting them fail.
+
+    Each provider with a rate in PROVIDER_RATE_LIMITS (requests per second, 0 = unlimited) gets a
+    token bucket of PROVIDER_RATE_BURST tokens, kept as a generic cell rate algorithm: the bucket
+    is one timestamp, the next free slot. A caller reserves the earliest slot under a lock and
+    sleeps until it comes, so callers are served in arrival order and nobody polls.
+
+    With RATE_LIMIT_SCOPE='host' (default) the bucket lives in RATE_LIMIT_DIR/<provider>.bucket
+    and is updated under flock, so every gunicorn worker on the host draws from the same bucket.
+    A call that would wait longer than PROVIDER_RATE_MAX_WAIT seconds raises RateLimitExceeded
+    without taking a slot. A 429 from the provider pushes the bucket past its Retry-After.
+    """
+    rates = {}
+    bursts = {}
+    scope = 'process'
+    directory = None
+    max_wait = 60.0
+
+    _lock = threading.Lock()
+    _memory = {}    # provider -> state tuple, for scope='process'
+    _waiting = {}   # provider -> callers of this process sleeping on a reservation
+
+    @classmethod
+    def init_app(cls, app):
+        scope = (app.config.get('RATE_LIMIT_SCOPE') or 'process').lower()
+        if scope not in SCOPES:
+            raise ValueError(f"RATE_LIMIT_SCOPE must be one of {SCOPES}, not '{scope}'")
+        cls.configure(
+            app.config.get('PROVIDER_RATE_LIMITS'),
+            app.config.get('PROVIDER_RATE_BURST'),
+            scope,
+            app.config.get('RATE_LIMIT_DIR') or os.path.join(app.instance_path, 'rate_limits'),
+            app.config.get('PROVIDER_RATE_MAX_WAIT', 60)
+        )
+
+    @classmethod
+    def configure(cls, rates, bursts=None, scope='process', directory=None, max_wait=60):
+        with cls._lock:
+            cls.rates = {name: float(rate) for name, rate in (rates or {}).items() if rate and float(rate) > 0}
+            cls.bursts = {name: max(1, int(burst)) for name, burst in (bursts or {}).items()}
+            cls.scope = scope
+            cls.directory = directory
+            cls.max_wait = float(max_wait)
+            cls._memory = {}
+        if scope == 'host' and cls.rates:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def limited(cls, provider):
+        return provider in cls.rates
+
+    # --- shared state ---------------------------------------------------------------
+
+    @classmethod
+    @contextmanager
+    def _state(cls, provider):
+        """Yields a one-element list holding the provider's state tuple; whatever is left in it is saved."""
+        if cls.scope != 'host':
+            with cls._lock:
+                cell = [cls._memory.get(provider, (0.0, 0, 0, 0.0, 0))]
+                yield cell
+                cls._memory[provider] = cell[0]
+            return
+
+        fd = os.open(os.path.join(cls.directory, f"{provider}.bucket"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, _STATE.size, 0)
+            cell = [_STATE.unpack(raw) if len(raw) == _STATE.size else (0.0, 0, 0, 0.0, 0)]
+            yield cell
+            os.pwrite(fd, _STATE.pack(*cell[0]), 0)
+        finally:
+            os.close(fd)  # releases the flock
+
+    @classmethod
+    def _reserve(cls, provider):
+        """Takes the next slot; returns the seconds to wait before using it."""
+        interval = 1.0 / cls.rates[provider]
+        tolerance = (cls.bursts.get(provider, 1) - 1) * interval
+        with cls._state(provider) as cell:
+            tat, total, waited, wait_s, rejected = cell[0]
+            now = time.time()
+            tat = max(tat, now)
+            wait = max(0.0, tat - tolerance - now)
+            if wait > cls.max_wait:
+                cell[0] = (tat, total, waited, wait_s, rejected + 1)
+            else:
+                cell[0] = (tat + interval, total + 1, waited + (wait > 0), wait_s + wait, rejected)
+        if wait > cls.max_wait:
+            raise RateLimitExceeded(f"{provider} queue is {wait:.1f}s long (limit {cls.max_wait:.0f}s)")
+        return wait
+
+    @classmethod
+    def _enter(cls, provider):
+        with cls._lock:
+            cls._waiting[provider] = cls._waiting.get(provider, 0) + 1
+
+    @classmethod
+    def _leave(cls, provider):
+        with cls._lock:
+            cls._waiting[provider] -= 1
+
+    # --- callers --------------------------------------------------------------------
+
+    @classmethod
+    def acquire(cls, provider):
+        """Blocks until this call may go out (no-op for providers without a rate)."""
+        if not cls.limited(provider):
+            return 0.0
+        wait = cls._reserve(provider)
+        if wait > 0:
+            cls._enter(provider)
+            try:
+                time.sleep(wait)
+            finally:
+                cls._leave(provider)
+        return wait
+
+    @classmethod
+    async def aacquire(cls, provider):
+        """acquire() for the event loop."""
+        if not cls.limited(provider):
+            return 0.0
+        wait = cls._reserve(provider)
+        if wait > 0:
+            cls._enter(provider)
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                cls._leave(provider)
+        return wait
+
+    @classmethod
+    def observe(cls, provider, response):
+        """Honours a 429's Retry-After (seconds; default one interval) for every worker."""
+        if response.status_code != 429 or not cls.limited(provider):
+            return
+        try:
+            retry_after = float(response.headers.get('Retry-After', 0))
+        except ValueError:
+            retry_after = 0.0
+        interval = 1.0 / cls.rates[provider]
+        tolerance = (cls.bursts.get(provider, 1) - 1) * interval
+        with cls._state(provider) as cell:
+            tat, *counters = cell[0]
+            cell[0] = (max(tat, time.time() + max(retry_after, interval) + tolerance), *counters)
+        print(f"{provider} returned 429; pausing its bucket for {max(retry_after, interval):.1f}s")
+
+    @classmethod
+    def metrics(cls):
+        """Per provider: configured rate, queue depth and wait time (host-wide when shared)."""
+        result = {}
+        for provider, rate in cls.rates.items():
+            interval = 1.0 / rate
+            burst = cls.bursts.get(provider, 1)
+            with cls._state(provider) as cell:
+                tat, total, waited, wait_s, rejected = cell[0]
+            # Time until the last reserved slot comes up; the queue every worker on this host waits in
+            backlog = max(0.0, tat - interval - (burst - 1) * interval - time.time())
+            with cls._lock:
+                local = cls._waiting.get(provider, 0)
+            result[provider] = {
+                "rate_per_s": rate,
+                "burst": burst,
+                "scope": cls.scope,
+                "queue_depth": math.floor(backlog / interval) + 1 if backlog else 0,
+                "queue_wait_s": round(backlog, 3),
+                "waiting_in_process": local,
+                "requests": total,
+                "waited": waited,
+                "mean_wait_ms": round(wait_s * 1000 / total, 1) if total else 0.0,
+                "rejected": rejected,
+            }
+        return result
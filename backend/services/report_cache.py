@@ -0,0 +1,190 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+
+# Bump when the property report layout changes so previously rendered PDFs stop matching
+REPORT_TEMPLATE_VERSION = 1
+
+# Everything generate_property_report reads
+REPORT_FIELDS = (
+    'id', 'property_name', 'address', 'asset_value', 'loan_term', 'climate_score', 'risk_level',
+    'ai_insights', 'risk_factors', 'loan_recommendation',
+)
+
+
+class ReportCache:
+    """
+    Rendered property reports on disk, named <analysis id>-<content hash>.pdf.
+
+    The hash covers every field the report prints plus REPORT_TEMPLATE_VERSION, so an edited
+    row or a new layout simply misses and the stale file for that id is replaced. Files are
+    written to a temp name and renamed into place, which makes concurrent renders from several
+    workers harmless. When the directory grows past REPORT_CACHE_MAX_MB the least recently
+    served files are evicted. Hits touch the file's mtime, which serves as the LRU clock.
+
+    With REPORT_PRERENDER enabled, a report is rendered on a background thread as soon as the
+    analysis is saved, so the first download is already a hit.
+    """
+    cache_dir = None
+    max_bytes = 256 * 1024 * 1024
+    prerender_enabled = False
+
+    # Files served this recently are never evicted, so a download in flight keeps its file
+    EVICT_GRACE_SECONDS = 60
+
+    _approx_bytes = 0
+    _size_lock = threading.Lock()
+    _render_locks = {}
+    _render_locks_lock = threading.Lock()
+    _executor = None
+
+    @classmethod
+    def init_app(cls, app):
+        cls.cache_dir = app.config.get('REPORT_CACHE_DIR') or os.path.join(app.instance_path, 'report_cache')
+        cls.max_bytes = int(app.config.get('REPORT_CACHE_MAX_MB', 256)) * 1024 * 1024
+        cls.prerender_enabled = app.config.get('REPORT_PRERENDER', False)
+        try:
+            os.makedirs(cls.cache_dir, exist_ok=True)
+            cls._approx_bytes = sum(e.stat().st_size for e in os.scandir(cls.cache_dir) if e.name.endswith('.pdf'))
+        except OSError as e:
+            print(f"Report cache disabled, rendering in memory: {e}")
+            cls.cache_dir = None
+
+        if cls.prerender_enabled and cls.cache_dir:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=app.config.get('REPORT_PRERENDER_WORKERS', 1),
+                thread_name_prefix="report-prerender"
+            )
+
+    @staticmethod
+    def content_hash(analysis):
+        payload = {field: getattr(analysis, field) for field in REPORT_FIELDS}
+        payload['_template'] = REPORT_TEMPLATE_VERSION
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.blake2b(encoded, digest_size=10).hexdigest()
+
+    @classmethod
+    def _path(cls, analysis_id, digest):
+        return os.path.join(cls.cache_dir, f"{analysis_id}-{digest}.pdf")
+
+    @classmethod
+    def _render_lock(cls, key):
+        with cls._render_locks_lock:
+            lock = cls._render_locks.get(key)
+            if lock is None:
+                lock = cls._render_locks[key] = threading.Lock()
+            return lock
+
+    @classmethod
+    def lookup(cls, analysis):
+        """(path, digest) of an already rendered report, or (None, digest) on a miss."""
+        digest = cls.content_hash(analysis)
+        if cls.cache_dir is None:
+            return None, digest
+        path = cls._path(analysis.id, digest)
+        try:
+            os.utime(path)
+            return path, digest
+        except FileNotFoundError:
+            return None, digest
+
+    @classmethod
+    def get_path(cls, analysis):
+        """
+        Path of the rendered report for this row, rendering it first on a miss.
+        Returns (path, digest), or (None, digest) when the cache is disabled.
+        """
+        path, digest = cls.lookup(analysis)
+        if path is not None or cls.cache_dir is None:
+            return path, digest
+
+        from services.report_service import ReportService
+        path = cls._path(analysis.id, digest)
+        lock = cls._render_lock(analysis.id)
+        with lock:
+            if not os.path.exists(path):
+                cls.store(analysis.id, digest, ReportService.generate_property_report(analysis).getvalue())
+        with cls._render_locks_lock:
+            cls._render_locks.pop(analysis.id, None)
+        return path, digest
+
+    @classmethod
+    def store(cls, analysis_id, digest, pdf):
+        """Atomically writes a rendered report into the cache and replaces older renders of the row."""
+        if cls.cache_dir is None:
+            return None
+        path = cls._path(analysis_id, digest)
+        fd, tmp_path = tempfile.mkstemp(dir=cls.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pdf)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Drop renders of older versions of this row
+        for stale in glob.glob(os.path.join(cls.cache_dir, f"{analysis_id}-*.pdf")):
+            if stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+        with cls._size_lock:
+            cls._approx_bytes += len(pdf)
+            over = cls._approx_bytes > cls.max_bytes
+        if over:
+            cls.evict()
+        return path
+
+    @classmethod
+    def evict(cls):
+        """Deletes least recently served reports until the directory is under 90% of the limit."""
+        with cls._size_lock:
+            entries = []
+            for entry in os.scandir(cls.cache_dir):
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            target = cls.max_bytes * 0.9
+            cutoff = time.time() - cls.EVICT_GRACE_SECONDS
+            for mtime, size, path in sorted(entries):
+                if total <= target or mtime > cutoff:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            cls._approx_bytes = total
+
+    @classmethod
+    def prerender(cls, analysis):
+        """Queues a background render of a freshly saved analysis, if pre-rendering is enabled."""
+        if cls._executor is None:
+            return
+        # Detach from the session: the worker thread must not lazy-load through it
+        snapshot = SimpleNamespace(**{field: getattr(analysis, field) for field in REPORT_FIELDS})
+        cls._executor.submit(cls._prerender, snapshot)
+
+    @classmethod
+    def _prerender(cls, snapshot):
+        try:
+            cls.get_path(snapshot)
+        except Exception as e:
+            print(f"Report pre-render failed for analysis {snapshot.id}: {e}")
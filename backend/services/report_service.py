@@ -4,34 +4,61 @@ from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 import io
+from types import SimpleNamespace
+
+# Built once per process and shared by every report (and every batch worker)
+DETAILS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.whitesmoke),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+])
+
+RISK_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#ff9f43")),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+])
 
 class ReportService:
+    _styles = None
+
+    @classmethod
+    def styles(cls):
+        """(stylesheet, title, heading, body) styles, created on first use."""
+        if cls._styles is None:
+            styles = getSampleStyleSheet()
+            
+            # Custom styles
+            title_style = ParagraphStyle(
+                'TitleStyle',
+                parent=styles['Heading1'],
+                fontSize=24,
+                textColor=colors.HexColor("#ff9f43"),
+                alignment=1,
+                spaceAfter=20
+            )
+            
+            heading_style = ParagraphStyle(
+                'HeadingStyle',
+                parent=styles['Heading2'],
+                fontSize=16,
+                textColor=colors.HexColor("#333333"),
+                spaceBefore=15,
+                spaceAfter=10
+            )
+            
+            cls._styles = (styles, title_style, heading_style, styles['BodyText'])
+        return cls._styles
+
     @staticmethod
     def generate_property_report(analysis):
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'TitleStyle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor("#ff9f43"),
-            alignment=1,
-            spaceAfter=20
-        )
-        
-        heading_style = ParagraphStyle(
-            'HeadingStyle',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor("#333333"),
-            spaceBefore=15,
-            spaceAfter=10
-        )
-        
-        body_style = styles['BodyText']
+        styles, title_style, heading_style, body_style = ReportService.styles()
         
         features = []
         
@@ -48,15 +75,7 @@ class ReportService:
             ["Loan Term", f"{analysis.loan_term} years"]
         ]
         t = Table(data, colWidths=[150, 300])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.whitesmoke),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
-        ]))
+        t.setStyle(DETAILS_TABLE_STYLE)
         features.append(t)
         
         # Climate score
@@ -76,11 +95,7 @@ class ReportService:
             risk_data.append([factor.capitalize(), f"{val}%"])
         
         rt = Table(risk_data, colWidths=[150, 150])
-        rt.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#ff9f43")),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
-        ]))
+        rt.setStyle(RISK_TABLE_STYLE)
         features.append(rt)
         
         # Recommendation
@@ -104,28 +119,7 @@ class ReportService:
     def generate_portfolio_report(properties, stats):
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'TitleStyle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor("#ff9f43"),
-            alignment=1,
-            spaceAfter=20
-        )
-        
-        heading_style = ParagraphStyle(
-            'HeadingStyle',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor("#333333"),
-            spaceBefore=15,
-            spaceAfter=10
-        )
-        
-        body_style = styles['BodyText']
+        styles, title_style, heading_style, body_style = ReportService.styles()
         
         features = []
         
@@ -145,15 +139,7 @@ class ReportService:
         ]
         
         st = Table(summary_data, colWidths=[150, 300])
-        st.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.whitesmoke),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
-        ]))
+        st.setStyle(DETAILS_TABLE_STYLE)
         features.append(st)
         features.append(Spacer(1, 20))
         
@@ -190,3 +176,12 @@ class ReportService:
         doc.build(features)
         buffer.seek(0)
         return buffer
+
+
+# Process-pool entry points for batch rendering; this module only needs reportlab to import
+def init_render_worker():
+    ReportService.styles()
+
+def render_report_fields(fields):
+    """(id, pdf bytes) for a dict of the report fields of one analysis."""
+    return fields['id'], ReportService.generate_property_report(SimpleNamespace(**fields)).getvalue()
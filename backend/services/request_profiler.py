@@ -0,0 +1,276 @@
+import contextlib
+import glob
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# Stage context used when the current thread is not being profiled (the common case)
+_NULL_STAGE = contextlib.nullcontext()
+
+# thread id -> _Record for requests being profiled right now
+_profiled = {}
+
+
+class _Record:
+    __slots__ = ('label', 'stages', 'counts', 'started', 'samples')
+
+    def __init__(self, label):
+        self.label = label
+        self.stages = []
+        self.counts = Counter()
+        self.started = time.perf_counter()
+        self.samples = 0
+
+
+class _Stage:
+    __slots__ = ('record', 'name')
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.record.stages.append(self.name)
+
+    def __exit__(self, *exc):
+        self.record.stages.pop()
+        return False
+
+
+def profile_stage(name):
+    """
+    Labels the enclosed work (e.g. "network:open_meteo", "model", "reportlab") in the profile
+    of the current request. A no-op unless this thread is being profiled.
+    """
+    if not _profiled:
+        return _NULL_STAGE
+    record = _profiled.get(threading.get_ident())
+    if record is None:
+        return _NULL_STAGE
+    return _Stage(record, name)
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ',')
+
+
+class RequestProfiler:
+    """
+    Opt-in sampling profiler for API requests.
+
+    A request is profiled when PROFILING_ENABLED is set and it falls in the PROFILING_SAMPLE_RATE
+    sample, or when it carries an X-Profile header equal to PROFILING_TOKEN. While any request
+    is profiled, one sampler thread reads its stack every PROFILING_INTERVAL_MS and counts it
+    under "<METHOD> <route>;stage:<label>;<frames...>", which is the folded format flamegraph.pl,
+    inferno and speedscope read. Each profile is written to PROFILING_DIR as <name>.folded
+    with a <name>.json summary, keeping the newest PROFILING_MAX_FILES.
+
+    With neither the flag nor a token configured no hooks are installed, and profile_stage()
+    costs one empty-dict check.
+    """
+    HEADER = 'X-Profile'
+
+    enabled = False
+    sample_rate = 0.0
+    token = None
+    interval = 0.005
+    directory = None
+    max_files = 200
+
+    _lock = threading.Lock()
+    _wakeup = threading.Event()
+    _thread = None
+    _thread_pid = None
+
+    @classmethod
+    def init_app(cls, app):
+        cls.enabled = bool(app.config.get('PROFILING_ENABLED'))
+        cls.sample_rate = min(1.0, max(0.0, float(app.config.get('PROFILING_SAMPLE_RATE', 0.01))))
+        cls.token = app.config.get('PROFILING_TOKEN') or None
+        cls.interval = max(0.001, float(app.config.get('PROFILING_INTERVAL_MS', 5)) / 1000.0)
+        cls.directory = app.config.get('PROFILING_DIR') or os.path.join(app.instance_path, 'profiles')
+        cls.max_files = int(app.config.get('PROFILING_MAX_FILES', 200))
+        if not cls.installed():
+            return
+
+        os.makedirs(cls.directory, exist_ok=True)
+        app.before_request(cls._before_request)
+        app.after_request(cls._after_request)
+        app.teardown_request(cls._teardown_request)
+
+        from sqlalchemy import event
+        from database import db
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', cls._before_sql)
+            event.listen(db.engine, 'after_cursor_execute', cls._after_sql)
+        print(f"Request profiling on: sample rate {cls.sample_rate if cls.enabled else 0}, "
+              f"header {'on' if cls.token else 'off'}, writing to {cls.directory}")
+
+    @classmethod
+    def installed(cls):
+        return cls.enabled or cls.token is not None
+
+    @classmethod
+    def authorized(cls, request):
+        """The index is open when profiling is on and no token is set, else it needs the token header."""
+        if not cls.installed():
+            return False
+        return cls.token is None or request.headers.get(cls.HEADER) == cls.token
+
+    # --- request hooks ---------------------------------------------------------
+
+    @classmethod
+    def _wanted(cls, request):
+        if cls.token is not None and request.headers.get(cls.HEADER) == cls.token:
+            return True
+        return cls.enabled and random.random() < cls.sample_rate
+
+    @classmethod
+    def _before_request(cls):
+        from flask import request
+        if request.endpoint in ('profiles.list_profiles', 'profiles.get_profile') or not cls._wanted(request):
+            return None
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        record = _Record(f"{request.method} {rule}".replace(';', ','))
+        with cls._lock:
+            _profiled[threading.get_ident()] = record
+        cls._ensure_sampler()
+        return None
+
+    @classmethod
+    def _finish(cls):
+        with cls._lock:
+            return _profiled.pop(threading.get_ident(), None)
+
+    @classmethod
+    def _after_request(cls, response):
+        record = cls._finish()
+        if record is not None:
+            try:
+                cls._write(record, response.status_code)
+            except OSError as e:
+                print(f"Could not write request profile: {e}")
+        return response
+
+    @classmethod
+    def _teardown_request(cls, exc):
+        # after_request does not run when the view raised; drop the record
+        cls._finish()
+
+    @classmethod
+    def _before_sql(cls, conn, cursor, statement, parameters, context, executemany):
+        record = _profiled.get(threading.get_ident()) if _profiled else None
+        if record is not None:
+            record.stages.append('sql')
+
+    @classmethod
+    def _after_sql(cls, conn, cursor, statement, parameters, context, executemany):
+        record = _profiled.get(threading.get_ident()) if _profiled else None
+        if record is not None and record.stages and record.stages[-1] == 'sql':
+            record.stages.pop()
+
+    # --- sampler ----------------------------------------------------------------
+
+    @classmethod
+    def _ensure_sampler(cls):
+        with cls._lock:
+            if cls._thread is None or cls._thread_pid != os.getpid() or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._sample_loop, name="request-profiler", daemon=True)
+                cls._thread_pid = os.getpid()
+                cls._thread.start()
+        cls._wakeup.set()
+
+    @classmethod
+    def _sample_loop(cls):
+        while True:
+            if not _profiled:
+                cls._wakeup.wait()
+                cls._wakeup.clear()
+                continue
+            with cls._lock:
+                frames = sys._current_frames()
+                for thread_id, record in _profiled.items():
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    stack.reverse()
+                    prefix = [record.label] + [f"stage:{stage}" for stage in record.stages]
+                    record.counts[';'.join(prefix + stack)] += 1
+                    record.samples += 1
+                del frames
+            time.sleep(cls.interval)
+
+    # --- output -----------------------------------------------------------------
+
+    @classmethod
+    def _write(cls, record, status):
+        duration_ms = (time.perf_counter() - record.started) * 1000
+        now = datetime.utcnow()
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', record.label).strip('_')[:60]
+        name = f"{now.strftime('%Y%m%dT%H%M%S%f')}-{slug}-{os.getpid()}"
+
+        stages = Counter()
+        for stack, count in record.counts.items():
+            frames = stack.split(';')
+            stages[frames[1][len('stage:'):] if len(frames) > 1 and frames[1].startswith('stage:') else 'app'] += count
+
+        with open(os.path.join(cls.directory, name + '.folded'), 'w', encoding='utf-8') as f:
+            for stack, count in record.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        summary = {
+            "name": name,
+            "route": record.label,
+            "status": status,
+            "duration_ms": round(duration_ms, 2),
+            "samples": record.samples,
+            "interval_ms": round(cls.interval * 1000, 3),
+            "stage_samples": dict(stages.most_common()),
+            "created_at": now.isoformat()
+        }
+        with open(os.path.join(cls.directory, name + '.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f)
+        cls._rotate()
+
+    @classmethod
+    def _rotate(cls):
+        summaries = sorted(glob.glob(os.path.join(cls.directory, '*.json')))
+        for path in summaries[:max(0, len(summaries) - cls.max_files)]:
+            for stale in (path, path[:-len('.json')] + '.folded'):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    @classmethod
+    def recent(cls, limit=50, route=None):
+        """Newest-first profile summaries."""
+        entries = []
+        for path in sorted(glob.glob(os.path.join(cls.directory, '*.json')), reverse=True):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue  # rotated away or half-written
+            if route and route not in summary.get('route', ''):
+                continue
+            entries.append(summary)
+            if len(entries) >= limit:
+                break
+        return entries
+
+    @classmethod
+    def folded_path(cls, name):
+        if not re.fullmatch(r'[A-Za-z0-9_\-]+', name or ''):
+            return None
+        path = os.path.join(cls.directory, name + '.folded')
+        return path if os.path.exists(path) else None
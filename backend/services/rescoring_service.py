@@ -0,0 +1,311 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, update, bindparam, func, or_
+
+from database import db
+from models.property import PropertyAnalysis
+from models.rescoring_job import RescoringJob
+from services.analysis_pipeline import ClimateModel
+from services.scoring_profiles import ScoringProfiles
+from services import scoring_kernel as kernel
+from services.task_queue import TaskQueue
+
+
+def _column(values, default=0.0):
+    return np.array([default if v is None else v for v in values], dtype=np.float64)
+
+
+class RescoringService:
+    """
+    Re-scores stored analyses after climate_model.pkl is retrained or a scoring profile changes.
+
+    Rows are read in id order, CHUNK_ROWS at a time, skipping rows already tagged with the
+    job's model_version and policy_version. Each chunk is scored in one batch: the profile
+    formula through CompiledProfile.score_many, then the model over the whole feature matrix.
+    Rows whose score or loan recommendation changed are written back with one executemany
+    UPDATE; unchanged rows only get their version tags. The checkpoint (last_id and counters)
+    commits in the same transaction as the chunk, so an interrupted job resumes where it stopped.
+    """
+    CHUNK_ROWS = 5000
+    HEARTBEAT_STALE_SECONDS = 60
+
+    @staticmethod
+    def current_versions(profile_name=None):
+        """(profile, model, model_version) that new analyses would be scored with right now."""
+        profile = ScoringProfiles.get(profile_name)
+        model, model_version = ClimateModel.get_with_version()
+        return profile, model, model_version
+
+    @staticmethod
+    def _stale(model_version, policy_version):
+        table = PropertyAnalysis.__table__
+        return or_(
+            table.c.model_version.is_(None), table.c.model_version != model_version,
+            table.c.policy_version.is_(None), table.c.policy_version != policy_version
+        )
+
+    @classmethod
+    def count_stale(cls, model_version, policy_version):
+        table = PropertyAnalysis.__table__
+        return db.session.scalar(select(func.count()).select_from(table)
+                                 .where(cls._stale(model_version, policy_version)))
+
+    @classmethod
+    def create_job(cls, profile_name=None, chunk_rows=None):
+        """Queues a job for the current model and profile. Raises UnknownProfile."""
+        profile, _, model_version = cls.current_versions(profile_name)
+        job = RescoringJob(
+            profile=profile.name,
+            model_version=model_version,
+            policy_version=profile.tag,
+            chunk_rows=chunk_rows or cls.CHUNK_ROWS,
+            total_rows=cls.count_stale(model_version, profile.tag)
+        )
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def _new_owner():
+        return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @classmethod
+    def claim(cls, job_id, owner, force=False):
+        """Atomically takes ownership of a job. Fails if another live runner holds it."""
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=cls.HEARTBEAT_STALE_SECONDS)
+
+        stmt = update(RescoringJob).where(
+            RescoringJob.id == job_id,
+            RescoringJob.status.in_(['queued', 'running'])
+        )
+        if not force:
+            stmt = stmt.where(or_(
+                RescoringJob.status == 'queued',
+                RescoringJob.heartbeat_at.is_(None),
+                RescoringJob.heartbeat_at < stale
+            ))
+        stmt = stmt.values(
+            status='running',
+            owner=owner,
+            heartbeat_at=now,
+            run_started_at=now,
+            run_start_scanned=RescoringJob.scanned_rows,
+            error=None
+        )
+        claimed = db.session.execute(stmt).rowcount == 1
+        db.session.commit()
+        return claimed
+
+    @classmethod
+    def start(cls, app, job_id, force=False):
+        """Claims the job and runs it on a background thread. Returns False if it is already running."""
+        if TaskQueue.queued_dispatch():
+            # A worker process (worker.py) claims and runs it instead
+            TaskQueue.enqueue('rescoring', {"job_id": job_id, "force": force}, dedupe_key=f"rescoring-job:{job_id}")
+            return True
+
+        owner = cls._new_owner()
+        if not cls.claim(job_id, owner, force=force):
+            return False
+
+        thread = threading.Thread(
+            target=cls.run, args=(app, job_id, owner),
+            name=f"rescoring-job-{job_id}", daemon=True
+        )
+        thread.start()
+        return True
+
+    @classmethod
+    def resume_interrupted(cls, app):
+        """Restarts queued jobs and running jobs whose runner stopped sending heartbeats."""
+        with app.app_context():
+            stale = datetime.utcnow() - timedelta(seconds=cls.HEARTBEAT_STALE_SECONDS)
+            job_ids = db.session.scalars(select(RescoringJob.id).where(or_(
+                RescoringJob.status == 'queued',
+                (RescoringJob.status == 'running') & (RescoringJob.heartbeat_at < stale)
+            ))).all()
+            for job_id in job_ids:
+                cls.start(app, job_id)
+            return job_ids
+
+    @classmethod
+    def cancel(cls, job_id):
+        result = db.session.execute(
+            update(RescoringJob)
+            .where(RescoringJob.id == job_id, RescoringJob.status.in_(['queued', 'running']))
+            .values(status='cancelled', owner=None, finished_at=datetime.utcnow())
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    # --- runner ----------------------------------------------------------------
+
+    @classmethod
+    def run(cls, app, job_id, owner, progress=None):
+        """Processes the job to completion in the calling thread. progress(job_dict) is called per chunk."""
+        with app.app_context():
+            try:
+                cls._run(job_id, owner, progress)
+            except Exception as e:
+                print(f"Rescoring job {job_id} runner crashed: {e}")
+                db.session.rollback()
+                db.session.execute(
+                    update(RescoringJob)
+                    .where(RescoringJob.id == job_id, RescoringJob.owner == owner)
+                    .values(status='failed', error=str(e), finished_at=datetime.utcnow())
+                )
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    @classmethod
+    def _run(cls, job_id, owner, progress):
+        job = db.session.get(RescoringJob, job_id)
+        profile, model, model_version = cls.current_versions(job.profile)
+        if (model_version, profile.tag) != (job.model_version, job.policy_version):
+            # Model or policy changed since the job was queued: score with what is live now,
+            # and rescan from the start since rows before the checkpoint carry the old tags
+            print(f"Rescoring job {job_id}: versions changed to {model_version} / {profile.tag}, restarting scan")
+            job.model_version, job.policy_version = model_version, profile.tag
+            job.last_id = 0
+            job.total_rows = job.scanned_rows + cls.count_stale(model_version, profile.tag)
+            db.session.commit()
+        chunk_rows = job.chunk_rows
+        last_id = job.last_id
+        db.session.commit()
+
+        while True:
+            started = time.perf_counter()
+            rows = cls._read_chunk(last_id, chunk_rows, model_version, profile.tag)
+            read_s = time.perf_counter() - started
+            if not rows:
+                break
+
+            started = time.perf_counter()
+            changed, retag = cls.score_chunk(rows, profile, model, model_version)
+            score_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            last_id = rows[-1]['id']
+            # Checkpoint first: if the job was cancelled or taken over, nothing in this chunk is written
+            still_owner = db.session.execute(
+                update(RescoringJob)
+                .where(RescoringJob.id == job_id, RescoringJob.owner == owner, RescoringJob.status == 'running')
+                .values(
+                    last_id=last_id,
+                    scanned_rows=RescoringJob.scanned_rows + len(rows),
+                    changed_rows=RescoringJob.changed_rows + len(changed),
+                    retagged_rows=RescoringJob.retagged_rows + len(retag),
+                    heartbeat_at=datetime.utcnow(),
+                    read_seconds=RescoringJob.read_seconds + read_s,
+                    score_seconds=RescoringJob.score_seconds + score_s
+                )
+            ).rowcount == 1
+            if not still_owner:
+                db.session.rollback()
+                print(f"Rescoring job {job_id} stopped: cancelled or claimed by another runner")
+                return
+            cls._write_chunk(changed, retag, model_version, profile.tag)
+            write_s = time.perf_counter() - started
+            db.session.execute(
+                update(RescoringJob).where(RescoringJob.id == job_id)
+                .values(write_seconds=RescoringJob.write_seconds + write_s)
+            )
+            db.session.commit()
+
+            if progress:
+                progress(db.session.get(RescoringJob, job_id).to_dict())
+                db.session.commit()
+
+        db.session.execute(
+            update(RescoringJob)
+            .where(RescoringJob.id == job_id, RescoringJob.owner == owner, RescoringJob.status == 'running')
+            .values(status='completed', owner=None, finished_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+    @classmethod
+    def _read_chunk(cls, last_id, chunk_rows, model_version, policy_version):
+        table = PropertyAnalysis.__table__
+        stmt = select(
+            table.c.id, table.c.heat_risk, table.c.flood_risk, table.c.storm_risk, table.c.fire_risk,
+            table.c.builtup_percent, table.c.greenery_percent, table.c.elevation,
+            table.c.risk_factors['sea_level'].as_float().label('sea_level'),
+            table.c.projections[(0, 'value')].as_float().label('trend0'),
+            table.c.climate_score, table.c.ml_risk_score, table.c.overall_risk_score,
+            table.c.risk_level, table.c.loan_recommendation
+        ).where(table.c.id > last_id, cls._stale(model_version, policy_version)) \
+         .order_by(table.c.id).limit(chunk_rows)
+        return [dict(row) for row in db.session.execute(stmt).mappings()]
+
+    @staticmethod
+    def score_chunk(rows, profile, model=None, model_version=None):
+        """
+        Scores a chunk the way analyze + apply_ml_score would today.
+        Returns (changed, retag): update params for rows whose score or loan fields changed,
+        and ids of rows that only need the new version tags.
+        """
+        heat = _column([r['heat_risk'] for r in rows])
+        flood = _column([r['flood_risk'] for r in rows])
+        storm = _column([r['storm_risk'] for r in rows])
+        inputs = {
+            'heat': heat, 'flood': flood, 'storm': storm,
+            'fire': _column([r['fire_risk'] for r in rows]),
+            'sea_level': _column([r['sea_level'] for r in rows]),
+            'built_up': _column([r['builtup_percent'] for r in rows]),
+        }
+        scores = profile.score_many(inputs)
+        if model is not None:
+            # Same features and defaults as extract_features()
+            features = np.column_stack([
+                heat, flood, storm,
+                _column([r['elevation'] for r in rows], 45.0),
+                _column([r['trend0'] for r in rows], 0.8),
+                _column([r['greenery_percent'] for r in rows]),
+            ])
+            scores = kernel.py_round(np.asarray(model.predict(features), dtype=np.float64), 1)
+
+        bands = profile.band_many(scores)
+        changed, retag = [], []
+        for row, score, band in zip(rows, scores.tolist(), bands.tolist()):
+            recommendation = profile.recommendations[band]
+            if (row['climate_score'] == score and row['ml_risk_score'] == score
+                    and row['risk_level'] == recommendation['risk_level']
+                    and row['loan_recommendation'] == recommendation):
+                retag.append({'_id': row['id']})
+                continue
+            changed.append({
+                '_id': row['id'],
+                'climate_score': score,
+                'ml_risk_score': score,
+                'overall_risk_score': score,
+                'risk_level': recommendation['risk_level'],
+                'loan_recommendation': dict(recommendation),
+            })
+        return changed, retag
+
+    @staticmethod
+    def _write_chunk(changed, retag, model_version, policy_version):
+        table = PropertyAnalysis.__table__
+        tags = {'model_version': model_version, 'policy_version': policy_version}
+        if changed:
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('_id')).values(
+                    climate_score=bindparam('climate_score'),
+                    ml_risk_score=bindparam('ml_risk_score'),
+                    overall_risk_score=bindparam('overall_risk_score'),
+                    risk_level=bindparam('risk_level'),
+                    loan_recommendation=bindparam('loan_recommendation'),
+                    **tags
+                ),
+                changed
+            )
+        if retag:
+            db.session.execute(update(table).where(table.c.id == bindparam('_id')).values(**tags), retag)
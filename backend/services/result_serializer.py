@@ -0,0 +1,199 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import Response, request
+
+from database import db
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # br is simply not offered
+    brotli = None
+
+# v1 is PropertyAnalysis.to_dict() as the frontend has always consumed it
+VERSIONS = (1, 2)
+V2_MEDIA_TYPE = 'application/vnd.climate.result.v2+json'
+
+# Columns emitted by the compact shape, without the id/analysis_id and timestamp/created_at duplicates
+V2_FIELDS = (
+    'id', 'property_name', 'address', 'latitude', 'longitude', 'asset_value', 'loan_term',
+    'climate_score', 'risk_level', 'heat_risk', 'flood_risk', 'storm_risk', 'fire_risk',
+    'overall_risk_score', 'ml_risk_score', 'greenery_percent', 'water_percent', 'builtup_percent',
+    'avg_temperature', 'precipitation', 'elevation', 'risk_factors', 'projections', 'ai_insights',
+    'loan_recommendation', 'model_version', 'policy_version', 'created_at',
+)
+
+
+def dumps(obj, sort_keys=False):
+    """Encodes to UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0))
+    return json.dumps(obj, separators=(',', ':'), sort_keys=sort_keys,
+                      default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v)).encode('utf-8')
+
+
+class ResultSerializer:
+    """
+    Encodes PropertyAnalysis rows for the results endpoints.
+
+    Encoded bodies are cached per process by (id, version) together with a strong ETag (a hash
+    of the bytes) and any compressed variants. An entry stays valid while the property_analyses
+    mutation counter (see PortfolioSnapshot) is unchanged, so a repeat poll costs one counter read
+    and, with a matching If-None-Match, an empty 304. Without the counter every request re-encodes,
+    but the ETag is still honoured.
+    """
+    cache_size = 2048
+    compress_min_bytes = 512
+
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def init_app(cls, app):
+        cls.cache_size = app.config.get('RESULT_CACHE_SIZE', 2048)
+        cls.compress_min_bytes = app.config.get('RESULT_COMPRESS_MIN_BYTES', 512)
+
+    @staticmethod
+    def to_compact(analysis):
+        payload = {"v": 2}
+        for field in V2_FIELDS:
+            value = getattr(analysis, field)
+            if value is not None:
+                payload[field] = value
+        return payload
+
+    @classmethod
+    def payload(cls, analysis, version=1):
+        return cls.to_compact(analysis) if version == 2 else analysis.to_dict()
+
+    @classmethod
+    def encode(cls, analysis, version=1, extra=None):
+        # v1 keeps jsonify's sorted key order; v2 keeps the V2_FIELDS order
+        payload = cls.payload(analysis, version)
+        return dumps({**payload, **extra} if extra else payload, sort_keys=version == 1)
+
+    @staticmethod
+    def requested_version():
+        """?v=2 or Accept: application/vnd.climate.result.v2+json selects the compact shape."""
+        version = request.args.get('v', type=int)
+        if version is None and V2_MEDIA_TYPE in request.headers.get('Accept', ''):
+            version = 2
+        return version if version in VERSIONS else 1
+
+    @staticmethod
+    def _etag(body):
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+    @classmethod
+    def _mutations(cls):
+        from services.portfolio_analytics import PortfolioSnapshot
+        try:
+            return PortfolioSnapshot.mutation_count(db.session.connection())
+        except Exception:
+            return None
+
+    @classmethod
+    def cached_entry(cls, analysis_id, version, load):
+        """
+        Returns {"etag", "body", "variants"} for the row, re-encoding only when it may have changed.
+        load() fetches the row and is only called on a miss; None from it means not found.
+        """
+        key = (analysis_id, version)
+        marker = cls._mutations()
+        if marker is not None:
+            with cls._lock:
+                entry = cls._cache.get(key)
+                if entry is not None and entry["marker"] == marker:
+                    cls._cache.move_to_end(key)
+                    return entry
+
+        analysis = load()
+        if analysis is None:
+            return None
+        body = cls.encode(analysis, version)
+        entry = {"marker": marker, "etag": cls._etag(body), "body": body, "variants": {}}
+
+        if marker is not None:
+            with cls._lock:
+                cls._cache[key] = entry
+                cls._cache.move_to_end(key)
+                while len(cls._cache) > cls.cache_size:
+                    cls._cache.popitem(last=False)
+        return entry
+
+    @classmethod
+    def _negotiate_encoding(cls, body):
+        if len(body) < cls.compress_min_bytes:
+            return None
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br'] > 0:
+            return 'br'
+        if accepted['gzip'] > 0:
+            return 'gzip'
+        return None
+
+    @staticmethod
+    def _variant(entry, encoding):
+        data = entry["variants"].get(encoding)
+        if data is None:
+            if encoding == 'br':
+                data = brotli.compress(entry["body"], quality=5)
+            else:
+                data = gzip.compress(entry["body"], compresslevel=6, mtime=0)
+            entry["variants"][encoding] = data
+        return data
+
+    @staticmethod
+    def _matches(entry, header):
+        """Any representation of the same bytes matches, whichever worker handed out the tag."""
+        if not header:
+            return False
+        if header.strip() == '*':
+            return True
+        digest = entry["etag"].strip('"')
+        for tag in header.split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag.strip('"').split('-')[0] == digest:
+                return True
+        return False
+
+    @classmethod
+    def respond(cls, entry, version):
+        """Conditional, content-negotiated response for a cached entry."""
+        encoding = cls._negotiate_encoding(entry["body"])
+        # Strong ETags are per representation, so each encoding gets its own suffix
+        etag = entry["etag"][:-1] + '-' + encoding + '"' if encoding else entry["etag"]
+
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept, Accept-Encoding",
+            "X-Result-Version": str(version)
+        }
+        if cls._matches(entry, request.headers.get('If-None-Match')):
+            return Response(status=304, headers=headers)
+
+        body = entry["body"]
+        if encoding:
+            body = cls._variant(entry, encoding)
+            headers["Content-Encoding"] = encoding
+        mimetype = V2_MEDIA_TYPE if version == 2 else 'application/json'
+        return Response(body, status=200, mimetype=mimetype, headers=headers)
+
+    @classmethod
+    def json_response(cls, analysis, status=200, version=1, extra=None):
+        """Uncached response for freshly created analyses; extra keys are added to the body."""
+        mimetype = V2_MEDIA_TYPE if version == 2 else 'application/json'
+        body = cls.encode(analysis, version, extra)
+        return Response(body, status=status, mimetype=mimetype, headers={"X-Result-Version": str(version)})
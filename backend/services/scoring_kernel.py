@@ -0,0 +1,84 @@
+"""
+Array versions of the per-property scoring in ClimateEngine. The score weights and loan bands
+belong to the scoring profile: CompiledProfile.score_many and band_many evaluate those for
+arrays with the helpers here.
+
+Every function takes NumPy arrays (or anything np.asarray accepts) and evaluates the same
+float64 operations in the same order as the scalar code, so for any single property the
+results are bit-for-bit identical:
+
+- min()/max() clamps are written as np.where on the same comparison Python's builtins use
+  (max(0, x) is x only when x > 0), which also reproduces their NaN behaviour.
+- round(x, n) is Python's correctly rounded decimal rounding, not np.round's scale-and-rint.
+  py_round uses the fast path and re-rounds the few values that sit within 1e-6 of a tie
+  with the builtin.
+- Sums over the temperature trend are accumulated column by column, left to right, like sum().
+"""
+import numpy as np
+
+
+def _f64(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def clamp(values, low=0.0, high=100.0):
+    """min(high, max(low, x)) with Python's builtin semantics."""
+    values = np.where(values > low, values, low)
+    return np.where(values < high, values, high)
+
+
+def py_round(values, ndigits=1):
+    """Element-wise builtin round(x, ndigits) for float64 arrays."""
+    values = _f64(values)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    out = np.round(scaled) / scale
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        idx = np.flatnonzero(near_tie)
+        flat = out.reshape(-1)
+        flat[idx] = [round(float(v), ndigits) for v in values.reshape(-1)[idx]]
+    return out
+
+
+def risk_profile(temp_trend, built_up, greenery, water, precip, elevation):
+    """
+    ClimateEngine._calculate_risk_profile for n properties.
+    temp_trend is (n, k); the rest are length-n. Returns a dict of heat/flood/elevation/environment arrays.
+    """
+    temp_trend = np.atleast_2d(_f64(temp_trend))
+    built_up, greenery, water = _f64(built_up), _f64(greenery), _f64(water)
+    precip, elevation = _f64(precip), _f64(elevation)
+
+    trend_sum = np.zeros(temp_trend.shape[0])
+    for i in range(temp_trend.shape[1]):
+        trend_sum = trend_sum + temp_trend[:, i]
+    heat_risk = clamp(trend_sum * 5 + (built_up * 0.5))
+
+    precip_factor = precip * 15
+    below = 50 - elevation
+    elev_factor = np.where(below > 0, below, 0.0) * 2
+    water_factor = water * 1.5
+    flood_risk = clamp((precip_factor * 0.4) + (elev_factor * 0.4) + (water_factor * 0.2))
+
+    elevation_risk = clamp(100 - (elevation * 3))
+    env_risk = clamp(built_up - greenery)
+
+    return {
+        "heat": py_round(heat_risk, 1),
+        "flood": py_round(flood_risk, 1),
+        "elevation": py_round(elevation_risk, 1),
+        "environment": py_round(env_risk, 1)
+    }
+
+
+def final_score(heat, flood, elevation, environment):
+    """ClimateEngine._calculate_final_score."""
+    score = 100 - (
+        _f64(heat) * 0.30 +
+        _f64(flood) * 0.30 +
+        _f64(elevation) * 0.20 +
+        _f64(environment) * 0.20
+    )
+    return py_round(clamp(score), 1)
+
@@ -0,0 +1,299 @@
+import copy
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+from services import scoring_kernel as kernel
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scoring_profiles.json')
+
+# Inputs a profile may weight; the final score is 100 - sum(weight * input), clamped to 0..100
+WEIGHT_KEYS = ('heat', 'flood', 'sea_level', 'built_up', 'storm', 'fire')
+
+BAND_FIELDS = {
+    'risk_level': str,
+    'interest_adjustment': float,
+    'recommendation_text': str,
+    'rate_adjustment': float,
+    'approval_status': str,
+    'risk_category': str,
+}
+
+# The house policy. One ladder of bands drives both the loan recommendation and the pricing,
+# so the two always agree (a score of exactly 80 is Low risk and Approved).
+STANDARD_PROFILE = {
+    "description": "House policy: score weights from ClimateEngine.analyze and the published rate card.",
+    "weights": {"heat": 0.30, "flood": 0.30, "sea_level": 0.20, "built_up": 0.20},
+    "base_rate": 8.0,
+    "bands": [
+        {"min_score": 80, "risk_level": "Low", "interest_adjustment": -0.15,
+         "recommendation_text": "Reduced interest rate recommended due to high climate resilience.",
+         "rate_adjustment": -0.5, "approval_status": "Approved", "risk_category": "Low Risk"},
+        {"min_score": 60, "risk_level": "Medium", "interest_adjustment": 0.0,
+         "recommendation_text": "Standard loan terms apply. Monitor environmental changes periodically.",
+         "rate_adjustment": 1.0, "approval_status": "Conditional Approval", "risk_category": "Moderate Risk"},
+        {"min_score": 50, "risk_level": "Medium", "interest_adjustment": 0.0,
+         "recommendation_text": "Standard loan terms apply. Monitor environmental changes periodically.",
+         "rate_adjustment": 2.5, "approval_status": "High Risk Review", "risk_category": "Elevated Risk"},
+        {"min_score": 40, "risk_level": "High", "interest_adjustment": 0.25,
+         "recommendation_text": "Increased rate recommended + mandatory flood/fire insurance suggested.",
+         "rate_adjustment": 2.5, "approval_status": "High Risk Review", "risk_category": "Elevated Risk"},
+        {"min_score": None, "risk_level": "High", "interest_adjustment": 0.25,
+         "recommendation_text": "Increased rate recommended + mandatory flood/fire insurance suggested.",
+         "rate_adjustment": 4.0, "approval_status": "Rejected", "risk_category": "Severe Climate Risk"},
+    ],
+}
+
+
+class ProfileError(ValueError):
+    pass
+
+
+class UnknownProfile(KeyError):
+    pass
+
+
+class CompiledProfile:
+    """
+    A validated scoring profile reduced to what evaluation needs: the weighted terms in the
+    order ClimateEngine.analyze sums them, and an ascending threshold list for a bisect lookup
+    of the band, with each band's recommendation and pricing dicts pre-built.
+    """
+    __slots__ = ('name', 'version', 'tag', 'description', 'terms', 'thresholds', 'threshold_array',
+                 'recommendations', 'pricings')
+
+    def __init__(self, name, spec):
+        spec = validate_profile(name, spec)
+        self.name = name
+        self.version = hashlib.blake2b(json.dumps(spec, sort_keys=True).encode('utf-8'), digest_size=6).hexdigest()
+        # Stored on each analysis as policy_version
+        self.tag = f"{name}:{self.version}"
+        self.description = spec.get('description', '')
+        self.terms = tuple((key, spec['weights'][key]) for key in WEIGHT_KEYS if spec['weights'].get(key))
+
+        # Bands are listed highest first; store them lowest first, aligned with bisect_right
+        bands = list(reversed(spec['bands']))
+        self.thresholds = [band['min_score'] for band in bands[1:]]
+        self.threshold_array = np.array(self.thresholds, dtype=np.float64)
+        self.recommendations = tuple({
+            "recommended_interest_adjustment": band['interest_adjustment'],
+            "risk_level": band['risk_level'],
+            "recommendation_text": band['recommendation_text']
+        } for band in bands)
+        self.pricings = tuple({
+            "interest_rate": round(spec['base_rate'] + band['rate_adjustment'], 2),
+            "approval_status": band['approval_status'],
+            "risk_category": band['risk_category']
+        } for band in bands)
+
+    def score(self, risks, built_up):
+        """Climate score from a risk profile (heat/flood/sea_level/storm/fire) and built-up percent."""
+        total = None
+        for key, weight in self.terms:
+            term = (built_up if key == 'built_up' else risks.get(key, 0)) * weight
+            total = term if total is None else total + term
+        score = 100 - (total or 0.0)
+        return round(float(min(100.0, max(0.0, float(score)))), 1)
+
+    def band(self, score):
+        """Index of the band for a score, 0 being the lowest; missing or non-numeric scores land there."""
+        try:
+            score = float(score)
+        except (TypeError, ValueError):
+            return 0
+        if math.isnan(score):
+            return 0
+        return bisect_right(self.thresholds, score)
+
+    def score_many(self, inputs):
+        """score() for arrays: inputs maps each weighted key to a float64 array. Bit-identical per element."""
+        total = None
+        for key, weight in self.terms:
+            term = np.asarray(inputs[key], dtype=np.float64) * weight
+            total = term if total is None else total + term
+        if total is None:
+            total = np.zeros(len(next(iter(inputs.values()))))
+        return kernel.py_round(kernel.clamp(100 - total), 1)
+
+    def band_many(self, scores):
+        """band() for an array of scores."""
+        scores = np.asarray(scores, dtype=np.float64)
+        bands = np.searchsorted(self.threshold_array, scores, side='right')
+        bands[np.isnan(scores)] = 0
+        return bands
+
+    def recommendation(self, score):
+        return dict(self.recommendations[self.band(score)])
+
+    def pricing(self, score):
+        return dict(self.pricings[self.band(score)])
+
+    def describe(self):
+        return {"name": self.name, "version": self.version, "description": self.description}
+
+
+def validate_profile(name, spec):
+    """Normalized copy of one profile spec; raises ProfileError naming the first problem."""
+    if not isinstance(spec, dict):
+        raise ProfileError(f"profile '{name}' must be an object")
+    spec = copy.deepcopy(spec)
+
+    weights = spec.get('weights')
+    if not isinstance(weights, dict) or not weights:
+        raise ProfileError(f"profile '{name}' needs a non-empty weights object")
+    unknown = set(weights) - set(WEIGHT_KEYS)
+    if unknown:
+        raise ProfileError(f"profile '{name}' has unknown weights: {sorted(unknown)}")
+    try:
+        spec['weights'] = {key: float(value) for key, value in weights.items()}
+        spec['base_rate'] = float(spec.get('base_rate', 8.0))
+    except (TypeError, ValueError):
+        raise ProfileError(f"profile '{name}' weights and base_rate must be numbers")
+    if any(value < 0 or not math.isfinite(value) for value in spec['weights'].values()):
+        raise ProfileError(f"profile '{name}' weights must be finite and non-negative")
+
+    bands = spec.get('bands')
+    if not isinstance(bands, list) or not bands:
+        raise ProfileError(f"profile '{name}' needs a non-empty bands list")
+    clean = []
+    for i, band in enumerate(bands):
+        if not isinstance(band, dict):
+            raise ProfileError(f"profile '{name}' band {i} must be an object")
+        missing = [field for field in BAND_FIELDS if field not in band]
+        if missing:
+            raise ProfileError(f"profile '{name}' band {i} is missing {missing}")
+        try:
+            entry = {field: kind(band[field]) for field, kind in BAND_FIELDS.items()}
+            last = i == len(bands) - 1
+            entry['min_score'] = None if last and band.get('min_score') is None else float(band['min_score'])
+        except (TypeError, ValueError, KeyError):
+            raise ProfileError(f"profile '{name}' band {i} has a bad value")
+        clean.append(entry)
+
+    # Highest band first, strictly descending; the last band catches everything below
+    edges = [band['min_score'] for band in clean[:-1]]
+    if any(not math.isfinite(edge) for edge in edges) or any(a <= b for a, b in zip(edges, edges[1:])):
+        raise ProfileError(f"profile '{name}' band min_score values must be finite and strictly descending")
+    clean[-1]['min_score'] = None
+    spec['bands'] = clean
+    return spec
+
+
+class ScoringProfiles:
+    """
+    Named scoring profiles: score weights plus the loan band ladder, per lending policy.
+
+    Profiles come from the built-in "standard" policy plus SCORING_PROFILES_PATH (JSON with
+    "profiles", "default" and a "tenants" map of tenant id -> profile). The file is re-read when
+    its mtime changes, checked at most once per CHECK_SECONDS, and every profile is validated and
+    compiled before the new set is swapped in; a bad edit is logged and the previous set stays
+    live. Selection is a dict lookup, so evaluation cost does not grow with the profile count.
+    """
+    CHECK_SECONDS = 1.0
+
+    path = DEFAULT_PATH
+    _lock = threading.Lock()
+    _registry = None
+    _mtime = None
+    _checked_at = 0.0
+    _error = None
+
+    @classmethod
+    def init_app(cls, app):
+        cls.path = app.config.get('SCORING_PROFILES_PATH') or DEFAULT_PATH
+        cls._registry = None
+        cls._mtime = None
+        cls._checked_at = 0.0
+        cls.registry()
+
+    @staticmethod
+    def compile(document):
+        """{'profiles': {name: CompiledProfile}, 'default': name, 'tenants': {...}} from a config document."""
+        if not isinstance(document, dict):
+            raise ProfileError("scoring profile config must be an object")
+        specs = {"standard": STANDARD_PROFILE}
+        profiles = document.get('profiles', {})
+        if not isinstance(profiles, dict):
+            raise ProfileError("'profiles' must be an object of {name: profile}")
+        specs.update(profiles)
+        compiled = {str(name): CompiledProfile(str(name), spec) for name, spec in specs.items()}
+
+        default = document.get('default', 'standard')
+        if default not in compiled:
+            raise ProfileError(f"default profile '{default}' is not defined")
+        tenants = document.get('tenants') or {}
+        if not isinstance(tenants, dict):
+            raise ProfileError("'tenants' must be an object of {tenant: profile}")
+        unknown = {tenant: name for tenant, name in tenants.items() if name not in compiled}
+        if unknown:
+            raise ProfileError(f"tenants reference unknown profiles: {unknown}")
+        return {"profiles": compiled, "default": default, "tenants": {str(k): v for k, v in tenants.items()}}
+
+    @classmethod
+    def registry(cls):
+        now = time.monotonic()
+        if cls._registry is not None and now - cls._checked_at < cls.CHECK_SECONDS:
+            return cls._registry
+
+        with cls._lock:
+            if cls._registry is not None and now - cls._checked_at < cls.CHECK_SECONDS:
+                return cls._registry
+            cls._checked_at = now
+            try:
+                mtime = os.path.getmtime(cls.path)
+            except OSError:
+                mtime = None
+
+            if cls._registry is None or mtime != cls._mtime:
+                try:
+                    document = {}
+                    if mtime is not None:
+                        with open(cls.path) as f:
+                            document = json.load(f)
+                    cls._registry = cls.compile(document)
+                    cls._error = None
+                    if cls._mtime is not None or mtime is not None:
+                        print(f"Loaded scoring profiles {sorted(cls._registry['profiles'])} from {cls.path}")
+                except (OSError, ValueError) as e:
+                    cls._error = str(e)
+                    print(f"Scoring profiles not reloaded from {cls.path}: {e}")
+                    if cls._registry is None:
+                        cls._registry = cls.compile({})
+                cls._mtime = mtime
+            return cls._registry
+
+    @classmethod
+    def get(cls, name=None, tenant=None):
+        """Profile by name, else the tenant's profile, else the default. Raises UnknownProfile for unknown names."""
+        registry = cls.registry()
+        if name:
+            if name not in registry['profiles']:
+                raise UnknownProfile(name)
+            return registry['profiles'][name]
+        if tenant and tenant in registry['tenants']:
+            return registry['profiles'][registry['tenants'][tenant]]
+        return registry['profiles'][registry['default']]
+
+    @classmethod
+    def for_request(cls, data=None):
+        """Profile chosen by ?profile=, a "scoring_profile" body field or the X-Tenant header."""
+        from flask import request
+        name = request.args.get('profile') or (data or {}).get('scoring_profile')
+        return cls.get(name, request.headers.get('X-Tenant'))
+
+    @classmethod
+    def describe(cls):
+        registry = cls.registry()
+        return {
+            "default": registry['default'],
+            "tenants": registry['tenants'],
+            "profiles": [profile.describe() for profile in registry['profiles'].values()],
+            "path": cls.path,
+            "last_error": cls._error
+        }
@@ -0,0 +1,273 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+MODES = ('off', 'process', 'host')
+
+
+def flight_key(*parts):
+    """Stable key for a call from its JSON-able identifying parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs identical concurrent lookups once and hands every caller the same result.
+
+    SINGLE_FLIGHT:
+      process  callers in one process wait for the in-flight call with the same key
+      host     (default) also across the processes of one host: the leader holds an flock on a
+               lock file and leaves its result in SINGLE_FLIGHT_DIR for SINGLE_FLIGHT_TTL seconds,
+               so gunicorn workers asking for the same thing read it instead of calling again
+      off      every call goes out
+
+    Only successful results are shared across processes; an exception reaches the callers that
+    were waiting on that call in-process, and the next caller tries again. Results must be
+    JSON-serializable (parsed provider payloads, explanation text).
+    """
+    mode = 'off'
+    directory = None
+    ttl = 30.0
+    wait_timeout = 30.0
+    LOCK_STRIPES = 1024
+
+    _lock = threading.Lock()
+    _flights = {}
+    _async_flights = {}
+    _stats = {"leaders": 0, "shared": 0, "host_hits": 0, "host_waits": 0}
+    _writes = 0
+
+    @classmethod
+    def init_app(cls, app):
+        mode = (app.config.get('SINGLE_FLIGHT') or 'off').lower()
+        if mode not in MODES:
+            raise ValueError(f"SINGLE_FLIGHT must be one of {MODES}, not '{mode}'")
+        cls.configure(
+            mode,
+            app.config.get('SINGLE_FLIGHT_DIR') or os.path.join(app.instance_path, 'single_flight'),
+            app.config.get('SINGLE_FLIGHT_TTL', 30),
+            app.config.get('SINGLE_FLIGHT_WAIT', 30)
+        )
+
+    @classmethod
+    def configure(cls, mode, directory=None, ttl=30, wait_timeout=30):
+        cls.mode = mode
+        cls.directory = directory
+        cls.ttl = float(ttl)
+        cls.wait_timeout = float(wait_timeout)
+        if mode == 'host':
+            os.makedirs(os.path.join(directory, 'locks'), exist_ok=True)
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return dict(cls._stats, mode=cls.mode)
+
+    @classmethod
+    def _count(cls, name):
+        with cls._lock:
+            cls._stats[name] += 1
+
+    # --- in-process ---------------------------------------------------------------
+
+    @classmethod
+    def do(cls, key, fn):
+        """fn() once per key among concurrent callers; all of them get its result (or exception)."""
+        if cls.mode == 'off':
+            return fn()
+
+        with cls._lock:
+            flight = cls._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = cls._flights[key] = _Flight()
+                cls._stats["leaders"] += 1
+            else:
+                cls._stats["shared"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = cls._across_processes(key, fn) if cls.mode == 'host' else fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with cls._lock:
+                cls._flights.pop(key, None)
+            flight.done.set()
+
+    @classmethod
+    async def ado(cls, key, fn):
+        """do() for coroutines: await fn() once per key among concurrent tasks on this loop."""
+        if cls.mode == 'off':
+            return await fn()
+
+        future = cls._async_flights.get(key)
+        if future is not None:
+            cls._count("shared")
+            return await asyncio.shield(future)
+
+        future = cls._async_flights[key] = asyncio.get_running_loop().create_future()
+        cls._count("leaders")
+        try:
+            if cls.mode == 'host':
+                result = await cls._across_processes_async(key, fn)
+            else:
+                result = await fn()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here, so an unawaited future does not log it
+            raise
+        finally:
+            if not future.done():  # leader cancelled
+                future.cancel()
+            cls._async_flights.pop(key, None)
+
+    # --- across processes -----------------------------------------------------------
+
+    @classmethod
+    def _result_path(cls, key):
+        return os.path.join(cls.directory, key[:2], f"{key}.json")
+
+    @classmethod
+    def _lock_path(cls, key):
+        # A fixed set of lock files, so they never need deleting (unlinking a held flock file races)
+        return os.path.join(cls.directory, 'locks', f"{int(key[:8], 16) % cls.LOCK_STRIPES}.lock")
+
+    @classmethod
+    def _read(cls, key):
+        path = cls._result_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > cls.ttl:
+                return None
+            with open(path, 'rb') as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def _write(cls, key, result):
+        path = cls._result_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({"result": result}, f)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Single-flight result not shared: {e}")
+            return
+        cls._writes += 1
+        if cls._writes % 256 == 0:
+            cls._prune()
+
+    @classmethod
+    def _prune(cls):
+        cutoff = time.time() - cls.ttl
+        for root, _, files in os.walk(cls.directory):
+            if os.path.basename(root) == 'locks':
+                continue
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    @classmethod
+    def peek(cls, key):
+        """(True, result) when another call's result for key is still in the host store, else (False, None)."""
+        if cls.mode != 'host':
+            return False, None
+        cached = cls._cached(key)
+        return (True, cached['result']) if cached is not None else (False, None)
+
+    @classmethod
+    def _acquire(cls, key):
+        """Exclusive flock on the key's lock file, or None after wait_timeout (caller goes ahead)."""
+        f = open(cls._lock_path(key), 'a+')
+        deadline = time.monotonic() + cls.wait_timeout
+        waited = False
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                if waited:
+                    cls._count("host_waits")
+                return f
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    f.close()
+                    print(f"Single-flight lock wait timed out for {key}")
+                    return None
+                waited = True
+                time.sleep(0.01)
+
+    @staticmethod
+    def _release(f):
+        if f is not None:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+    @classmethod
+    def _cached(cls, key):
+        cached = cls._read(key)
+        if cached is not None:
+            cls._count("host_hits")
+        return cached
+
+    @classmethod
+    def _across_processes(cls, key, fn):
+        cached = cls._cached(key)
+        if cached is not None:
+            return cached['result']
+        f = cls._acquire(key)
+        try:
+            # Another process may have finished this call while we waited for the lock
+            cached = cls._cached(key)
+            if cached is not None:
+                return cached['result']
+            result = fn()
+            cls._write(key, result)
+            return result
+        finally:
+            cls._release(f)
+
+    @classmethod
+    async def _across_processes_async(cls, key, fn):
+        cached = cls._cached(key)
+        if cached is not None:
+            return cached['result']
+        f = await asyncio.to_thread(cls._acquire, key)
+        try:
+            cached = cls._cached(key)
+            if cached is not None:
+                return cached['result']
+            result = await fn()
+            cls._write(key, result)
+            return result
+        finally:
+            cls._release(f)
@@ -0,0 +1,148 @@
+import math
+
+from sqlalchemy import text, table, column, select, and_, or_
+
+from database import db
+from models.property import PropertyAnalysis
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+class SpatialIndex:
+    """
+    Viewport and radius lookups over PropertyAnalysis coordinates.
+
+    On SQLite the coordinates are mirrored into an R-tree virtual table that is kept in sync by
+    triggers, so every write path (ORM, bulk deletes, scripts like fix_coords.py) stays indexed.
+    Other databases fall back to a range scan on the latitude/longitude columns.
+    """
+    RTREE_TABLE = 'property_analyses_rtree'
+
+    _rtree = table(RTREE_TABLE, column('id'), column('min_lat'), column('max_lat'), column('min_lon'), column('max_lon'))
+    _rtree_available = False
+
+    _DDL = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+        f"""CREATE TRIGGER IF NOT EXISTS property_analyses_rtree_insert AFTER INSERT ON property_analyses
+            WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+            BEGIN
+                INSERT OR REPLACE INTO {RTREE_TABLE} VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS property_analyses_rtree_update AFTER UPDATE OF latitude, longitude ON property_analyses
+            BEGIN
+                DELETE FROM {RTREE_TABLE} WHERE id = OLD.id;
+                INSERT INTO {RTREE_TABLE}
+                    SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+                    WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS property_analyses_rtree_delete AFTER DELETE ON property_analyses
+            BEGIN
+                DELETE FROM {RTREE_TABLE} WHERE id = OLD.id;
+            END""",
+    ]
+
+    @classmethod
+    def init_app(cls, app):
+        with app.app_context():
+            if db.engine.dialect.name != 'sqlite':
+                return
+            try:
+                with db.engine.begin() as conn:
+                    for statement in cls._DDL:
+                        conn.execute(text(statement))
+                    cls._backfill(conn)
+                cls._rtree_available = True
+            except Exception as e:
+                # SQLite builds without the R-tree module still work, just without the index
+                print(f"Spatial index unavailable, using range scans: {e}")
+                cls._rtree_available = False
+
+    @classmethod
+    def _backfill(cls, conn):
+        indexed = conn.execute(text(f"SELECT count(*) FROM {cls.RTREE_TABLE}")).scalar()
+        located = conn.execute(text(
+            "SELECT count(*) FROM property_analyses WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+        )).scalar()
+        if indexed != located:
+            conn.execute(text(f"DELETE FROM {cls.RTREE_TABLE}"))
+            conn.execute(text(
+                f"INSERT INTO {cls.RTREE_TABLE} "
+                "SELECT id, latitude, latitude, longitude, longitude FROM property_analyses "
+                "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+            ))
+
+    @staticmethod
+    def _lon_ranges(min_lon, max_lon):
+        """Normalizes a west/east pair into one or two ranges, splitting across the antimeridian."""
+        if max_lon - min_lon >= 360:
+            return [(-180.0, 180.0)]
+        west = ((min_lon + 180) % 360) - 180
+        east = ((max_lon + 180) % 360) - 180
+        if west <= east:
+            return [(west, east)]
+        return [(west, 180.0), (-180.0, east)]
+
+    @classmethod
+    def _bbox_clause(cls, min_lat, max_lat, min_lon, max_lon):
+        ranges = cls._lon_ranges(min_lon, max_lon)
+        if cls._rtree_available:
+            r = cls._rtree.c
+            # R-tree boxes are stored as 32-bit floats, so the exact column filter is applied as well
+            coarse = and_(r.max_lat >= min_lat, r.min_lat <= max_lat,
+                          or_(*[and_(r.max_lon >= w, r.min_lon <= e) for w, e in ranges]))
+        else:
+            coarse = None
+
+        exact = and_(PropertyAnalysis.latitude >= min_lat, PropertyAnalysis.latitude <= max_lat,
+                     or_(*[PropertyAnalysis.longitude.between(w, e) for w, e in ranges]))
+        return coarse, exact
+
+    @classmethod
+    def query_bbox(cls, min_lat, min_lon, max_lat, max_lon, user_id=None, limit=None):
+        min_lat, max_lat = max(-90.0, min_lat), min(90.0, max_lat)
+        coarse, exact = cls._bbox_clause(min_lat, max_lat, min_lon, max_lon)
+
+        stmt = select(PropertyAnalysis)
+        if coarse is not None:
+            stmt = stmt.join(cls._rtree, cls._rtree.c.id == PropertyAnalysis.id).where(coarse)
+        stmt = stmt.where(exact)
+
+        if user_id:
+            from models.portfolio import PortfolioAsset
+            stmt = stmt.join(PortfolioAsset, PortfolioAsset.property_id == PropertyAnalysis.id) \
+                       .where(PortfolioAsset.user_id == user_id)
+        if limit:
+            stmt = stmt.limit(limit)
+        return db.session.scalars(stmt).all()
+
+    @staticmethod
+    def haversine_km(lat1, lon1, lat2, lon2):
+        p1, p2 = math.radians(lat1), math.radians(lat2)
+        dp = p2 - p1
+        dl = math.radians(lon2 - lon1)
+        a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+    @classmethod
+    def query_radius(cls, lat, lon, radius_km, user_id=None, limit=None):
+        """Bounding-box prefilter through the index, then an exact great-circle distance check."""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        cos_lat = math.cos(math.radians(lat))
+        dlon = 360.0 if cos_lat < 1e-6 else min(360.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+
+        min_lat, max_lat = lat - dlat, lat + dlat
+        if min_lat <= -90 or max_lat >= 90:
+            # The circle covers a pole, so every longitude is in range
+            dlon = 360.0
+
+        candidates = cls.query_bbox(min_lat, lon - dlon, max_lat, lon + dlon, user_id=user_id)
+        hits = []
+        for a in candidates:
+            d = cls.haversine_km(lat, lon, a.latitude, a.longitude)
+            if d <= radius_km:
+                hits.append((d, a))
+        hits.sort(key=lambda h: h[0])
+        if limit:
+            hits = hits[:limit]
+        return hits
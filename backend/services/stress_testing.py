@@ -0,0 +1,221 @@
+import numpy as np
+
+from services import scoring_kernel as kernel
+from services.analysis_pipeline import ClimateModel
+from services.portfolio_analytics import SCORE_PERCENTILES
+from services.scoring_profiles import ScoringProfiles
+
+# Warming already embedded in the stored temperature trends (roughly today's level)
+BASELINE_WARMING_C = 1.2
+
+# Shocks per scenario. Rates are fractional changes per degree of warming beyond the baseline.
+DEFAULT_SCENARIOS = {
+    "+1.5C": {"warming_c": 1.5, "sea_level_rise_m": 0.25, "flood_rate_per_c": 0.07,
+              "storm_rate_per_c": 0.05, "fire_rate_per_c": 0.08},
+    "+2C": {"warming_c": 2.0, "sea_level_rise_m": 0.35, "flood_rate_per_c": 0.07,
+            "storm_rate_per_c": 0.05, "fire_rate_per_c": 0.08},
+    "+3C": {"warming_c": 3.0, "sea_level_rise_m": 0.60, "flood_rate_per_c": 0.07,
+            "storm_rate_per_c": 0.05, "fire_rate_per_c": 0.08},
+}
+
+SHOCK_KEYS = ("warming_c", "sea_level_rise_m", "flood_rate_per_c", "storm_rate_per_c", "fire_rate_per_c")
+
+# Trend points summed into heat risk (ClimateEngine._calculate_risk_profile: sum(trend) * 5)
+TREND_POINTS = 5
+
+
+class StressTestEngine:
+    """
+    Re-scores the stored portfolio under warming scenarios, in one vectorized pass per scenario.
+
+    Shocks go through the scoring formulas from ClimateEngine, evaluated with scoring_kernel:
+      - heat: every trend point rises by the extra warming, so heat += 5 * 5 * dT
+      - flood, storm, fire: scaled by (1 + rate * dT)
+      - sea level: the stored sea-level risk is turned back into the elevation it implies
+        (risk = 100 - 3 * elevation) and recomputed with that elevation lowered by the rise
+    Stored scores may come from the ML model or include components that are not stored, so
+    each asset's scenario score is its stored score plus the change the shock makes to the
+    formula (or to the trained model, when one is present). The baseline is therefore exactly
+    what the portfolio shows today.
+
+    Scores, risk bands and loan pricing follow the scoring profile (default: the configured
+    default profile), so a scenario is judged by the lending policy that priced the book.
+    """
+
+    @staticmethod
+    def validate(scenarios):
+        """Normalizes {name: shocks}; missing keys default to 0. Raises ValueError on bad input."""
+        if not isinstance(scenarios, dict) or not scenarios:
+            raise ValueError("scenarios must be a non-empty object of {name: shocks}")
+        clean = {}
+        for name, shocks in scenarios.items():
+            if not isinstance(shocks, dict):
+                raise ValueError(f"scenario '{name}' must be an object")
+            unknown = set(shocks) - set(SHOCK_KEYS)
+            if unknown:
+                raise ValueError(f"scenario '{name}' has unknown shocks: {sorted(unknown)}")
+            try:
+                clean[str(name)] = {key: float(shocks.get(key, 0.0)) for key in SHOCK_KEYS}
+            except (TypeError, ValueError):
+                raise ValueError(f"scenario '{name}' shocks must be numbers")
+        return clean
+
+    @staticmethod
+    def _sea_level_risk(elevation, rise_m=0.0):
+        return kernel.py_round(kernel.clamp(100 - ((elevation - rise_m) * 3)), 1)
+
+    @staticmethod
+    def _shock(columns, shocks):
+        d_t = max(0.0, shocks["warming_c"] - BASELINE_WARMING_C)
+        heat = np.nan_to_num(columns['heat'].astype(np.float64))
+        flood = np.nan_to_num(columns['flood'].astype(np.float64))
+        storm = np.nan_to_num(columns['storm'].astype(np.float64))
+        fire = np.nan_to_num(columns['fire'].astype(np.float64))
+        elevation = np.nan_to_num(columns['elevation'].astype(np.float64), nan=45.0)
+        # The elevation column is a placeholder for most analyses; the stored risk is what was scored
+        sea_level = columns['sea_level'].astype(np.float64)
+        base_elevation = np.where(np.isnan(sea_level), elevation, (100 - sea_level) / 3)
+        return {
+            "heat": kernel.py_round(kernel.clamp(heat + TREND_POINTS * 5 * d_t), 1),
+            "flood": kernel.py_round(kernel.clamp(flood * (1 + shocks["flood_rate_per_c"] * d_t)), 1),
+            "storm": kernel.py_round(kernel.clamp(storm * (1 + shocks["storm_rate_per_c"] * d_t)), 1),
+            "fire": kernel.py_round(kernel.clamp(fire * (1 + shocks["fire_rate_per_c"] * d_t)), 1),
+            "sea_level": StressTestEngine._sea_level_risk(base_elevation, shocks["sea_level_rise_m"]),
+            "trend_shift": d_t
+        }
+
+    @staticmethod
+    def _model_scores(model, hazards, columns):
+        # The model was trained on the first trend point (projections[0].value), defaulting as in rescoring
+        trend0 = np.nan_to_num(columns['trend0'].astype(np.float64), nan=0.8) + hazards["trend_shift"]
+        features = np.column_stack([
+            hazards["heat"], hazards["flood"], hazards["storm"],
+            np.nan_to_num(columns['elevation'].astype(np.float64), nan=45.0),
+            trend0,
+            np.nan_to_num(columns['greenery'].astype(np.float64))
+        ])
+        return np.asarray(model.predict(features), dtype=np.float64)
+
+    @staticmethod
+    def _formula_scores(profile, hazards, built_up):
+        return profile.score_many({
+            'heat': hazards["heat"], 'flood': hazards["flood"], 'storm': hazards["storm"],
+            'fire': hazards["fire"], 'sea_level': hazards["sea_level"], 'built_up': built_up
+        })
+
+    @classmethod
+    def run(cls, columns, scenarios=None, profile=None):
+        scenarios = cls.validate(scenarios or DEFAULT_SCENARIOS)
+        profile = profile or ScoringProfiles.get()
+        levels = cls._levels(profile)
+        stored = columns['climate_score']
+        valid = ~np.isnan(stored)
+        columns = {key: values[valid] for key, values in columns.items()}
+        stored = columns['climate_score']
+        values = np.nan_to_num(columns['asset_value'])
+        built_up = np.nan_to_num(columns['built_up'].astype(np.float64))
+
+        if len(stored) == 0:
+            return {"count": 0, "scenarios": {}}
+
+        model = None
+        try:
+            model = ClimateModel.get()
+        except Exception as e:
+            print(f"Stress test falling back to the score formula, model unavailable: {e}")
+
+        baseline = cls._shock(columns, {key: 0.0 for key in SHOCK_KEYS} | {"warming_c": BASELINE_WARMING_C})
+        if model is not None:
+            base_raw = cls._model_scores(model, baseline, columns)
+        else:
+            base_raw = cls._formula_scores(profile, baseline, built_up)
+
+        base_band, base_pricing = cls._price(profile, levels, stored)
+        result = {
+            "count": int(len(stored)),
+            "total_value": round(float(values.sum()), 2),
+            "scoring": "model" if model is not None else "formula",
+            "scoring_profile": profile.name,
+            "baseline": cls._summary(stored, values, base_band, base_pricing, levels),
+            "scenarios": {}
+        }
+
+        for name, shocks in scenarios.items():
+            hazards = cls._shock(columns, shocks)
+            if model is not None:
+                raw = cls._model_scores(model, hazards, columns)
+            else:
+                raw = cls._formula_scores(profile, hazards, built_up)
+            scores = kernel.py_round(kernel.clamp(stored + (raw - base_raw)), 1)
+
+            band, pricing = cls._price(profile, levels, scores)
+            summary = cls._summary(scores, values, band, pricing, levels)
+            summary["shocks"] = shocks
+            summary["mean_score_change"] = round(float((scores - stored).mean()), 2)
+            summary["hazard_means"] = {h: round(float(hazards[h].mean()), 2) for h in ("heat", "flood", "storm", "fire", "sea_level")}
+            summary["migration"] = cls._migration(base_band, band, values, levels)
+            summary["value_at_risk_change"] = round(summary["value_at_risk"] - result["baseline"]["value_at_risk"], 2)
+            summary["avg_interest_rate_change"] = round(
+                summary["avg_interest_rate"] - result["baseline"]["avg_interest_rate"], 4)
+            result["scenarios"][name] = summary
+
+        return result
+
+    @staticmethod
+    def _levels(profile):
+        """
+        (names, level of each profile band): the profile's distinct risk levels, lowest scores
+        first, e.g. ['high', 'medium', 'low'] for the standard policy.
+        """
+        names, level_of_band = [], []
+        for recommendation in profile.recommendations:
+            name = recommendation['risk_level'].lower()
+            if name not in names:
+                names.append(name)
+            level_of_band.append(names.index(name))
+        return names, np.array(level_of_band, dtype=np.int8)
+
+    @staticmethod
+    def _price(profile, levels, scores):
+        """Risk level index (0 = highest risk) and loan pricing arrays for every score under the profile."""
+        band = profile.band_many(scores)
+        pricings = profile.pricings
+        pricing = {
+            "interest_rate": np.array([p["interest_rate"] for p in pricings], dtype=np.float64)[band],
+            "approval_status": np.array([p["approval_status"] for p in pricings], dtype=object)[band],
+        }
+        return levels[1][band], pricing
+
+    @staticmethod
+    def _summary(scores, values, band, pricing, levels):
+        total_value = float(values.sum())
+        bands = {}
+        for i, name in enumerate(levels[0]):
+            mask = band == i
+            bands[name] = {"count": int(np.count_nonzero(mask)), "value": round(float(values[mask].sum()), 2)}
+        rejected = pricing["approval_status"] == "Rejected"
+        return {
+            "mean_score": round(float(scores.mean()), 2),
+            "value_weighted_score": round(float(np.dot(scores, values) / total_value), 2) if total_value > 0 else None,
+            "score_percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(SCORE_PERCENTILES, np.percentile(scores, SCORE_PERCENTILES))},
+            "risk_bands": bands,
+            # Book value sitting in the high-risk band
+            "value_at_risk": bands[levels[0][0]]["value"],
+            "avg_interest_rate": round(float(pricing["interest_rate"].mean()), 4),
+            "rejected_count": int(np.count_nonzero(rejected)),
+            "rejected_value": round(float(values[rejected].sum()), 2)
+        }
+
+    @staticmethod
+    def _migration(before, after, values, levels):
+        """{from band: {to band: {count, value}}} between the baseline and a scenario."""
+        names = levels[0]
+        k = len(names)
+        pair = before.astype(np.int64) * k + after
+        counts = np.bincount(pair, minlength=k * k)
+        sums = np.bincount(pair, weights=values, minlength=k * k)
+        return {
+            names[i]: {names[j]: {"count": int(counts[i * k + j]), "value": round(float(sums[i * k + j]), 2)}
+                       for j in range(k)}
+            for i in range(k)
+        }
@@ -0,0 +1,309 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models.task import Task
+
+DISPATCH_MODES = ('thread', 'queue')
+
+
+class UnknownTask(KeyError):
+    """No handler is registered under that task name."""
+
+
+class TaskFailed(Exception):
+    """Raised by a handler for a failure that retrying cannot fix."""
+
+
+class InvalidPayload(ValueError):
+    """The payload lacks a field the task requires."""
+
+
+class TaskContext:
+    """What a handler gets besides its payload."""
+
+    def __init__(self, task_id, attempt, app):
+        self.id = task_id
+        self.attempt = attempt
+        self.app = app
+
+    def result_path(self, suffix):
+        """A file for this task's output under TASK_RESULTS_DIR (served by GET /api/tasks/<id>/file)."""
+        os.makedirs(TaskQueue.results_dir, exist_ok=True)
+        return os.path.join(TaskQueue.results_dir, f"task-{self.id}{suffix}")
+
+
+class TaskQueue:
+    """
+    Durable background tasks kept in the application database, run by worker processes
+    (worker.py) rather than by threads inside request handlers. No broker: SQLite is the queue.
+
+    A task is a registered handler name plus a JSON payload. A worker claims the highest-priority
+    due task with one conditional UPDATE, runs it in an app context while a heartbeat thread
+    keeps it alive, and stores the handler's JSON result. A failed attempt is retried up to
+    max_attempts times, waiting TASK_RETRY_BACKOFF seconds doubled per attempt; a task whose
+    worker stopped sending heartbeats is put back in the queue, which counts as an attempt.
+    dedupe_key keeps at most one queued or running task per key (a partial unique index).
+
+    TASK_DISPATCH='queue' also sends bulk analysis and re-scoring jobs here instead of starting
+    threads in the web process (the default 'thread' keeps them in-process).
+    """
+    handlers = {}   # name -> (fn, default max_attempts, default priority, required payload fields)
+    dispatch = 'thread'
+    poll_seconds = 1.0
+    default_max_attempts = 3
+    retry_backoff = 30.0
+    results_dir = None
+
+    HEARTBEAT_SECONDS = 5
+    HEARTBEAT_STALE_SECONDS = 60
+    MAX_BACKOFF_SECONDS = 3600
+
+    @classmethod
+    def task(cls, name, max_attempts=None, priority=0, required=()):
+        """Decorator registering fn(payload, context) as the handler for name; enqueue rejects payloads without the required fields."""
+        def register(fn):
+            cls.handlers[name] = (fn, max_attempts, priority, tuple(required))
+            return fn
+        return register
+
+    @classmethod
+    def init_app(cls, app):
+        dispatch = (app.config.get('TASK_DISPATCH') or 'thread').lower()
+        if dispatch not in DISPATCH_MODES:
+            raise ValueError(f"TASK_DISPATCH must be one of {DISPATCH_MODES}, not '{dispatch}'")
+        cls.dispatch = dispatch
+        cls.poll_seconds = float(app.config.get('TASK_POLL_SECONDS', 1.0))
+        cls.default_max_attempts = max(1, int(app.config.get('TASK_MAX_ATTEMPTS', 3)))
+        cls.retry_backoff = float(app.config.get('TASK_RETRY_BACKOFF', 30))
+        cls.results_dir = app.config.get('TASK_RESULTS_DIR') or os.path.join(app.instance_path, 'task_results')
+        import services.tasks  # registers the built-in handlers
+
+        # create_all() leaves an existing tasks table without the dedupe index
+        with app.app_context():
+            for index in Task.__table__.indexes:
+                try:
+                    index.create(db.engine, checkfirst=True)
+                except Exception as e:
+                    print(f"Could not add index {index.name}: {e}")
+
+    @classmethod
+    def queued_dispatch(cls):
+        return cls.dispatch == 'queue'
+
+    @staticmethod
+    def _new_owner():
+        return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    # --- producers ------------------------------------------------------------------
+
+    @classmethod
+    def enqueue(cls, name, payload=None, priority=None, max_attempts=None, delay_seconds=0, dedupe_key=None):
+        """Queues a task and returns it; with dedupe_key, an existing queued or running task is returned instead."""
+        if name not in cls.handlers:
+            raise UnknownTask(name)
+        _, default_attempts, default_priority, required = cls.handlers[name]
+        payload = payload or {}
+        missing = [field for field in required if payload.get(field) is None]
+        if missing:
+            raise InvalidPayload(f"Task '{name}' requires payload fields {missing}")
+        if dedupe_key:
+            existing = cls._active(dedupe_key)
+            if existing is not None:
+                return existing
+
+        task = Task(
+            name=name,
+            payload=payload,
+            priority=default_priority if priority is None else int(priority),
+            max_attempts=max(1, int(max_attempts or default_attempts or cls.default_max_attempts)),
+            run_at=datetime.utcnow() + timedelta(seconds=max(0.0, float(delay_seconds or 0))),
+            dedupe_key=dedupe_key
+        )
+        db.session.add(task)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another producer queued the same dedupe_key between the lookup and the insert
+            db.session.rollback()
+            existing = cls._active(dedupe_key) if dedupe_key else None
+            if existing is None:
+                raise
+            return existing
+        return task
+
+    @staticmethod
+    def _active(dedupe_key):
+        return db.session.scalar(select(Task).where(
+            Task.dedupe_key == dedupe_key, Task.status.in_(['queued', 'running'])
+        ).limit(1))
+
+    @classmethod
+    def cancel(cls, task_id):
+        """Cancels a queued or running task; a running handler finishes but its result is dropped."""
+        result = db.session.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.status.in_(['queued', 'running']))
+            .values(status='cancelled', owner=None, finished_at=datetime.utcnow())
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    @classmethod
+    def stats(cls):
+        counts = dict(db.session.execute(select(Task.status, func.count()).group_by(Task.status)).all())
+        oldest = db.session.scalar(select(func.min(Task.run_at)).where(
+            Task.status == 'queued', Task.run_at <= datetime.utcnow()
+        ))
+        by_name = {}
+        for name, status, count in db.session.execute(
+            select(Task.name, Task.status, func.count())
+            .where(Task.status.in_(['queued', 'running']))
+            .group_by(Task.name, Task.status)
+        ).all():
+            by_name.setdefault(name, {})[status] = count
+        return {
+            "counts": {status: counts.get(status, 0) for status in ('queued', 'running', 'succeeded', 'failed', 'cancelled')},
+            "oldest_due_seconds": round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else 0.0,
+            "active_by_name": by_name,
+            "registered": sorted(cls.handlers),
+            "dispatch": cls.dispatch
+        }
+
+    # --- workers --------------------------------------------------------------------
+
+    @classmethod
+    def claim_next(cls, owner):
+        """Atomically takes the highest-priority due task; returns its id or None."""
+        for _ in range(5):
+            now = datetime.utcnow()
+            task_id = db.session.scalar(
+                select(Task.id)
+                .where(Task.status == 'queued', Task.run_at <= now)
+                .order_by(Task.priority.desc(), Task.run_at, Task.id)
+                .limit(1)
+            )
+            if task_id is None:
+                db.session.commit()
+                return None
+            claimed = db.session.execute(
+                update(Task)
+                .where(Task.id == task_id, Task.status == 'queued')
+                .values(status='running', owner=owner, heartbeat_at=now, started_at=now,
+                        finished_at=None, attempts=Task.attempts + 1)
+            ).rowcount == 1
+            db.session.commit()
+            if claimed:
+                return task_id
+        return None  # lost every race to other workers; poll again
+
+    @classmethod
+    def requeue_stale(cls):
+        """Returns tasks whose worker stopped sending heartbeats to the queue, or fails them when out of attempts."""
+        now = datetime.utcnow()
+        lost = (Task.status == 'running') & (Task.heartbeat_at < now - timedelta(seconds=cls.HEARTBEAT_STALE_SECONDS))
+        error = "Worker stopped sending heartbeats"
+        requeued = db.session.execute(
+            update(Task).where(lost, Task.attempts < Task.max_attempts)
+            .values(status='queued', owner=None, run_at=now, error=error)
+        ).rowcount
+        failed = db.session.execute(
+            update(Task).where(lost, Task.attempts >= Task.max_attempts)
+            .values(status='failed', owner=None, finished_at=now, error=error)
+        ).rowcount
+        db.session.commit()
+        if requeued or failed:
+            print(f"Task queue: {requeued} stale tasks requeued, {failed} failed")
+        return requeued + failed
+
+    @classmethod
+    def _heartbeat(cls, app, task_id, owner, stop):
+        while not stop.wait(cls.HEARTBEAT_SECONDS):
+            try:
+                with app.app_context():
+                    db.session.execute(
+                        update(Task).where(Task.id == task_id, Task.owner == owner, Task.status == 'running')
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+                    db.session.commit()
+            except Exception as e:
+                print(f"Task {task_id} heartbeat failed: {e}")
+
+    @classmethod
+    def _settle(cls, app, task_id, owner, **values):
+        """Records the outcome, unless the task was cancelled or taken over meanwhile."""
+        with app.app_context():
+            db.session.execute(
+                update(Task).where(Task.id == task_id, Task.owner == owner, Task.status == 'running')
+                .values(owner=None, heartbeat_at=datetime.utcnow(), **values)
+            )
+            db.session.commit()
+
+    @classmethod
+    def run(cls, app, task_id, owner):
+        """Runs one claimed task to success, retry or failure."""
+        with app.app_context():
+            task = db.session.get(Task, task_id)
+            name, payload, attempt, max_attempts = task.name, task.payload or {}, task.attempts, task.max_attempts
+            db.session.remove()
+
+        stop = threading.Event()
+        beat = threading.Thread(target=cls._heartbeat, args=(app, task_id, owner, stop),
+                                name=f"task-{task_id}-heartbeat", daemon=True)
+        beat.start()
+        started = time.perf_counter()
+        try:
+            handler = cls.handlers.get(name)
+            if handler is None:
+                raise UnknownTask(name)
+            with app.app_context():
+                result = handler[0](payload, TaskContext(task_id, attempt, app))
+                db.session.remove()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if attempt < max_attempts and not isinstance(e, (UnknownTask, TaskFailed)):
+                delay = min(cls.MAX_BACKOFF_SECONDS, cls.retry_backoff * 2 ** (attempt - 1))
+                print(f"Task {task_id} ({name}) attempt {attempt}/{max_attempts} failed, retrying in {delay:.1f}s: {error}")
+                cls._settle(app, task_id, owner, status='queued', error=error,
+                            run_at=datetime.utcnow() + timedelta(seconds=delay))
+            else:
+                print(f"Task {task_id} ({name}) failed after {attempt} attempts: {error}")
+                cls._settle(app, task_id, owner, status='failed', error=error, finished_at=datetime.utcnow())
+            return False
+        finally:
+            stop.set()
+            beat.join()
+
+        print(f"Task {task_id} ({name}) succeeded in {time.perf_counter() - started:.2f}s")
+        cls._settle(app, task_id, owner, status='succeeded', result=result, error=None,
+                    finished_at=datetime.utcnow())
+        return True
+
+    @classmethod
+    def work(cls, app, stop, burst=False):
+        """Worker loop: claims and runs tasks until stop is set (or, with burst, the queue is empty)."""
+        owner = cls._new_owner()
+        processed = 0
+        last_reap = 0.0
+        while not stop.is_set():
+            with app.app_context():
+                if time.monotonic() - last_reap >= cls.HEARTBEAT_SECONDS:
+                    cls.requeue_stale()
+                    last_reap = time.monotonic()
+                task_id = cls.claim_next(owner)
+                db.session.remove()
+            if task_id is None:
+                if burst:
+                    break
+                stop.wait(cls.poll_seconds)
+                continue
+            cls.run(app, task_id, owner)
+            processed += 1
+        return processed
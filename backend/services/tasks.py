@@ -0,0 +1,140 @@
+"""
+Built-in background tasks. Each handler takes (payload, context) and returns a JSON result;
+files it produces go to context.result_path() and are served by GET /api/tasks/<id>/file.
+"""
+import os
+import subprocess
+import sys
+
+from database import db
+from services.task_queue import TaskFailed, TaskQueue
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _id(value, field):
+    """A payload id as an int; a malformed one fails the task without retries."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise TaskFailed(f"{field} must be an integer id, not {value!r}")
+
+
+@TaskQueue.task('report.render', priority=10, required=('analysis_id',))
+def render_report(payload, task):
+    """{"analysis_id": id} -> the rendered PDF, kept in the report cache when it is enabled."""
+    from models.property import PropertyAnalysis
+    from services.report_cache import ReportCache
+
+    analysis_id = _id(payload.get('analysis_id'), 'analysis_id')
+    analysis = db.session.get(PropertyAnalysis, analysis_id)
+    if analysis is None:
+        raise TaskFailed(f"Analysis {analysis_id} not found")
+    path, digest = ReportCache.get_path(analysis)
+    if path is None:
+        from services.report_service import ReportService
+        path = task.result_path('.pdf')
+        with open(path, 'wb') as f:
+            f.write(ReportService.generate_property_report(analysis).getvalue())
+    return {"analysis_id": analysis.id, "digest": digest, "file": path}
+
+
+@TaskQueue.task('reports.batch', priority=5)
+def render_report_batch(payload, task):
+    """Same body as POST /api/reports/batch -> a ZIP of the reports plus manifest.csv."""
+    from services.batch_report_service import BatchReportService
+
+    ids = payload.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list):
+            raise TaskFailed("ids must be a list of analysis ids")
+        ids = [_id(i, 'ids') for i in ids]
+    rows = BatchReportService.load_rows(
+        ids=ids,
+        user_id=payload.get('user_id') if payload.get('portfolio') else None,
+        risk_level=payload.get('risk_level'),
+        max_score=payload.get('max_score')
+    )
+    if not rows:
+        raise TaskFailed("No analyses match the request")
+    if len(rows) > BatchReportService.max_reports:
+        raise TaskFailed(f"At most {BatchReportService.max_reports} reports per batch")
+
+    path = task.result_path('.zip')
+    with open(path + '.tmp', 'wb') as f:
+        for chunk in BatchReportService.stream_zip(rows):
+            f.write(chunk)
+    os.replace(path + '.tmp', path)
+    return {"reports": len(rows), "bytes": os.path.getsize(path), "file": path}
+
+
+def _run_job(service, model, job_id, force, runner):
+    """Claims a bulk or re-scoring job and runs it here; a dead worker's task resumes the job."""
+    job = db.session.get(model, job_id)
+    if job is None:
+        raise TaskFailed(f"Job {job_id} not found")
+    if job.status in ('completed', 'cancelled'):
+        return job.to_dict()
+    if job.status == 'failed':
+        raise TaskFailed(job.error or f"Job {job_id} failed")
+
+    owner = service._new_owner()
+    if not service.claim(job_id, owner, force=force):
+        raise RuntimeError(f"Job {job_id} is owned by a live runner")
+    runner(owner)
+
+    db.session.expire_all()
+    job = db.session.get(model, job_id)
+    if job.status == 'failed':
+        raise TaskFailed(job.error or f"Job {job_id} failed")
+    return job.to_dict()
+
+
+@TaskQueue.task('bulk.analysis', required=('job_id',))
+def run_bulk_analysis(payload, task):
+    """{"job_id": id, "force": false} -> the finished BulkAnalysisJob."""
+    from models.bulk_job import BulkAnalysisJob
+    from services.bulk_analysis_service import BulkAnalysisService
+
+    job_id = _id(payload.get('job_id'), 'job_id')
+    return _run_job(BulkAnalysisService, BulkAnalysisJob, job_id, bool(payload.get('force')),
+                    lambda owner: BulkAnalysisService._run(task.app, job_id, owner))
+
+
+@TaskQueue.task('rescoring', priority=-5, required=('job_id',))
+def run_rescoring(payload, task):
+    """{"job_id": id, "force": false} -> the finished RescoringJob."""
+    from models.rescoring_job import RescoringJob
+    from services.rescoring_service import RescoringService
+
+    job_id = _id(payload.get('job_id'), 'job_id')
+    return _run_job(RescoringService, RescoringJob, job_id, bool(payload.get('force')),
+                    lambda owner: RescoringService.run(task.app, job_id, owner))
+
+
+@TaskQueue.task('model.retrain', max_attempts=1, priority=-10)
+def retrain_model(payload, task):
+    """
+    Runs ml_training.py and reports the new model version. {"rescore": true, "profile": name}
+    then queues a re-scoring job for it.
+    """
+    from services.analysis_pipeline import ClimateModel
+
+    timeout = float(task.app.config.get('TASK_RETRAIN_TIMEOUT', 3600))
+    try:
+        completed = subprocess.run([sys.executable, 'ml_training.py'], cwd=BACKEND_DIR,
+                                   capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise TaskFailed(f"ml_training.py did not finish within {timeout:.0f}s")
+    output = (completed.stdout + completed.stderr).strip().splitlines()[-10:]
+    if completed.returncode != 0:
+        raise TaskFailed(f"ml_training.py exited with {completed.returncode}: {' | '.join(output)}")
+
+    _, model_version = ClimateModel.get_with_version()
+    result = {"model_version": model_version, "output": output}
+    if payload.get('rescore'):
+        from services.rescoring_service import RescoringService
+        job = RescoringService.create_job(payload.get('profile'), chunk_rows=task.app.config.get('RESCORING_CHUNK_ROWS'))
+        rescoring = TaskQueue.enqueue('rescoring', {"job_id": job.id}, dedupe_key=f"rescoring-job:{job.id}")
+        result.update(rescoring_job_id=job.id, rescoring_task_id=rescoring.id)
+    return result
@@ -0,0 +1,65 @@
+import time
+
+
+def _gemini():
+    from services.climate_engine import gemini
+    gemini()
+
+
+def _reportlab():
+    from services.report_service import ReportService
+    ReportService.styles()
+
+
+def _model():
+    from services.analysis_pipeline import ClimateModel
+    ClimateModel.get()
+
+
+class Warmup:
+    """
+    Optional eager loading of the dependencies the app otherwise imports on first use.
+
+    Importing google.generativeai, reportlab and the trained model costs about a second, which
+    only the first request that needs each should pay. Under gunicorn --preload, WARMUP loads
+    them once in the master so forked workers share the pages instead of each paying on their
+    first request. WARMUP is a comma list of hook names, or 'all'; empty (default) loads nothing.
+    """
+    hooks = {
+        "gemini": _gemini,
+        "reportlab": _reportlab,
+        "model": _model,
+    }
+
+    @classmethod
+    def register(cls, name, fn):
+        cls.hooks[name] = fn
+
+    @classmethod
+    def init_app(cls, app):
+        names = cls.parse(app.config.get('WARMUP'))
+        unknown = [name for name in names if name not in cls.hooks]
+        if unknown:
+            raise ValueError(f"Unknown WARMUP hooks {unknown}; choose from {sorted(cls.hooks)} or 'all'")
+        with app.app_context():
+            cls.run(names)
+
+    @classmethod
+    def parse(cls, value):
+        names = [name.strip() for name in (value or '').split(',') if name.strip()]
+        return list(cls.hooks) if 'all' in names else names
+
+    @classmethod
+    def run(cls, names):
+        """Runs the named hooks; returns {name: milliseconds}."""
+        timings = {}
+        for name in names:
+            started = time.perf_counter()
+            try:
+                cls.hooks[name]()
+            except Exception as e:
+                print(f"Warmup '{name}' failed: {e}")
+                continue
+            timings[name] = round((time.perf_counter() - started) * 1000, 1)
+            print(f"Warmup '{name}': {timings[name]} ms")
+        return timings
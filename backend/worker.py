@@ -0,0 +1,53 @@
+"""
+Runs background tasks from the database task queue (services/task_queue.py): report rendering,
+bulk analysis and re-scoring jobs (with TASK_DISPATCH=queue) and model retraining.
+
+    python worker.py                   # TASK_WORKERS processes, until SIGTERM / Ctrl-C
+    python worker.py --processes 4
+    python worker.py --burst           # exit once no task is due
+
+Each process takes one task at a time. On SIGTERM the running tasks finish before exit; a
+process that dies mid-task has its task put back in the queue by the other workers.
+"""
+import argparse
+import multiprocessing
+import signal
+
+
+def serve(stop, burst):
+    from app import create_app
+    from services.task_queue import TaskQueue
+
+    # The parent relays Ctrl-C as stop, so a running task is not interrupted halfway
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    app = create_app()
+    processed = TaskQueue.work(app, stop, burst=burst)
+    print(f"Worker {multiprocessing.current_process().name} stopped after {processed} tasks")
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=Config.TASK_WORKERS, help="worker processes")
+    parser.add_argument("--burst", action="store_true", help="exit when the queue has no due tasks")
+    args = parser.parse_args()
+
+    stop = multiprocessing.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    workers = [
+        multiprocessing.Process(target=serve, args=(stop, args.burst), name=f"task-worker-{i}")
+        for i in range(max(1, args.processes))
+    ]
+    for worker in workers:
+        worker.start()
+    print(f"Started {len(workers)} task workers")
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import { useMap } from "react-leaflet";
-import { useEffect } from "react";
+import { useEffect, useState } from "react";
 import L from "leaflet";
+import { API_BASE } from "../services/api";
 
 // Critical fix: Vite modules isolate `L`. 
 // leaflet.heat requires a global window.L to attach .heatLayer
@@ -9,16 +10,82 @@ if (typeof window !== 'undefined') {
 }
 import "leaflet.heat";
 
+// Below this map zoom the heatmap is drawn from server-side aggregated cells
+const TILE_ZOOM_THRESHOLD = 12;
+
 function PortfolioHeatmap({ portfolioData }) {
     const map = useMap();
+    const [viewportData, setViewportData] = useState(null);
+    const portfolioSize = portfolioData ? portfolioData.length : 0;
 
+    // Only fetch the assets inside the visible map bounds, refreshed on every pan/zoom
     useEffect(() => {
-        if (!portfolioData || portfolioData.length === 0) return;
+        let controller = null;
+
+        const loadViewport = async () => {
+            if (controller) controller.abort();
+            controller = new AbortController();
+
+            const bounds = map.getBounds();
+            const params = new URLSearchParams({
+                min_lat: bounds.getSouth(),
+                min_lon: bounds.getWest(),
+                max_lat: bounds.getNorth(),
+                max_lon: bounds.getEast()
+            });
+            const headers = {};
+            const token = localStorage.getItem('token');
+            if (token) headers['Authorization'] = `Bearer ${token}`;
 
-        const heatData = portfolioData.map(item => {
+            // Zoomed out: pre-aggregated cells sized to the screen instead of every asset
+            const zoom = map.getZoom();
+            const useTiles = zoom < TILE_ZOOM_THRESHOLD;
+            if (useTiles) params.set('zoom', zoom);
+
+            try {
+                const url = useTiles
+                    ? `${API_BASE}/api/heatmap/tiles?${params}`
+                    : `${API_BASE}/api/assets/within?${params}`;
+                const res = await fetch(url, { headers, signal: controller.signal });
+                if (!res.ok) throw new Error(`Viewport query failed: ${res.status}`);
+                const body = await res.json();
+
+                if (useTiles) {
+                    setViewportData(body.lat.map((lat, i) => ({
+                        latitude: lat,
+                        longitude: body.lon[i],
+                        climate_score: body.avg_score[i],
+                        intensity: body.intensity[i]
+                    })));
+                } else {
+                    setViewportData(body.assets);
+                }
+            } catch (err) {
+                // Fall back to the full portfolio passed in by the page
+                if (err.name !== 'AbortError') setViewportData(null);
+            }
+        };
+
+        loadViewport();
+        map.on('moveend', loadViewport);
+
+        return () => {
+            map.off('moveend', loadViewport);
+            if (controller) controller.abort();
+        };
+    }, [map, portfolioSize]);
+
+    useEffect(() => {
+        const points = viewportData || portfolioData;
+        if (!points || points.length === 0) return;
+
+        const heatData = points.map(item => {
             const lat = Number(item.latitude);
             const lng = Number(item.longitude);
 
+            // Aggregated cells carry a count-weighted intensity
+            if (item.intensity !== undefined) return [lat, lng, Math.max(0, Math.min(1, Number(item.intensity)))];
+
             // Force score to be parsed securely, fallback to 0
             let score = 0;
             if (item.ml_risk_score !== undefined) score = Number(item.ml_risk_score);
@@ -63,7 +130,7 @@ function PortfolioHeatmap({ portfolioData }) {
                 } catch (e) { }
             }
         };
-    }, [portfolioData, map]);
+    }, [viewportData, portfolioData, map]);
 
     return null;
 }
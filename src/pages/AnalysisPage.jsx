@@ -18,7 +18,7 @@ import {
 import { Radar, Line, Pie } from 'react-chartjs-2';
 import 'leaflet/dist/leaflet.css';
 import L from 'leaflet';
-import { API_BASE } from '../services/api';
+import { API_BASE, streamAnalysis } from '../services/api';
 
 let DefaultIcon = L.icon({
     iconUrl: "https://unpkg.com/leaflet@1.9.4/dist/images/marker-icon.png",
@@ -198,16 +198,17 @@ const AnalysisPage = () => {
         };
 
         try {
-            const res = await fetch(`${API_BASE}/api/analyze`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payload)
+            // Charts render from the provisional result and refine as each provider answers
+            await streamAnalysis(payload, (event, data) => {
+                if (event === 'error') throw new Error(data.error);
+                if (data.result) {
+                    setAnalysisData(data.result);
+                    setLoading(false);
+                }
+                if (event === 'explanation') {
+                    setAnalysisData(prev => ({ ...prev, ai_insights: data.ai_insights }));
+                }
             });
-
-            if (!res.ok) throw new Error("Analysis fetch failed");
-
-            const result = await res.json();
-            setAnalysisData(result);
         } catch (err) {
             console.error("[ERROR] Analysis fetch error:", err);
         } finally {
@@ -1 +1,33 @@
 export const API_BASE = import.meta.env.VITE_API_URL || 'http://127.0.0.1:5001';
+
+// POSTs to /api/analyze/stream and calls onEvent(name, data) for each Server-Sent Event as it
+// arrives (geocode, provisional, signal, ml_score, loan, explanation, complete, error).
+export async function streamAnalysis(payload, onEvent) {
+    const res = await fetch(`${API_BASE}/api/analyze/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+        body: JSON.stringify(payload)
+    });
+    if (!res.ok || !res.body) throw new Error("Analysis stream failed");
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let end;
+        while ((end = buffer.indexOf("\n\n")) !== -1) {
+            const frame = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+            let name = "message";
+            let data = "";
+            for (const line of frame.split("\n")) {
+                if (line.startsWith("event: ")) name = line.slice(7);
+                else if (line.startsWith("data: ")) data += line.slice(6);
+            }
+            if (data) onEvent(name, JSON.parse(data));
+        }
+    }
+}